@@ -0,0 +1,71 @@
+"""
+Import cost of the Taskcrafters agent module, tracked with python -X importtime.
+
+Each measurement is a fresh interpreter importing the module (the median of a
+few runs is reported), followed by the heaviest imports under it. The modules
+the lazy tool registry defers until first use are measured the same way, to
+show what app startup no longer pays; ones that are not installed are listed
+as such.
+
+Run from src/: python benchmarks/bench_agent_import.py [runs]
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE = "taskcrafters_agent.real_time_response"
+DEFERRED = [
+    "langchain_community.chat_models",
+    "langchain.agents",
+    "langchain_community.tools",
+    "langchain_community.utilities",
+    "googleapiclient.discovery",
+    "google_auth_oauthlib.flow",
+]
+
+_LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def import_times(module):
+    """Returns {module: cumulative microseconds} for one import in a fresh interpreter, or None if it fails."""
+    env = {**os.environ, "NEBIUS_API_KEY": os.getenv("NEBIUS_API_KEY", "benchmark")}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=SRC, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    times = {}
+    for line in result.stderr.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            times[match.group(4)] = (int(match.group(2)), len(match.group(3)) // 2)
+    return times
+
+
+def median_import(module, runs):
+    samples = [import_times(module) for _ in range(runs)]
+    if any(sample is None for sample in samples):
+        return None, None
+    return statistics.median(sample[module][0] for sample in samples), samples[-1]
+
+
+def main(runs):
+    total, tree = median_import(MODULE, runs)
+    if total is None:
+        print(f"{MODULE} failed to import")
+        return
+    print(f"import {MODULE}: {total / 1000:.0f} ms (median of {runs})")
+    direct = sorted(((us, name) for name, (us, depth) in tree.items() if depth == 1), reverse=True)
+    for us, name in direct[:5]:
+        print(f"  {name:40} {us / 1000:6.0f} ms")
+
+    print("\nDeferred until the agent is first used:")
+    for module in DEFERRED:
+        cost, _ = median_import(module, runs)
+        print(f"  {module:40} " + (f"{cost / 1000:6.0f} ms" if cost is not None else "  not installed"))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
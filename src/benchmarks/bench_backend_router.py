@@ -0,0 +1,92 @@
+"""
+Multi-backend routing: request distribution, latency percentiles and failover.
+
+Starts local stub backends (see stub_llm_server.py): the primary at 400 ms, a
+fast box at 100 ms, and a flaky box at 100 ms that fails 30% of requests.
+Fires batches of concurrent command-mode requests, first against the primary
+only, then against all three; half-way through the routed run the fast box is
+shut down to show failover.
+
+Run from src/: python benchmarks/bench_backend_router.py [requests]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+CONCURRENCY = 4
+
+primary = StubLLMServer(delay=0.4).start()
+fast = StubLLMServer(delay=0.1).start()
+flaky = StubLLMServer(delay=0.1, fail_rate=0.3).start()
+
+os.environ.update({
+    "NEBIUS_API_KEY": "benchmark",
+    "NEBIUS_BASE_URL": primary.base_url,
+    "MODEL": "stub",
+    # Hedging would blur the per-backend picture; it is measured separately
+    "LLM_HEDGING": "0",
+    # Both runs send the same prompts; reused answers would never reach a backend
+    "LLM_REUSE_TTL": "0",
+})
+
+from prompts import llm_client
+from prompts.backends import BackendRouter, load_backends
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+async def run(total, on_half=None):
+    latencies, errors = [], 0
+
+    async def one(n):
+        nonlocal errors
+        # Distinct prompts, so concurrent requests are not coalesced into one
+        messages = [{"role": "user", "content": f"list files #{n}"}]
+        start = time.monotonic()
+        try:
+            await llm_client.acreate_completion("command", model="stub", messages=messages)
+        except Exception:
+            errors += 1
+            return
+        latencies.append(time.monotonic() - start)
+
+    for batch in range(0, total, CONCURRENCY):
+        if on_half and batch >= total // 2:
+            on_half()
+            on_half = None
+        await asyncio.gather(*(one(batch + i) for i in range(min(CONCURRENCY, total - batch))))
+    return latencies, errors
+
+
+def report(title, latencies, errors):
+    print(f"{title}: p50 {percentile(latencies, .5) * 1000:4.0f} ms, p95 {percentile(latencies, .95) * 1000:4.0f} ms, "
+          f"{errors} failed")
+    for backend in llm_client.get_backend_stats():
+        print(f"  {backend['name']:8} {backend['requests']:4} requests, {backend['failures']:3} failures, "
+              f"breaker {backend['state']:9} latency {backend['latency_ms']}")
+
+
+def main(total):
+    os.environ["LLM_BACKENDS"] = ""
+    llm_client.router = BackendRouter(load_backends(primary.base_url, "benchmark", "stub"))
+    report("Primary only", *asyncio.run(run(total)))
+
+    os.environ["LLM_BACKENDS"] = json.dumps([
+        {"name": "fast", "base_url": fast.base_url},
+        {"name": "flaky", "base_url": flaky.base_url},
+    ])
+    llm_client.router = BackendRouter(load_backends(primary.base_url, "benchmark", "stub"))
+    report("Routed (fast box stopped half-way)", *asyncio.run(run(total, on_half=fast.stop)))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
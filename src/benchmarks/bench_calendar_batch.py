@@ -0,0 +1,84 @@
+"""
+Calendar batch inserts: time to schedule a sprint's worth of meetings, one request per event vs one batch.
+
+A stub Google server (stub_google_server.py) answers each insert in 100 ms,
+and a batch in 100 ms plus 5 ms per event. The same instruction, parsed into
+events as the calendar tool does, is created with create_google_calendar_event
+once per event and then with insert_google_calendar_events. One meeting in the
+batch is rejected by the stub to show it is reported on its own while the
+rest are created.
+
+Needs the Google client libraries (requirements.txt).
+
+Run from src/: python benchmarks/bench_calendar_batch.py [events]
+"""
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ["NEBIUS_API_KEY"] = os.getenv("NEBIUS_API_KEY", "benchmark")
+
+import google_services
+from benchmarks.stub_google_server import StubGoogleServer
+from taskcrafters_agent import calendar_tool
+from taskcrafters_agent.real_time_response import calendar_event_tool_func, parse_calendar_events
+
+
+def instruction(total):
+    day = datetime.datetime(2026, 11, 2, 10)
+    return "\n".join(
+        f"Title: Sprint meeting {n + 1}, Description: Sprint planning, "
+        f"Start: {(day + datetime.timedelta(days=n)).isoformat()}, "
+        f"End: {(day + datetime.timedelta(days=n, hours=1)).isoformat()}, Timezone: Europe/Paris"
+        for n in range(total)
+    )
+
+
+def main(total):
+    server = StubGoogleServer(delay=0.1, reject=lambda event: event["summary"] == "Sprint meeting 3").start()
+    directory = tempfile.mkdtemp()
+    token_path = os.path.join(directory, "token.json")
+    with open(token_path, "w") as f:
+        json.dump({"token": "stub-token", "refresh_token": "stub-refresh", "token_uri": server.token_uri,
+                   "client_id": "stub-client", "client_secret": "stub-secret",
+                   "scopes": google_services.CALENDAR_SCOPES, "expiry": "2100-01-01T00:00:00Z"}, f)
+    google_services._services = google_services.GoogleServices(
+        token_path, discovery_cache=os.path.join(directory, "discovery"),
+        client_options={"api_endpoint": server.base_url})
+    events = parse_calendar_events(instruction(total))
+    # Client, discovery document and session set up before timing
+    calendar_tool.create_google_calendar_event("Warm-up", "", *events[0][2:])
+
+    start = time.monotonic()
+    for event in events:
+        try:
+            calendar_tool.create_google_calendar_event(*event)
+        except Exception:
+            pass
+    one_by_one = time.monotonic() - start
+    requests_before = server.requests
+
+    start = time.monotonic()
+    results = calendar_tool.insert_google_calendar_events(events)
+    batched = time.monotonic() - start
+    batches = server.batch_requests
+    report = calendar_event_tool_func(instruction(3))
+
+    print(f"{total} events, stub 100 ms per request, 5 ms per batched event")
+    print(f"  one request per event: {one_by_one * 1000:5.0f} ms, {requests_before - 1} requests")
+    print(f"  batch                : {batched * 1000:5.0f} ms, {batches} batch request(s), "
+          f"{sum(error is None for _, error in results)} created, {sum(error is not None for _, error in results)} "
+          f"rejected")
+    print("  tool output for three events:")
+    for line in report.splitlines():
+        print(f"    {line}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
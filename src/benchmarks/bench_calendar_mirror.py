@@ -0,0 +1,89 @@
+"""
+Calendar mirror: availability and conflict checks answered locally.
+
+A year of synthetic events (about eight meetings per working day, some
+overlapping, some all-day) is loaded into a CalendarMirror in a temporary
+database, as a full sync would store it, then changed by an incremental batch
+of updates and cancellations as a later sync would deliver them. Overlap
+queries for random afternoons are timed against the interval index and a
+linear scan of the same events, and free slots are computed for each.
+Fetching from Google is not part of this; the stored Calendar API event
+shapes are what sync() applies.
+
+Run from src/: python benchmarks/bench_calendar_mirror.py [queries]
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taskcrafters_agent.calendar_mirror import CalendarMirror, format_interval
+
+
+def synthetic_events(days):
+    events = []
+    first = datetime.datetime(2026, 1, 5)
+    for day in range(days):
+        date = first + datetime.timedelta(days=day)
+        if date.weekday() >= 5:
+            continue
+        if random.random() < 0.05:
+            events.append({"id": f"allday{day}", "summary": "Offsite", "start": {"date": date.date().isoformat()},
+                           "end": {"date": (date + datetime.timedelta(days=1)).date().isoformat()}})
+        for n in range(8):
+            start = date.replace(hour=random.randint(8, 17), minute=random.choice((0, 15, 30, 45)))
+            end = start + datetime.timedelta(minutes=random.choice((15, 30, 45, 60, 90)))
+            events.append({"id": f"evt{day}-{n}", "summary": f"Meeting {day}-{n}", "status": "confirmed",
+                           "start": {"dateTime": start.isoformat(), "timeZone": "Europe/Paris"},
+                           "end": {"dateTime": end.isoformat(), "timeZone": "Europe/Paris"}})
+    return events
+
+
+def main(total):
+    random.seed(4)
+    mirror = CalendarMirror(os.path.join(tempfile.mkdtemp(), "calendar.db"))
+    events = synthetic_events(365)
+
+    start = time.monotonic()
+    mirror._apply(events, full=True, sync_token="token-1")
+    full = time.monotonic() - start
+    changes = [dict(event, status="cancelled") for event in random.sample(events, 50)]
+    changes += [dict(event, summary=event["summary"] + " (moved)") for event in random.sample(events, 50)]
+    start = time.monotonic()
+    mirror._apply(changes, sync_token="token-2")
+    incremental = time.monotonic() - start
+
+    windows = []
+    for _ in range(total):
+        day = datetime.datetime(2026, 1, 5) + datetime.timedelta(days=random.randrange(360))
+        begins = day.replace(hour=13).timestamp()
+        windows.append((begins, begins + 5 * 3600))
+    intervals = list(mirror.index.intervals)
+
+    start = time.perf_counter()
+    indexed = [mirror.busy(*window) for window in windows]
+    index_time = (time.perf_counter() - start) / total
+    start = time.perf_counter()
+    scanned = [[i for i in intervals if i[0] < window[1] and i[1] > window[0]] for window in windows]
+    scan_time = (time.perf_counter() - start) / total
+    start = time.perf_counter()
+    slots = [mirror.free_slots(*window) for window in windows]
+    slot_time = (time.perf_counter() - start) / total
+
+    print(f"{len(mirror.index)} mirrored events, {total} afternoon queries")
+    print(f"  full sync stored in {full * 1000:.0f} ms, 100 incremental changes in {incremental * 1000:.0f} ms")
+    print(f"  interval index: {index_time * 1e6:6.1f} us per overlap query, "
+          f"{sum(map(len, indexed)) / total:.1f} events found on average")
+    print(f"  linear scan   : {scan_time * 1e6:6.1f} us per query, same answers: {indexed == scanned}")
+    print(f"  free slots    : {slot_time * 1e6:6.1f} us per afternoon, {sum(map(len, slots)) / total:.1f} on average")
+    if indexed[0]:
+        print(f"  e.g. busy with {format_interval(indexed[0][0])}")
+    mirror.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,58 @@
+"""
+Contact shortlist benchmark.
+
+Run from src/: python benchmarks/bench_contact_index.py [contact_count]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contact_index import ContactIndex
+
+FIRST_NAMES = ["mouncef", "sarah", "john", "karim", "fatima", "youssef", "maria", "david", "amine", "leila",
+               "omar", "nadia", "peter", "alice", "hamza", "salma", "james", "imane", "yassine", "sofia"]
+SYLLABLES = ["ba", "ka", "ri", "mo", "lo", "sa", "te", "ni", "ra", "du", "el", "ha", "zo", "mi", "fe", "an"]
+
+QUERIES = [
+    "send an email to Mouncef about the release",     # exact first name
+    "email Munsef that the build passed",              # phonetic misspelling
+    "write to Sarrah and ask for the contract",        # fuzzy misspelling
+    "send a reminder to Kar about the meeting",        # prefix
+    "mail the whole team about lunch tomorrow",        # no names
+]
+
+
+def make_contacts(count, seed=7):
+    rng = random.Random(seed)
+    contacts = {}
+    while len(contacts) < count:
+        first = rng.choice(FIRST_NAMES) if rng.random() < 0.01 else "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        last = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        name = f"{first.title()} {last.title()} {len(contacts)}"
+        contacts[name] = f"{first}.{last}{len(contacts)}@example.com"
+    return contacts
+
+
+def main(count):
+    contacts = make_contacts(count)
+
+    start = time.perf_counter()
+    index = ContactIndex(contacts)
+    build_seconds = time.perf_counter() - start
+    print(f"{count} contacts, index built in {build_seconds * 1000:.0f} ms")
+
+    rounds = 200
+    for query in QUERIES:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            results = index.search(query)
+        per_lookup_us = (time.perf_counter() - start) / rounds * 1e6
+        top = results[0][1] if results else "-"
+        print(f"  {per_lookup_us:8.1f} us  top={top!r:32} {query}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
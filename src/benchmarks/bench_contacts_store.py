@@ -0,0 +1,94 @@
+"""
+Contacts store load-time, memory and lookup benchmark.
+
+The contacts files are written (and changed for the re-import) in a child
+process, so the process peak is what the import itself needs.
+
+Run from src/: python benchmarks/bench_contacts_store.py [contact_count ...]
+Defaults to 1k, 100k and 1M contacts.
+"""
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import resource
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contacts_store import ContactStore
+from bench_contact_index import QUERIES, make_contacts
+
+
+def _max_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except OSError:
+        return _max_rss_mb()
+
+
+def write_contacts(source, count):
+    with open(source, "w") as f:
+        json.dump(make_contacts(count), f)
+
+
+def add_contact(source):
+    with open(source) as f:
+        contacts = json.load(f)
+    contacts["Munsef Newhire"] = "munsef.newhire@example.com"
+    with open(source, "w") as f:
+        json.dump(contacts, f)
+
+
+def in_child(target, *args):
+    child = multiprocessing.Process(target=target, args=args)
+    child.start()
+    child.join()
+
+
+def main(counts):
+    for count in counts:
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "contacts.json")
+            in_child(write_contacts, source, count)
+
+            store = ContactStore(os.path.join(directory, "contacts.db"))
+            start = time.perf_counter()
+            store.import_file(source)
+            import_seconds = time.perf_counter() - start
+            import_peak_mb = _max_rss_mb()
+
+            # Re-import after a one-line change exercises the incremental path
+            in_child(add_contact, source)
+            start = time.perf_counter()
+            store.import_file(source)
+            reimport_seconds = time.perf_counter() - start
+
+            resident_before = _rss_mb()
+            rounds = 100
+            lookup_us = []
+            for query in QUERIES:
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    store.search(query)
+                lookup_us.append((time.perf_counter() - start) / rounds * 1e6)
+            lookup_growth_mb = _rss_mb() - resident_before
+            store.close()
+
+            db_mb = os.path.getsize(os.path.join(directory, "contacts.db")) / 1e6
+            print(f"{count:>9} contacts: import {import_seconds:7.2f} s (process peak {import_peak_mb:6.0f} MB), "
+                  f"re-import {reimport_seconds:6.2f} s, db {db_mb:6.1f} MB, "
+                  f"lookup median {sorted(lookup_us)[len(lookup_us) // 2]:7.0f} us "
+                  f"(RSS growth {lookup_growth_mb:+.1f} MB)")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 100_000, 1_000_000])
@@ -0,0 +1,65 @@
+"""
+Conversation context: prompt history size and selection cost over a long session.
+
+A session of mixed command, email and Jira jobs is replayed into a
+ConversationContext. After every job, the history a follow-up would be sent
+with is measured: its tokens must stay under the budget however long the
+session runs. Two follow-ups show which turns get picked.
+
+Run from src/: python benchmarks/bench_conversation_context.py [jobs]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from conversation import ConversationContext
+
+FOLDERS = ["Documents", "Downloads", "Desktop", "Pictures", "Music", "projects/site", "tmp"]
+COMMANDS = [
+    ("list all pdf files in {folder}", "find ~/{folder} -name '*.pdf'"),
+    ("show the size of {folder}", "du -sh ~/{folder}"),
+    ("delete the log files in {folder}", "rm ~/{folder}/*.log"),
+    ("compress {folder} into a zip", "zip -r {folder}.zip ~/{folder}"),
+]
+EMAILS = [("email sarah that the {folder} report is ready",
+           {"contact": "sarah@example.com", "subject": "Report ready", "body": "Hi Sarah, the report is ready. " * 8})]
+JIRA = [("create a bug in DEV about the {folder} sync failing",
+         {"operation": "create_issue", "params": {"issue_name": "Sync failing", "description": "Sync of the folder "
+                                                  "fails every night", "project_key": "DEV", "task_type": "bug"}})]
+
+
+def main(jobs):
+    random.seed(7)
+    context = ConversationContext()
+    largest, selects = 0, []
+    for n in range(jobs):
+        mode, templates = random.choice([("command", COMMANDS), ("command", COMMANDS), ("email", EMAILS),
+                                         ("jira", JIRA)])
+        instruction, result = random.choice(templates)
+        folder = random.choice(FOLDERS)
+        result = result.format(folder=folder) if isinstance(result, str) else result
+        start = time.perf_counter()
+        history = context.messages(mode, "now do the same for Music")
+        selects.append(time.perf_counter() - start)
+        largest = max(largest, sum((len(m["content"]) + 3) // 4 + 4 for m in history))
+        context.add(mode, instruction.format(folder=folder), result)
+
+    selects.sort()
+    stats = context.stats
+    print(f"{jobs} jobs, budget {context.budget} tokens, ring of {context.turns.maxlen} turns")
+    print(f"  history on {stats['with_history']}/{stats['requests']} requests, "
+          f"avg {stats['history_tokens'] / max(1, stats['with_history']):.0f} tokens, largest {largest}")
+    print(f"  selection p50 {selects[len(selects) // 2] * 1e6:.0f} us, p99 {selects[int(len(selects) * 0.99)] * 1e6:.0f} us")
+
+    context.add("command", "show the size of Downloads", "du -sh ~/Downloads")
+    for instruction in ("now do the same for Pictures", "compress Documents into a zip"):
+        print(f"\n  {instruction!r} is sent after:")
+        for message in context.messages("command", instruction):
+            print(f"    {message['role']:9} {message['content']}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,127 @@
+"""
+Calendar instructions: refine latency with the local event parser vs an LLM call for each.
+
+A mix of calendar utterances (relative and absolute dates, 12/24-hour times,
+durations, ranges, explicit time zones, plus recurring and vague ones the
+parser leaves to the LLM) goes through refine_instruction twice: first with
+every instruction refined by the LLM, as before, then with the local parser
+in front of it. The LLM is a stub backend (stub_llm_server.py) answering in
+500 ms; the location resolver is stubbed to Casablanca. At the end, dates the
+parser cannot read ("11/05", "the 5th") are checked to go to the LLM rather
+than be booked for today, evening words to move a bare hour past noon, and
+meal words ("lunch with Bob") to stay in the title.
+
+Run from src/: python benchmarks/bench_event_parser.py [rounds]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+server = StubLLMServer(
+    delay=0.5,
+    content="Title: Event, Description: Event, Start: 2026-10-20T10:00:00, End: 2026-10-20T11:00:00, "
+            "Timezone: Africa/Casablanca").start()
+os.environ.update({
+    "NEBIUS_API_KEY": "benchmark",
+    "NEBIUS_BASE_URL": server.base_url,
+    "MODEL": "stub",
+    "LLM_HEDGING": "0",
+    "LLM_REUSE_TTL": "0",
+    "LLM_LEDGER_ENABLED": "0",
+    "LOCATION_CACHE": os.path.join(tempfile.mkdtemp(), "location.json"),
+})
+
+from taskcrafters_agent import event_parser
+from taskcrafters_agent import real_time_response as rtr
+
+UTTERANCES = [
+    "schedule a meeting with the design team on friday at 3pm",
+    "add a calendar event tomorrow at 9:30 for the dentist",
+    "add a lunch meeting with Anna on March 5th from 12 to 1:30pm (EST)",
+    "create an event call with the Tokyo office on 2026-11-03 at 08:00 Asia/Tokyo for 30 minutes",
+    "put a standup in my calendar today at 10",
+    "schedule a review meeting in 3 days at noon for 2 hours",
+    "put gym in my calendar tomorrow evening",
+    "schedule a meeting with Paul next monday 16:00-16:45 London time",
+    "create an event every monday at 9 for the weekly sync",
+    "schedule a meeting with Sam sometime next week",
+]
+# Dates the rules do not read; booking these locally would put them on the wrong day
+MUST_FALL_BACK = [
+    "schedule a meeting on the 5th at 3pm",
+    "schedule a meeting on 11/05 at 3pm",
+    "add a calendar event on 5.11. at 10",
+    "create an event on 2026-13-01 at 9am",
+]
+# Evening words move a bare hour past noon
+MUST_READ = [
+    ("schedule a dinner event at 8 tonight", "T20:00:00"),
+    ("meeting tomorrow 7-9 in the evening", "T19:00:00"),
+]
+# A meal names the event as well as its time, so it stays in the title
+MUST_TITLE = [
+    ("add a lunch with Bob friday at noon to my calendar", "Lunch with Bob"),
+    ("schedule a meeting with Bob friday at lunch", "Meeting with Bob"),
+]
+
+
+def stub_location():
+    return {"city": "Casablanca", "region": "Casablanca-Settat", "country": "MA"}
+
+
+def refine_all(rounds, tag):
+    latencies = []
+    for n in range(rounds):
+        for utterance in UTTERANCES:
+            start = time.perf_counter()
+            rtr.refine_instruction(f"{utterance} ({tag} #{n})")
+            latencies.append(time.perf_counter() - start)
+    return sum(latencies) / len(latencies)
+
+
+def main(rounds):
+    rtr.location_resolver.get = stub_location
+    parse_event = rtr.parse_event
+    sys.stdout = open(os.devnull, "w")
+    rtr.parse_event = lambda *args, **kwargs: None
+    calls_before = server.requests
+    llm_only = refine_all(rounds, "before")
+    llm_calls = server.requests - calls_before
+    rtr.parse_event = parse_event
+    event_parser.EVENT_PARSE_STATS.update(attempts=0, parsed=0, parse_seconds=0.0, saved_seconds=0.0)
+    calls_before = server.requests
+    local_first = refine_all(rounds, "after")
+    local_calls = server.requests - calls_before
+    sys.stdout = sys.__stdout__
+    stats = event_parser.get_event_parse_stats()
+
+    total = rounds * len(UTTERANCES)
+    print(f"{total} calendar instructions, LLM 500 ms per call")
+    print(f"  LLM refine for all  : {llm_only * 1000:6.1f} ms mean, {llm_calls} LLM calls")
+    print(f"  local parser first  : {local_first * 1000:6.1f} ms mean, {local_calls} LLM calls")
+    print(f"  local coverage {stats['coverage']:.0%}, {stats['parse_seconds'] / stats['attempts'] * 1e6:.0f} us per "
+          f"parse attempt, {stats['saved_seconds']:.1f} s of estimated refine time saved")
+    for utterance in UTTERANCES:
+        event = event_parser.parse_event(utterance, "Africa/Casablanca", record=False)
+        print(f"    {utterance[:60]:60} -> {rtr.format_calendar_input(event) if event else 'LLM'}")
+    for utterance in MUST_FALL_BACK:
+        event = event_parser.parse_event(utterance, "Africa/Casablanca", record=False)
+        print(f"  {'ok' if event is None else 'WRONG':5} {utterance:60} -> {'LLM' if event is None else event[2]}")
+    for utterance, expected in MUST_READ:
+        event = event_parser.parse_event(utterance, "Africa/Casablanca", record=False)
+        print(f"  {'ok' if event and event[2].endswith(expected) else 'WRONG':5} {utterance:60} -> "
+              f"{event[2] if event else 'LLM'}")
+    for utterance, expected in MUST_TITLE:
+        event = event_parser.parse_event(utterance, "Africa/Casablanca", record=False)
+        print(f"  {'ok' if event and event[0] == expected else 'WRONG':5} {utterance:60} -> "
+              f"{event[0] if event else 'LLM'}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
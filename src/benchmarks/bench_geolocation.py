@@ -0,0 +1,108 @@
+"""
+Geolocation: what a weather or calendar question waits for before its first LLM call.
+
+The old path asks ipify for the public IP and ipinfo for its location on every
+question; both are stubs here at ~150 ms each. The location resolver answers
+from memory and refreshes in the background, so the same questions are timed
+through LocationResolver.get(), first with an expired cache (the refresh runs
+behind the answers) and then after a simulated network change. A synthetic
+IP range database of 500,000 ranges is built in a temporary directory to time
+opening it and looking addresses up, which is what replaces the ipinfo call.
+
+Run from src/: python benchmarks/bench_geolocation.py [questions]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taskcrafters_agent import geolocation
+from taskcrafters_agent.geolocation import IPRangeDB, LocationResolver, build_ip_db
+
+calls = {"network": 0}
+network = {"address": "192.168.1.20", "ip": "81.2.69.160"}
+
+
+def stub_user_ip():
+    calls["network"] += 1
+    time.sleep(random.gauss(0.15, 0.03))
+    return network["ip"]
+
+
+def stub_location(ip_address):
+    calls["network"] += 1
+    time.sleep(random.gauss(0.15, 0.03))
+    return {"city": f"City of {ip_address}", "region": "Region", "country": "GB"}
+
+
+def ip(number):
+    return ".".join(str(number >> shift & 255) for shift in (24, 16, 8, 0))
+
+
+def synthetic_ranges(count):
+    step = (2 ** 32 - 1) // count
+    for n in range(count):
+        start = n * step
+        yield ip(start), ip(start + step - 2), f"City {n % 20000}", f"Region {n % 500}", f"C{n % 200}"
+
+
+def percentiles(values):
+    values = sorted(values)
+    return values[len(values) // 2], values[min(len(values) - 1, int(len(values) * 0.95))]
+
+
+def main(total):
+    random.seed(9)
+    directory = tempfile.mkdtemp()
+
+    old = []
+    for _ in range(min(total, 20)):
+        start = time.monotonic()
+        stub_location(stub_user_ip())
+        old.append(time.monotonic() - start)
+
+    calls["network"] = 0
+    geolocation.network_fingerprint = lambda: network["address"]
+    resolver = LocationResolver(stub_user_ip, stub_location, os.path.join(directory, "location.json"), poll=0.05)
+    resolver._save({"ip": "81.2.69.1", "location": {"city": "Old City", "region": "", "country": "GB"},
+                    "resolved": time.time() - 86400, "network": network["address"]})
+    resolver._state = resolver._load()
+    sys.stdout = open(os.devnull, "w")
+    cached, cities = [], set()
+    for n in range(total):
+        if n == total // 2:
+            network.update(address="10.0.0.7", ip="203.0.113.9")
+        start = time.monotonic()
+        cities.add(resolver.get()["city"])
+        cached.append(time.monotonic() - start)
+        time.sleep(0.01)
+    sys.stdout = sys.__stdout__
+
+    start = time.monotonic()
+    ranges = build_ip_db(synthetic_ranges(500000), os.path.join(directory, "ranges.db"))
+    built = time.monotonic() - start
+    start = time.monotonic()
+    db = IPRangeDB(os.path.join(directory, "ranges.db"))
+    opened = time.monotonic() - start
+    addresses = [ip(random.randrange(2 ** 32)) for _ in range(20000)]
+    start = time.monotonic()
+    found = sum(db.lookup(address) is not None for address in addresses)
+    per_lookup = (time.monotonic() - start) / len(addresses)
+    db.close()
+
+    stats = resolver.stats
+    print(f"{total} location lookups, ipify and ipinfo stubs ~150 ms each")
+    print("  per question (old): p50 {:6.1f} ms, p95 {:6.1f} ms".format(*(v * 1000 for v in percentiles(old))))
+    print("  resolver.get()    : p50 {:6.3f} ms, p95 {:6.3f} ms".format(*(v * 1000 for v in percentiles(cached))) +
+          f", {calls['network']} network calls in the background")
+    print(f"                      {stats['refreshes']} refreshes ({stats['network_changes']} on a network change), "
+          f"cities served: {', '.join(sorted(cities))}")
+    print(f"  range database    : {ranges} ranges built in {built:.1f}s ({os.path.getsize(db._file.name) / 1e6:.1f} MB), "
+          f"opened in {opened * 1000:.2f} ms, {per_lookup * 1e6:.1f} us per lookup, {found} of {len(addresses)} found")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
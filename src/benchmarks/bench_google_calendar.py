@@ -0,0 +1,107 @@
+"""
+Calendar event creation: per-event latency with and without the shared Google service manager.
+
+A stub Google server (stub_google_server.py) answers inserts in 100 ms and
+token refreshes in 200 ms. The old path, as create_google_calendar_event was
+written before, reads token.json, checks it and builds the calendar client
+from the discovery document for every event. The new one goes through
+google_services.GoogleServices, which keeps the credentials, the parsed
+document and the authorized HTTP session. Each path creates the same events
+one after the other with a token that expires a few seconds into the run, so
+the old path refreshes it inline and the new one in the background.
+
+Needs the Google client libraries (requirements.txt).
+
+Run from src/: python benchmarks/bench_google_calendar.py [events]
+"""
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_google_server import StubGoogleServer
+from google_services import CALENDAR_SCOPES, GoogleServices
+
+EVENT = {
+    'summary': 'Design review',
+    'description': 'Benchmark event',
+    'start': {'dateTime': '2026-10-20T15:00:00', 'timeZone': 'UTC'},
+    'end': {'dateTime': '2026-10-20T16:00:00', 'timeZone': 'UTC'},
+}
+
+
+def write_token(path, server, expires_in):
+    expiry = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=expires_in)
+    with open(path, "w") as f:
+        json.dump({"token": "stub-token", "refresh_token": "stub-refresh", "token_uri": server.token_uri,
+                   "client_id": "stub-client", "client_secret": "stub-secret", "scopes": CALENDAR_SCOPES,
+                   "expiry": expiry.strftime("%Y-%m-%dT%H:%M:%SZ")}, f)
+
+
+def old_create_event(token_path, server):
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
+    from googleapiclient.discovery import build
+
+    creds = Credentials.from_authorized_user_file(token_path, CALENDAR_SCOPES)
+    if not creds.valid:
+        creds.refresh(Request())
+        with open(token_path, 'w') as token_file:
+            token_file.write(creds.to_json())
+    service = build('calendar', 'v3', credentials=creds, client_options={"api_endpoint": server.base_url})
+    return service.events().insert(calendarId='primary', body=EVENT).execute()
+
+
+def new_create_event(services):
+    service = services.service('calendar', 'v3', CALENDAR_SCOPES)
+    return service.events().insert(calendarId='primary', body=EVENT).execute()
+
+
+def timed(total, create, pause):
+    latencies = []
+    for _ in range(total):
+        start = time.monotonic()
+        create()
+        latencies.append(time.monotonic() - start)
+        time.sleep(pause)
+    return latencies
+
+
+def report(label, latencies, refreshes):
+    rest = sorted(latencies[1:])
+    print(f"  {label}: first {latencies[0] * 1000:5.0f} ms, then p50 {rest[len(rest) // 2] * 1000:5.0f} ms, "
+          f"max {rest[-1] * 1000:5.0f} ms, {refreshes} token refreshes")
+
+
+def main(total):
+    server = StubGoogleServer(delay=0.1, token_delay=0.2).start()
+    directory = tempfile.mkdtemp()
+    # Expires partway through the run, inside the manager's refresh margin from the start
+    expires_in = total * 0.15 / 2
+
+    token_path = os.path.join(directory, "old_token.json")
+    write_token(token_path, server, expires_in)
+    old = timed(total, lambda: old_create_event(token_path, server), 0.05)
+    old_refreshes = server.token_requests
+
+    token_path = os.path.join(directory, "token.json")
+    write_token(token_path, server, expires_in)
+    services = GoogleServices(token_path, discovery_cache=os.path.join(directory, "discovery"),
+                              client_options={"api_endpoint": server.base_url})
+    new = timed(total, lambda: new_create_event(services), 0.05)
+
+    print(f"{total} events, stub inserts 100 ms, token refresh 200 ms, token expiring after {expires_in:.1f}s")
+    report("per event (old)", old, old_refreshes)
+    report("shared manager ", new, server.token_requests - old_refreshes)
+    print(f"  manager: {services.stats['token_loads']} token loads, {services.stats['documents_loaded']} discovery "
+          f"documents parsed, {services.stats['sessions']} HTTP sessions, "
+          f"{services.stats['background_refreshes']} background refreshes")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
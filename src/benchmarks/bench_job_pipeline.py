@@ -0,0 +1,90 @@
+"""
+Scripted-session throughput: one command per round trip vs. pipelined job cards.
+
+Stages are stubbed with sleeps so the numbers reflect scheduling only. Timings are
+in seconds of a real session and are compressed by --scale when running.
+
+Run from src/: python benchmarks/bench_job_pipeline.py [command_count] [scale]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jobs import AWAITING_CONFIRMATION, DONE, EXECUTING, GENERATING, TRANSCRIBING, JobBoard
+from pipeline import PipelineEngine
+
+# Seconds per command in a typical session
+SPEAK = 4.0       # user dictating one command
+TRANSCRIBE = 1.5  # Whisper on CPU, one utterance at a time
+GENERATE = 3.0    # LLM round trip
+CONFIRM = 1.5     # user reading the card and clicking Execute
+EXECUTE = 0.5     # running the command / sending the email
+
+
+def run_session(count, scale, pipelined):
+    engine = PipelineEngine()
+    board = JobBoard(max_finished=count)
+
+    def pause(seconds):
+        time.sleep(seconds * scale)
+
+    async def process(job):
+        job.advance(TRANSCRIBING)
+        await engine.run_cpu("transcribe", time.sleep, TRANSCRIBE * scale)
+        job.advance(GENERATING)
+        await engine.stage("generate", asyncio.sleep(GENERATE * scale))
+        job.result = f"echo command {job.id}"
+        job.advance(AWAITING_CONFIRMATION)
+
+    async def execute(job):
+        await engine.run_blocking("execute", time.sleep, EXECUTE * scale)
+        board.complete(job)
+
+    def confirm(job):
+        pause(CONFIRM)
+        job.advance(EXECUTING)
+        engine.submit(execute(job))
+
+    def wait_for(predicate):
+        while not predicate():
+            time.sleep(0.001)
+
+    for _ in range(count):
+        pause(SPEAK)
+        job = board.create("command")
+        engine.submit(process(job))
+        if pipelined:
+            # Between recordings the user confirms whatever cards are ready
+            while board.next_awaiting():
+                confirm(board.next_awaiting())
+        else:
+            wait_for(lambda: job.status == AWAITING_CONFIRMATION)
+            confirm(job)
+            wait_for(lambda: job.status == DONE)
+
+    while not all(job.status == DONE for job in board.jobs()):
+        job = board.next_awaiting()
+        if job:
+            confirm(job)
+        else:
+            time.sleep(0.001)
+
+    throughput = board.commands_per_minute() * scale
+    engine.shutdown()
+    return throughput
+
+
+def main(count, scale):
+    print(f"{count} commands; speak {SPEAK}s, transcribe {TRANSCRIBE}s, generate {GENERATE}s, "
+          f"confirm {CONFIRM}s, execute {EXECUTE}s (time scale {scale})")
+    sequential = run_session(count, scale, pipelined=False)
+    pipelined = run_session(count, scale, pipelined=True)
+    print(f"  one round trip at a time: {sequential:5.1f} commands/min")
+    print(f"  pipelined job cards:      {pipelined:5.1f} commands/min ({pipelined / sequential:.2f}x)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10, float(sys.argv[2]) if len(sys.argv) > 2 else 0.05)
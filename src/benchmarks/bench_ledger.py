@@ -0,0 +1,84 @@
+"""
+LLM call ledger: metering overhead, time to first token and the report.
+
+A stub backend (stub_llm_server.py) answers in 350 ms and streams its first
+token after 70 ms. A batch of distinct command and email requests goes through
+the client into a temporary ledger. A week of synthetic history, faster than
+the stub is today, is added before it and the report is printed so the
+regression flags can be seen.
+
+Run from src/: python benchmarks/bench_ledger.py [requests]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+server = StubLLMServer(delay=0.35, ttft_share=0.2).start()
+path = os.path.join(tempfile.mkdtemp(), "llm_ledger.jsonl")
+os.environ.update({
+    "NEBIUS_API_KEY": "benchmark",
+    "NEBIUS_BASE_URL": server.base_url,
+    "MODEL": "stub",
+    "LLM_HEDGING": "0",
+    "LLM_REUSE_TTL": "0",
+    "LLM_LEDGER": path,
+})
+
+import ledger
+from prompts import llm_client
+
+
+def write_history(days=7, calls=30):
+    """Earlier days at a steady 250 ms so today's calls have something to be compared with."""
+    now = time.time()
+    with open(path, "w", encoding="utf-8") as f:
+        for day in range(days, 0, -1):
+            for n in range(calls):
+                for mode in ("command", "email"):
+                    ms = random.gauss(250 if mode == "command" else 330, 15)
+                    f.write(ledger.json.dumps({"ts": now - day * 86400 + n, "mode": mode, "src": "app",
+                                               "backend": "nebius", "model": "stub", "pt": 40, "ct": 12,
+                                               "ttft": round(ms * 0.2), "ms": round(ms)}) + "\n")
+
+
+async def run(total):
+    async def one(n):
+        mode = "command" if n % 2 else "email"
+        messages = [{"role": "user", "content": f"{mode} request #{n}"}]
+        await llm_client.acreate_completion(mode, model="stub", messages=messages)
+
+    await asyncio.gather(*(one(n) for n in range(total)))
+
+
+def main(total):
+    write_history()
+
+    start = time.perf_counter()
+    for n in range(10000):
+        ledger.record("overhead", "bench", "nebius", "stub", 40, 12, 0.25, 0.05)
+    per_record = (time.perf_counter() - start) / 10000
+    # Keep the overhead samples out of the report
+    ledger._file.close()
+    ledger._file = None
+    lines = open(path, encoding="utf-8").read().splitlines()
+    line_bytes = len(lines[-1]) + 1
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(line + "\n" for line in lines if '"overhead"' not in line)
+
+    sys.stdout = open(os.devnull, "w")
+    asyncio.run(run(total))
+    sys.stdout = sys.__stdout__
+
+    print(f"ledger.record: {per_record * 1e6:.1f} us per call, {line_bytes} bytes per line")
+    ledger.report(path, 14)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
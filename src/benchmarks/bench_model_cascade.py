@@ -0,0 +1,105 @@
+"""
+Model cascade: escalation rate, latency and large-model tokens saved per mode.
+
+A stub backend (stub_llm_server.py) serves a "large" model at 600 ms that always
+answers correctly and a "small" one at 150 ms that gets about one answer in six
+wrong: a command with broken shell syntax, or a Jira operation with a missing
+field. The same instructions run through get_cmd_prompt and get_jira_prompt,
+first with the large model only, then with the cascade.
+
+Run from src/: python benchmarks/bench_model_cascade.py [rounds]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+SMALL_ERROR_RATE = 1 / 6
+
+COMMANDS = {
+    "list all files including hidden ones": ("ls -la", "ls -la |"),
+    "show disk usage of the home folder": ("du -sh ~", "du -sh ~ && ("),
+    "find python files changed today": ("find . -name '*.py' -mtime 0", "find . -name '*.py -mtime 0"),
+    "count lines in every log file": ("for f in *.log; do wc -l \"$f\"; done", "for f in *.log; do wc -l \"$f\";"),
+}
+JIRA = {
+    "list all projects": {"operation": "list_project"},
+    "create a bug in DEV about the login page": {
+        "operation": "create_issue",
+        "params": {"issue_name": "Login page broken", "description": "Login fails", "project_key": "DEV",
+                   "task_type": "bug"},
+    },
+    "list issues from the last 3 days": {"operation": "fetch_recent_issues", "params": {"days": "3"}},
+}
+
+
+def answer(request):
+    instruction = request["messages"][-1]["content"]
+    wrong = request["model"] == "small" and random.random() < SMALL_ERROR_RATE
+    if instruction in COMMANDS:
+        good, bad = COMMANDS[instruction]
+        return bad if wrong else good
+    data = dict(JIRA[instruction])
+    if wrong:
+        data.pop("params", None)
+        data["operation"] = data["operation"].replace("list_project", "list_projects")
+    return json.dumps(data)
+
+
+server = StubLLMServer(content=answer, model_delays={"large": 0.6, "small": 0.15}).start()
+os.environ.update({
+    "NEBIUS_API_KEY": "benchmark",
+    "NEBIUS_BASE_URL": server.base_url,
+    "MODEL": "large",
+    "SMALL_MODEL": "small",
+    "LLM_HEDGING": "0",
+    # Every request repeats the same prompt; reusing answers would hide what is being measured
+    "LLM_REUSE_TTL": "0",
+    "LLM_RESPONSE_FORMAT": "none",
+})
+
+from prompts import cascade, get_cmd_prompt, get_jira_prompt
+
+
+def run(rounds):
+    random.seed(7)
+    timings = {"command": [], "jira": []}
+    failures = 0
+    for _ in range(rounds):
+        for mode, instructions, prompt in (("command", COMMANDS, get_cmd_prompt), ("jira", JIRA, get_jira_prompt)):
+            for instruction in instructions:
+                start = time.perf_counter()
+                _, error = prompt(instruction)
+                timings[mode].append(time.perf_counter() - start)
+                failures += error is not None
+    return timings, failures
+
+
+def main(rounds):
+    sys.stdout = open(os.devnull, "w")
+    cascade.SMALL_MODEL = None
+    baseline, baseline_failures = run(rounds)
+    cascade.SMALL_MODEL = "small"
+    cascaded, cascaded_failures = run(rounds)
+    stats = cascade.get_cascade_stats()
+    sys.stdout = sys.__stdout__
+
+    print(f"Small model wrong {SMALL_ERROR_RATE:.0%} of the time; large 600 ms, small 150 ms")
+    for mode in ("command", "jira"):
+        large_ms = sum(baseline[mode]) / len(baseline[mode]) * 1000
+        cascade_ms = sum(cascaded[mode]) / len(cascaded[mode]) * 1000
+        mode_stats = stats[mode]
+        print(f"  {mode:8} large only {large_ms:4.0f} ms, cascade {cascade_ms:4.0f} ms "
+              f"({mode_stats['escalation_rate']:.0%} escalated), "
+              f"{mode_stats['tokens_offloaded']:.0f} tokens moved to the small model, "
+              f"{mode_stats['tokens_wasted']:.0f} wasted on rejected answers")
+    print(f"  failed instructions: large only {baseline_failures}, cascade {cascaded_failures}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
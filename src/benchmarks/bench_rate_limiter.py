@@ -0,0 +1,74 @@
+"""
+Client-side rate limiting: 429s, failures and queue wait for a burst of LLM requests.
+
+A stub backend (stub_llm_server.py) answering in 200 ms enforces 600 RPM with
+bursts of 20 and answers anything above that with 429 + Retry-After. A
+burst of distinct command requests is sent at once: first with the client-side
+limit effectively off, so only Retry-After handling applies, then with the limiter
+configured just under the provider quota.
+
+Run from src/: python benchmarks/bench_rate_limiter.py [requests]
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+server = StubLLMServer(delay=0.2, quota=20, quota_window=2.0).start()
+os.environ.update({
+    "NEBIUS_API_KEY": "benchmark",
+    "NEBIUS_BASE_URL": server.base_url,
+    "MODEL": "stub",
+    "LLM_HEDGING": "0",
+})
+
+import ratelimit
+from prompts import llm_client
+
+SCENARIOS = {
+    "Retry-After only": {"llm": {"rpm": 100000, "concurrency": 100}},
+    "Limiter at 570 RPM": {"llm": {"rpm": 570, "concurrency": 8}},
+}
+
+
+async def burst(total, tag):
+    async def one(n):
+        messages = [{"role": "user", "content": f"{tag} request #{n}"}]
+        try:
+            await llm_client.acreate_completion("command", model="stub", messages=messages)
+            return True
+        except Exception:
+            return False
+
+    return await asyncio.gather(*(one(n) for n in range(total)))
+
+
+def main(total):
+    sys.stdout = open(os.devnull, "w")
+    results = {}
+    for name, limits in SCENARIOS.items():
+        os.environ["RATE_LIMITS"] = json.dumps(limits)
+        ratelimit._LIMITERS.clear()
+        # Let the provider's quota refill between scenarios
+        time.sleep(server.quota_window)
+        rejected_before = server.rejected
+        start = time.monotonic()
+        outcomes = asyncio.run(burst(total, name))
+        elapsed = time.monotonic() - start
+        stats = ratelimit.get_rate_limit_stats()["llm:nebius"]
+        results[name] = (outcomes.count(False), server.rejected - rejected_before, elapsed, stats)
+    sys.stdout = sys.__stdout__
+
+    print(f"{total} concurrent requests, provider quota 600 RPM (burst 20), 200 ms per answer")
+    for name, (failed, rejected, elapsed, stats) in results.items():
+        print(f"  {name:19}: {failed} failed, {rejected:3} answered 429, done in {elapsed:4.1f}s, "
+              f"queued {stats['queued']}, avg wait {stats['avg_wait_ms']:4.0f} ms, max wait {stats['max_wait']:.1f}s")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 60)
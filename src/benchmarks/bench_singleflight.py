@@ -0,0 +1,74 @@
+"""
+Request coalescing: backend calls and latency for a burst of repeated instructions.
+
+A stub backend (stub_llm_server.py) answers in 400 ms. The workload mixes
+distinct instructions with the repeats seen in practice: the same instruction
+issued twice at once (a speculative and a final generation, a double click) and
+the user repeating themselves a few seconds later. It runs once calling the
+client directly and once through the coalescing layer.
+
+Run from src/: python benchmarks/bench_singleflight.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+server = StubLLMServer(delay=0.4).start()
+os.environ.update({
+    "NEBIUS_API_KEY": "benchmark",
+    "NEBIUS_BASE_URL": server.base_url,
+    "MODEL": "stub",
+    "LLM_HEDGING": "0",
+})
+
+from prompts import llm_client
+from singleflight import get_singleflight_stats
+
+# (seconds after start, instruction); identical instructions overlap or follow closely
+WORKLOAD = [
+    (0.0, "list all files"), (0.1, "list all files"),
+    (0.5, "show disk usage"),
+    (1.0, "what is my ip address"), (1.05, "what is my ip address"), (1.1, "what is my ip address"),
+    (2.0, "list all files"),
+    (2.5, "kill the process on port 8080"),
+    (3.0, "show disk usage"), (3.2, "show disk usage"),
+    (4.0, "create a folder called test"),
+]
+
+
+async def replay(create):
+    latencies = []
+
+    async def one(at, instruction):
+        await asyncio.sleep(at)
+        start = time.monotonic()
+        await create("command", "large", model="stub", messages=[{"role": "user", "content": instruction}])
+        latencies.append(time.monotonic() - start)
+
+    await asyncio.gather(*(one(at, instruction) for at, instruction in WORKLOAD))
+    return latencies
+
+
+def main():
+    sys.stdout = open(os.devnull, "w")
+    results = {}
+    for name, create in (("direct", llm_client._acreate_completion), ("coalesced", llm_client.acreate_completion)):
+        before = server.requests
+        latencies = asyncio.run(replay(create))
+        results[name] = (server.requests - before, sum(latencies) / len(latencies))
+    stats = get_singleflight_stats()["llm"]
+    sys.stdout = sys.__stdout__
+
+    print(f"{len(WORKLOAD)} instructions, {len({i for _, i in WORKLOAD})} distinct, backend 400 ms")
+    for name, (requests, average) in results.items():
+        print(f"  {name:9}: {requests:2} backend calls, avg latency {average * 1000:3.0f} ms")
+    print(f"  coalesced in flight: {stats['coalesced']}, reused within {llm_client.LLM_REUSE_TTL:g}s: {stats['reused']}")
+
+
+if __name__ == "__main__":
+    main()
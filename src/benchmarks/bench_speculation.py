@@ -0,0 +1,79 @@
+"""
+Speculative generation: hit rate, wasted tokens and hidden latency per stability threshold.
+
+Replays scripted partial-transcript sequences (one partial per 1.5 s tick, the
+last entry being the final transcript) against a stubbed generation that takes
+GENERATE seconds and spends PROMPT_TOKENS + COMPLETION_TOKENS.
+
+Run from src/: python benchmarks/bench_speculation.py [scale]
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("NEBIUS_API_KEY", "benchmark")
+
+import speculation
+from prompts.token_usage import USAGE_SINK
+from speculation import Speculator, get_speculation_stats
+
+TICK = 1.5
+GENERATE = 2.5
+PROMPT_TOKENS = 220
+COMPLETION_TOKENS = 30
+
+SESSIONS = [
+    ["list all", "list all files", "list all files", "list all files in downloads", "list all files in downloads",
+     "list all files in downloads."],
+    ["open the", "open the terminal", "open the terminal", "open the terminal", "Open the terminal."],
+    ["send an email", "send an email to sarah", "send an email to sarah", "send an email to sarah about the",
+     "send an email to sarah about the report", "send an email to sarah about the report",
+     "Send an email to Sarah about the report."],
+    ["create a jira", "create a jira issue", "create a jira issue called", "create a jira issue called login bug",
+     "Create a Jira issue called login bug."],
+    ["what's", "what's the disk", "what's the disk usage", "what's the disk usage", "what's the disk usage",
+     "What's the disk usage?"],
+    ["delete", "delete the temp", "delete the temp", "delete the temp folder", "delete the temp folder",
+     "delete the temp folder on my desktop"],
+]
+
+
+async def fake_generate(text, scale):
+    try:
+        await asyncio.sleep(GENERATE * scale)
+    except asyncio.CancelledError:
+        USAGE_SINK.get()["prompt_tokens"] = USAGE_SINK.get().get("prompt_tokens", 0) + PROMPT_TOKENS
+        raise
+    sink = USAGE_SINK.get()
+    sink["prompt_tokens"] = sink.get("prompt_tokens", 0) + PROMPT_TOKENS
+    sink["completion_tokens"] = sink.get("completion_tokens", 0) + COMPLETION_TOKENS
+    return text
+
+
+async def replay(stability, scale):
+    for key in speculation.SPECULATION_STATS:
+        speculation.SPECULATION_STATS[key] = 0
+    for partials in SESSIONS:
+        speculator = Speculator(lambda text: fake_generate(text, scale), stability)
+        for partial in partials[:-1]:
+            speculator.observe(partial)
+            await asyncio.sleep(TICK * scale)
+        await speculator.resolve(partials[-1])
+        speculator.discard()
+    await asyncio.sleep(0.01)
+    return get_speculation_stats()
+
+
+def main(scale):
+    print(f"{len(SESSIONS)} utterances, partial every {TICK}s, generation {GENERATE}s "
+          f"({PROMPT_TOKENS}+{COMPLETION_TOKENS} tokens)")
+    for stability in (1, 2, 3):
+        stats = asyncio.run(replay(stability, scale))
+        print(f"  stability {stability}: hit rate {stats['hit_rate']:4.0%} ({stats['hits']:.0f}/{len(SESSIONS)} utterances "
+              f"served speculatively), started {stats['started']:.0f}, "
+              f"wasted {stats['wasted_tokens']:5.0f} tokens, latency hidden {stats['saved_seconds'] / scale:5.1f}s")
+
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 0.02)
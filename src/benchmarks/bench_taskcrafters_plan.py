@@ -0,0 +1,117 @@
+"""
+Taskcrafters pipeline plans: p50/p95 of generate_response with stubbed LLM and tools.
+
+The helper LLM calls go to a stub backend (stub_llm_server.py) answering in
+500 ms; about one answer in five is rewritten by the validator. The agent and
+the geolocation lookups are replaced by stubs with fixed latencies (agent
+1.2-2.4 s, location 400 ms, resolved in the background by the location
+resolver, so only the first weather or calendar question goes without it). A mix of weather, calendar and general questions
+is answered with the original sequential plan (refine, agent, validate,
+structure) and then with the budgeted planner at a roomy and a tight budget.
+
+Run from src/: python benchmarks/bench_taskcrafters_plan.py [requests]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+
+def answer(request):
+    prompt = request["messages"][-1]["content"]
+    if prompt.startswith("Validate") and hash(prompt) % 5 == 0:
+        return "Rewritten Response:\nA corrected answer to the question."
+    if prompt.startswith("Validate"):
+        return "The response is relevant, safe and accurate."
+    # Distinct per prompt, so no two questions share a call
+    return f"A short answer ({abs(hash(prompt)) % 10000})."
+
+
+server = StubLLMServer(delay=0.5, content=answer).start()
+os.environ.update({
+    "NEBIUS_API_KEY": "benchmark",
+    "NEBIUS_BASE_URL": server.base_url,
+    "MODEL": "stub",
+    "LLM_HEDGING": "0",
+    "LLM_REUSE_TTL": "0",
+    "TOOL_REUSE_TTL": "0",
+    "LLM_LEDGER_ENABLED": "0",
+    "LOCATION_CACHE": os.path.join(tempfile.mkdtemp(), "location.json"),
+})
+
+from taskcrafters_agent import real_time_response as rtr
+
+QUESTIONS = [
+    "what's the weather like tomorrow",
+    "schedule a meeting with the design team on friday at 3pm",
+    "who won the champions league last year",
+    "what is the population of canada",
+    "find a tutorial on python decorators",
+    "when is the next solar eclipse",
+]
+
+
+class StubAgent:
+    def run(self, query):
+        time.sleep(random.uniform(1.2, 2.4))
+        return f"Search results for: {query}"
+
+
+def stub_user_ip():
+    time.sleep(0.15)
+    return "203.0.113.7"
+
+
+def stub_location(ip_address):
+    time.sleep(0.25)
+    return {"city": "Casablanca", "region": "Casablanca-Settat", "country": "MA"}
+
+
+SCENARIOS = [
+    ("sequential (before)", "sequential", None),
+    ("auto, 15s budget", "auto", 15.0),
+    ("auto, 3s budget", "auto", 3.0),
+]
+
+
+def run(total, plan, budget):
+    rtr.TASKCRAFTERS_PLAN = plan
+
+    def one(n):
+        start = time.monotonic()
+        rtr.generate_response(f"{QUESTIONS[n % len(QUESTIONS)]} (#{n})", budget)
+        return time.monotonic() - start
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        return sorted(pool.map(one, range(total)))
+
+
+def main(total):
+    random.seed(3)
+    rtr._agents[rtr.agent_engine()] = StubAgent()
+    rtr.get_user_ip = stub_user_ip
+    rtr.get_location_from_ip = stub_location
+
+    results = {}
+    for label, plan, budget in SCENARIOS:
+        sys.stdout = open(os.devnull, "w")
+        calls_before = server.requests
+        latencies = run(total, plan, budget)
+        sys.stdout = sys.__stdout__
+        results[label] = (latencies, server.requests - calls_before)
+
+    print(f"{total} questions per plan, LLM 500 ms per call, agent 1.2-2.4 s")
+    for label, (latencies, calls) in results.items():
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"  {label:20}: p50 {p50:4.1f}s, p95 {p95:4.1f}s, {calls / total:.1f} LLM calls per question")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
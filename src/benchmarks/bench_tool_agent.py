@@ -0,0 +1,97 @@
+"""
+Native tool-calling agent: latency, model turns and tokens per question.
+
+A stub backend (stub_llm_server.py) answering in 400 ms plays the model. It asks
+for two independent lookups on the first turn and answers once it has tool
+results. Tools are stubs taking 600 ms each. The same questions run with the
+two calls in parallel, then one at a time. A last run has the model ask for
+tools forever, to show the iteration and time caps. Tokens come from the LLM
+ledger, written to a temporary file.
+
+Run from src/: python benchmarks/bench_tool_agent.py [questions]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_llm_server import StubLLMServer
+
+stubborn = {"on": False}
+
+
+def model(request):
+    messages = request["messages"]
+    question = messages[1]["content"]
+    if stubborn["on"] or not any(message["role"] == "tool" for message in messages):
+        if request.get("tool_choice") == "none":
+            return f"Best effort answer to: {question}"
+        return [("wikipedia", {"query": question}), ("duckduckgo_search", {"query": f"{question} latest"})]
+    return f"Answer to: {question}"
+
+
+server = StubLLMServer(delay=0.4, content=model).start()
+os.environ.update({
+    "NEBIUS_API_KEY": "benchmark",
+    "NEBIUS_BASE_URL": server.base_url,
+    "MODEL": "stub",
+    "LLM_HEDGING": "0",
+    "LLM_REUSE_TTL": "0",
+    "LLM_LEDGER": os.path.join(tempfile.mkdtemp(), "llm_ledger.jsonl"),
+})
+
+import ledger
+from taskcrafters_agent import tool_agent
+
+
+def lookup(query):
+    time.sleep(0.6)
+    return f"Stub result for {query}"
+
+
+TOOLS = [
+    {"name": name, "description": f"Looks up {name}", "func": lookup,
+     "parameters": {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]}}
+    for name in ("wikipedia", "duckduckgo_search")
+]
+
+
+def run(label, total, parallel, time_limit=tool_agent.AGENT_TIME_LIMIT):
+    tool_agent.MAX_PARALLEL_TOOLS = parallel
+    agent = tool_agent.ToolAgent(TOOLS, time_limit=time_limit, mode=label)
+    latencies = []
+    for n in range(total):
+        start = time.monotonic()
+        agent.run(f"question {n} for {label}")
+        latencies.append(time.monotonic() - start)
+    latencies.sort()
+    return latencies, agent.stats
+
+
+def main(total):
+    sys.stdout = open(os.devnull, "w")
+    results = [
+        ("parallel", *run("parallel", total, 4)),
+        ("serial", *run("serial", total, 1)),
+    ]
+    stubborn["on"] = True
+    results.append((f"capped at {tool_agent.AGENT_MAX_ITERATIONS}", *run("capped", 3, 4, time_limit=10.0)))
+    sys.stdout = sys.__stdout__
+
+    ledger._file.flush()
+    entries = list(ledger.read_entries(ledger.LEDGER_PATH))
+    print("Model 400 ms per turn, tools 600 ms each, two lookups per question")
+    for label, latencies, stats in results:
+        mode = label.split()[0]
+        usage = ledger.summarize([e for e in entries if e["mode"] == mode])
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"  {label:12}: p50 {p50:4.1f}s, p95 {p95:4.1f}s, {stats['iterations'] / stats['runs']:.1f} turns and "
+              f"{usage['tokens_per_call'] * usage['calls'] / stats['runs']:4.0f} tokens per question, "
+              f"{stats['capped']} capped")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,99 @@
+"""
+Tool result cache: latency and backend calls for a workload of repeated questions.
+
+A stub search tool answers in ~300 ms. Questions are drawn from a small pool
+with a skewed distribution (a few asked often, most rarely), with casing and
+punctuation varied so the normalized key does the matching. The clock is
+moved forward between rounds so some entries go stale and are served while a
+background refresh runs. A last run, with an instant tool, uses a small
+max_entries to show eviction. The cache lives in a temporary database.
+
+Run from src/: python benchmarks/bench_tool_cache.py [questions]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tool_cache
+from tool_cache import ToolCache
+
+calls = {"backend": 0}
+latency = {"seconds": 0.3}
+
+
+def search(query):
+    calls["backend"] += 1
+    if latency["seconds"]:
+        time.sleep(max(0.0, random.gauss(latency["seconds"], 0.05)))
+    return f"Stub result for {query}"
+
+
+def workload(total, pool_size):
+    questions = [f"who founded company number {n}" for n in range(pool_size)]
+    variants = [str.lower, str.upper, str.title, lambda q: q + "?", lambda q: "  " + q + "!"]
+    weights = [1.0 / (rank + 1) for rank in range(pool_size)]
+    return [random.choice(variants)(random.choices(questions, weights)[0]) for _ in range(total)]
+
+
+def replay(cache, questions, rounds, shift):
+    run = cache.cached("duckduckgo", search)
+    latencies = []
+    offset = 0.0
+    real_time = time.time
+    tool_cache.time.time = lambda: real_time() + offset
+    try:
+        for r in range(rounds):
+            for question in questions[r::rounds]:
+                start = time.monotonic()
+                run(question)
+                latencies.append(time.monotonic() - start)
+            offset += shift
+    finally:
+        tool_cache.time.time = real_time
+    latencies.sort()
+    return latencies
+
+
+def main(total):
+    random.seed(5)
+    questions = workload(total, 60)
+    directory = tempfile.mkdtemp()
+    ttl = tool_cache.TOOL_TTLS["duckduckgo"]
+
+    start = time.monotonic()
+    for question in questions[:20]:
+        search(question)
+    uncached = (time.monotonic() - start) / 20
+
+    calls["backend"] = 0
+    cache = ToolCache(os.path.join(directory, "cache.db"))
+    sys.stdout = open(os.devnull, "w")
+    latencies = replay(cache, questions, rounds=4, shift=ttl * 1.5)
+    time.sleep(0.5)
+    sys.stdout = sys.__stdout__
+    stats = cache.stats
+    print(f"{total} questions over 60 distinct ones, stub search 300 ms, clock moved 1.5 TTLs between 4 rounds")
+    print(f"  uncached     : mean {uncached * 1000:4.0f} ms, one backend call per question")
+    print(f"  cached       : p50 {latencies[len(latencies) // 2] * 1000:4.1f} ms, "
+          f"p95 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000:4.0f} ms, "
+          f"{calls['backend']} backend calls ({stats['refreshes']} background refreshes)")
+    print(f"                 {stats['hits']} fresh hits, {stats['stale_hits']} stale served, {stats['misses']} misses")
+    cache.close()
+
+    latency["seconds"] = 0.0
+    cache = ToolCache(os.path.join(directory, "small.db"), max_entries=20)
+    sys.stdout = open(os.devnull, "w")
+    replay(cache, workload(400, 200), rounds=1, shift=0)
+    sys.stdout = sys.__stdout__
+    kept = cache._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    print(f"  max 20 entries, 200 distinct questions: {cache.stats['evicted']} evicted, {kept} kept "
+          f"(trimmed back every {tool_cache.EVICT_EVERY} writes)")
+    cache.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
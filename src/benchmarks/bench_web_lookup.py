@@ -0,0 +1,82 @@
+"""
+Web lookup fan-out: search latency for one question, one tool at a time vs all at once.
+
+Stub backends answer in the shapes the real tools use (Tavily a list of
+{url, content}, Wikipedia "Page:/Summary:" blocks, DuckDuckGo plain text) with
+jittered latencies: Tavily ~300 ms, DuckDuckGo ~200 ms but 2 s one time in ten,
+Wikipedia ~150 ms. The sequential baseline calls the three tools back to back,
+as the ReAct agent does over three iterations (the LLM turns in between are not
+counted). The fan-out queries them at once with a 1.5 s per-tool timeout and
+stops at a quorum of two answers or a confident snippet.
+
+Run from src/: python benchmarks/bench_web_lookup.py [questions]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from taskcrafters_agent.web_lookup import WebLookup, get_web_lookup_stats
+
+FACT = "The Eiffel Tower is 330 metres tall and was completed in 1889 for the World's Fair in Paris."
+
+
+def tavily(query):
+    time.sleep(random.gauss(0.3, 0.05))
+    return [{"url": "https://example.com/eiffel", "content": FACT},
+            {"url": "https://example.com/paris", "content": f"Paris travel guide mentioning {query}."}]
+
+
+def duckduckgo(query):
+    time.sleep(2.0 if random.random() < 0.1 else random.gauss(0.2, 0.04))
+    return f"{FACT} It is the most visited paid monument in the world."
+
+
+def wikipedia(query):
+    time.sleep(random.gauss(0.15, 0.03))
+    return f"Page: Eiffel Tower\nSummary: {FACT}\n\nPage: Champ de Mars\nSummary: A public green space in Paris."
+
+
+BACKENDS = {"tavily": tavily, "duckduckgo": duckduckgo, "wikipedia": wikipedia}
+
+
+def percentiles(values):
+    values = sorted(values)
+    return values[len(values) // 2], values[min(len(values) - 1, int(len(values) * 0.95))]
+
+
+def main(total):
+    random.seed(11)
+    questions = [f"how tall is the eiffel tower #{n}" for n in range(total)]
+
+    sequential = []
+    for question in questions:
+        start = time.monotonic()
+        for func in BACKENDS.values():
+            func(question)
+        sequential.append(time.monotonic() - start)
+
+    lookup = WebLookup(BACKENDS, timeout=1.5, deadline=2.0)
+    fanout, answered, top = [], 0, None
+    sys.stdout = open(os.devnull, "w")
+    for question in questions:
+        start = time.monotonic()
+        snippets, info = lookup.lookup(question)
+        fanout.append(time.monotonic() - start)
+        answered += len(info["answered"])
+        top = snippets[0]
+    sys.stdout = sys.__stdout__
+
+    stats = get_web_lookup_stats()
+    print(f"{total} questions, three search backends")
+    print("  sequential : p50 {:4.0f} ms, p95 {:4.0f} ms".format(*(v * 1000 for v in percentiles(sequential))))
+    print("  fan-out    : p50 {:4.0f} ms, p95 {:4.0f} ms, {:.1f} backends used per question, "
+          "{} early exits, {} duplicates folded".format(*(v * 1000 for v in percentiles(fanout)), answered / total,
+                                                         stats["early_exits"], stats["duplicates"]))
+    print(f"  top snippet: [{'+'.join(top['sources'])}] score {top['score']:.2f}: {top['text'][:60]}...")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
@@ -0,0 +1,168 @@
+"""
+Minimal Google OAuth token and Calendar API server for benchmarks and local testing.
+
+POST /token answers a refresh with a new access token valid for `expires_in`
+seconds after `token_delay`. POST /calendar/v3/calendars/<id>/events inserts
+an event after `delay` and echoes it back with an id and htmlLink. POST
+/batch/calendar/v3 takes a multipart/mixed batch of such inserts, as the
+client's BatchHttpRequest sends it, and answers every part in one multipart
+response after `delay` plus `batch_item_delay` per part. Events for which
+`reject(event)` is true get a 400 (in a batch, only their part does). Point the
+Google client at it with client_options={"api_endpoint": server.base_url} and
+a token whose token_uri is server.token_uri.
+
+Run from src/: python benchmarks/stub_google_server.py --port 8002 --delay 0.1
+"""
+import argparse
+import email.parser
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional, Tuple
+
+_EVENTS_RE = re.compile(r"^/calendar/v3/calendars/([^/]+)/events")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class StubGoogleServer:
+    def __init__(self, port: int = 0, delay: float = 0.1, token_delay: float = 0.2, expires_in: int = 3600,
+                 batch_item_delay: float = 0.005, reject: Optional[Callable[[dict], bool]] = None):
+        self.delay = delay
+        self.token_delay = token_delay
+        self.expires_in = expires_in
+        self.batch_item_delay = batch_item_delay
+        self.reject = reject
+        self.requests = 0
+        self.batch_requests = 0
+        self.token_requests = 0
+        self.events = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), self._handler())
+        self._thread: threading.Thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/"
+
+    @property
+    def token_uri(self) -> str:
+        return f"http://127.0.0.1:{self.port}/token"
+
+    def insert(self, calendar_id: str, event: dict) -> dict:
+        with self._lock:
+            event_id = f"evt{next(self._ids)}"
+            stored = {**event, "id": event_id, "status": "confirmed",
+                      "htmlLink": f"https://calendar.google.com/event?eid={event_id}"}
+            self.events.append((calendar_id, stored))
+        return stored
+
+    def _call(self, path: str, body: bytes) -> Tuple[int, dict]:
+        match = _EVENTS_RE.match(path)
+        if not match:
+            return 404, {"error": {"code": 404, "message": f"Unknown path {path}"}}
+        event = json.loads(body or b"{}")
+        if self.reject and self.reject(event):
+            return 400, {"error": {"code": 400, "message": f"Rejected event {event.get('summary')}"}}
+        return 200, self.insert(match.group(1), event)
+
+    def _batch(self, content_type: str, body: bytes) -> Tuple[str, bytes]:
+        """Answers each application/http part of a multipart/mixed batch; returns the response type and body."""
+        message = email.parser.BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        boundary = f"batch_{uuid.uuid4().hex}"
+        parts = []
+        for part in message.get_payload():
+            request = part.get_payload(decode=True)
+            head, _, inner_body = request.replace(b"\r\n", b"\n").partition(b"\n\n")
+            path = head.split(b"\n", 1)[0].split(b" ")[1].decode()
+            status, payload = self._call(path, inner_body)
+            reason = "OK" if status == 200 else "Error"
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'].strip('<>')}>\r\n\r\n"
+                f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(payload)}\r\n"
+            )
+        return f"multipart/mixed; boundary={boundary}", ("".join(parts) + f"--{boundary}--\r\n").encode()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path == "/token":
+                    with stub._lock:
+                        stub.token_requests += 1
+                    time.sleep(stub.token_delay)
+                    self._send(200, {"access_token": f"stub-token-{time.monotonic()}", "token_type": "Bearer",
+                                     "expires_in": stub.expires_in})
+                    return
+                if self.path.startswith("/batch/"):
+                    with stub._lock:
+                        stub.batch_requests += 1
+                    content_type, payload = stub._batch(self.headers.get("Content-Type", ""), body)
+                    time.sleep(stub.delay + stub.batch_item_delay * payload.count(b"Content-ID"))
+                    self.send_response(200)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                    return
+                with stub._lock:
+                    stub.requests += 1
+                time.sleep(stub.delay)
+                self._send(*stub._call(self.path.split("?", 1)[0], body))
+
+        return Handler
+
+    def start(self) -> "StubGoogleServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--delay", type=float, default=0.1)
+    parser.add_argument("--token-delay", type=float, default=0.2)
+    args = parser.parse_args()
+    server = StubGoogleServer(args.port, args.delay, args.token_delay).start()
+    print(f"Stub Google API on {server.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Minimal OpenAI-compatible chat completions server for benchmarks and local testing.
+
+Every POST answers with a chat.completion after `delay` seconds (or the
+per-model delay in `model_delays`). A share `slow_rate` of requests takes
+`slow_delay` instead, a share `fail_rate` gets a 503, and a stopped server
+refuses connections like a dead backend. `content` is either a fixed answer or
+a callable that receives the request body and returns one; a list of
+(function name, arguments) pairs is answered as tool calls. With `quota` set,
+the server allows bursts of `quota` requests refilled at `quota` per
+`quota_window` seconds (a token bucket, like most API gateways); anything over
+gets a 429 with Retry-After. Streamed requests get their first token after
+`ttft_share` of the delay.
+
+Run from src/: python benchmarks/stub_llm_server.py --port 8001 --delay 0.2 --fail-rate 0.1
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+
+# Text, or (function name, arguments) pairs for tool calls
+Answer = Union[str, List[Tuple[str, dict]]]
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default backlog of 5 refuses connections during benchmark bursts
+    request_queue_size = 256
+
+
+class StubLLMServer:
+    def __init__(self, port: int = 0, delay: float = 0.1, fail_rate: float = 0.0, slow_rate: float = 0.0,
+                 slow_delay: float = 3.0, content: Union[str, Callable[[dict], Answer]] = "ls -la",
+                 model_delays: Optional[Dict[str, float]] = None, quota: Optional[int] = None,
+                 quota_window: float = 1.0, ttft_share: float = 0.5):
+        self.delay = delay
+        self.fail_rate = fail_rate
+        self.slow_rate = slow_rate
+        self.slow_delay = slow_delay
+        self.content = content
+        self.model_delays = model_delays or {}
+        self.quota = quota
+        self.ttft_share = ttft_share
+        self.quota_window = quota_window
+        self.requests = 0
+        self.rejected = 0
+        self._allowance = float(quota or 0)
+        self._allowance_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._server = _Server(("127.0.0.1", port), self._handler())
+        # Hedge losers are cancelled mid-response; their broken pipes are expected
+        self._server.handle_error = lambda request, client_address: None
+        self._thread: threading.Thread = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    retry_after = stub._over_quota()
+                if retry_after is not None:
+                    body = json.dumps({"error": {"message": "rate limit exceeded"}}).encode()
+                    self.send_response(429)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.send_header("Retry-After", f"{retry_after:.2f}")
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if random.random() < stub.fail_rate:
+                    self._send(503, {"error": {"message": "backend overloaded"}})
+                    return
+                model = request.get("model") or "stub"
+                delay = stub.model_delays.get(model, stub.delay)
+                delay = stub.slow_delay if random.random() < stub.slow_rate else delay
+                content = stub.content(request) if callable(stub.content) else stub.content
+                # Roughly four characters per token, like token_usage.estimate_tokens
+                tool_calls = None
+                if isinstance(content, list):
+                    tool_calls = [{"id": f"call_{n}", "type": "function",
+                                   "function": {"name": name, "arguments": json.dumps(arguments)}}
+                                  for n, (name, arguments) in enumerate(content)]
+                    content = ""
+                prompt_tokens = sum(len(m.get("content") or "") for m in request.get("messages", [])) // 4 + 1
+                completion_tokens = (len(content) + len(json.dumps(tool_calls or ""))) // 4 + 1
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                         "total_tokens": prompt_tokens + completion_tokens}
+                if request.get("stream"):
+                    self._stream(model, content, tool_calls, delay, usage if request.get("stream_options") else None)
+                    return
+                time.sleep(delay)
+                self._send(200, {
+                    "id": "stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "finish_reason": "tool_calls" if tool_calls else "stop",
+                                 "message": {"role": "assistant", "content": content or None,
+                                             "tool_calls": tool_calls}}],
+                    "usage": usage,
+                })
+
+            def _stream(self, model, content, tool_calls, delay, usage):
+                """Server-sent events: the first token after ttft_share of the delay, the rest at the end."""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+
+                def event(choices, **extra):
+                    chunk = {"id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": choices, **extra}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+
+                time.sleep(delay * stub.ttft_share)
+                if tool_calls:
+                    # id and name first, then the arguments in two pieces, like real providers
+                    event([{"index": 0, "delta": {"role": "assistant", "tool_calls": [
+                        {"index": n, "id": call["id"], "type": "function",
+                         "function": {"name": call["function"]["name"], "arguments": call["function"]["arguments"][:5]}}
+                        for n, call in enumerate(tool_calls)]}, "finish_reason": None}])
+                    time.sleep(delay * (1 - stub.ttft_share))
+                    event([{"index": 0, "delta": {"tool_calls": [
+                        {"index": n, "function": {"arguments": call["function"]["arguments"][5:]}}
+                        for n, call in enumerate(tool_calls)]}, "finish_reason": "tool_calls"}])
+                else:
+                    split = max(1, len(content) // 2)
+                    event([{"index": 0, "delta": {"role": "assistant", "content": content[:split]},
+                            "finish_reason": None}])
+                    time.sleep(delay * (1 - stub.ttft_share))
+                    event([{"index": 0, "delta": {"content": content[split:]}, "finish_reason": "stop"}])
+                if usage is not None:
+                    event([], usage=usage)
+                self.wfile.write(b"data: [DONE]\n\n")
+
+        return Handler
+
+    def _over_quota(self) -> Optional[float]:
+        """Seconds until the window frees up if this request exceeds the quota, else None. Holds the lock."""
+        if self.quota is None:
+            return None
+        now = time.monotonic()
+        rate = self.quota / self.quota_window
+        self._allowance = min(self.quota, self._allowance + (now - self._allowance_at) * rate)
+        self._allowance_at = now
+        if self._allowance < 1:
+            self.rejected += 1
+            return (1 - self._allowance) / rate
+        self._allowance -= 1
+        return None
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=0.1)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-delay", type=float, default=3.0)
+    args = parser.parse_args()
+    server = StubLLMServer(args.port, args.delay, args.fail_rate, args.slow_rate, args.slow_delay).start()
+    print(f"Stub LLM backend on {server.base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
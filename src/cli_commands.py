@@ -1,10 +1,19 @@
 import platform
 import subprocess
-from prompts import get_cmd_prompt  # uses the correct prompt for OS
+from prompts import aget_cmd_prompt, get_cmd_prompt  # uses the correct prompt for OS
 
 
-def get_cmd(instruction):
-    command, error = get_cmd_prompt(instruction)
+def get_cmd(instruction, history=()):
+    command, error = get_cmd_prompt(instruction, history)
+    if command:
+        print(f"Generated command: {command}")
+        return command, None
+    else:
+        print(f"Error generating command: {error}")
+        return None, error
+
+async def aget_cmd(instruction, history=()):
+    command, error = await aget_cmd_prompt(instruction, history)
     if command:
         print(f"Generated command: {command}")
         return command, None
@@ -0,0 +1,247 @@
+import heapq
+import re
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+DEFAULT_TOP_K = 8
+
+# Words that show up in email instructions but never identify a contact
+STOPWORDS = {
+    "a", "about", "after", "all", "also", "an", "and", "any", "are", "as", "ask", "asking", "at",
+    "be", "before", "by", "can", "compose", "could", "day", "dear", "do", "drop", "email", "emails",
+    "for", "from", "get", "hello", "her", "him", "his", "hi", "i", "if", "in", "inform", "is", "it",
+    "let", "mail", "me", "meeting", "message", "my", "need", "new", "note", "notify", "of", "on",
+    "or", "our", "please", "project", "quick", "reminder", "remind", "reply", "report", "say",
+    "saying", "send", "she", "so", "that", "the", "their", "them", "they", "this", "to", "today",
+    "tomorrow", "up", "us", "we", "what", "when", "will", "with", "write", "you", "your",
+}
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.8
+PHONETIC_SCORE = 0.7
+FUZZY_WEIGHT = 0.9
+MIN_FUZZY_SIMILARITY = 0.5
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_SOUNDEX_CODES = {}
+for _letters, _digit in (("bfpv", "1"), ("cgjkqsxz", "2"), ("dt", "3"), ("l", "4"), ("mn", "5"), ("r", "6")):
+    for _letter in _letters:
+        _SOUNDEX_CODES[_letter] = _digit
+
+
+def _tokens(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def soundex(word: str) -> str:
+    """American Soundex code, so names Whisper spells differently ("Mouncef", "Munsef") still match."""
+    word = "".join(c for c in word.lower() if c.isalpha())
+    if not word:
+        return ""
+    code = [word[0].upper()]
+    last = _SOUNDEX_CODES.get(word[0], "")
+    for char in word[1:]:
+        digit = _SOUNDEX_CODES.get(char, "")
+        if digit and digit != last:
+            code.append(digit)
+            if len(code) == 4:
+                break
+        if char not in "hw":
+            last = digit
+    return "".join(code).ljust(4, "0")
+
+
+def token_trigrams(token: str) -> set:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def contact_tokens(name: str, email: str) -> set:
+    """Tokens a contact is indexed under: the words of its name and of its email local part."""
+    local_part = email.split("@", 1)[0] if isinstance(email, str) else ""
+    return set(_tokens(name)) | set(_tokens(local_part))
+
+
+def _similarity(query_trigrams: set, candidate: str) -> float:
+    """Dice coefficient between a query's trigram set and a candidate token."""
+    candidate_trigrams = token_trigrams(candidate)
+    return 2 * len(query_trigrams & candidate_trigrams) / (len(query_trigrams) + len(candidate_trigrams))
+
+
+class ContactLookup(ABC):
+    """
+    Shortlisting algorithm shared by the in-memory index and the SQLite contact store.
+
+    Subclasses provide the lookup primitives (exact, prefix, phonetic bucket,
+    trigram postings); scoring and ranking live here so both back ends rank
+    candidates identically.
+    """
+
+    @abstractmethod
+    def __len__(self):
+        ...
+
+    @abstractmethod
+    def _has_token(self, token: str) -> bool:
+        ...
+
+    @abstractmethod
+    def _prefix_matches(self, token: str, limit: int = 50) -> List[str]:
+        ...
+
+    @abstractmethod
+    def _phonetic_bucket(self, code: str) -> Iterable[str]:
+        ...
+
+    @abstractmethod
+    def _trigram_tokens(self, trigram: str) -> Iterable[str]:
+        ...
+
+    @abstractmethod
+    def _postings(self, tokens: List[str]) -> Iterable[Tuple[str, int]]:
+        """Yields (token, contact_id) pairs for the given indexed tokens."""
+
+    @abstractmethod
+    def _contacts(self, contact_ids: List[int]) -> Dict[int, Tuple[str, str]]:
+        ...
+
+    @abstractmethod
+    def _all_contacts(self) -> Dict[str, str]:
+        ...
+
+    def _fuzzy_matches(self, token: str, limit: int = 10) -> List[Tuple[float, str]]:
+        query = token_trigrams(token)
+        overlap: Dict[str, int] = defaultdict(int)
+        for trigram in query:
+            for candidate in self._trigram_tokens(trigram):
+                overlap[candidate] += 1
+        scored = []
+        for candidate, shared in overlap.items():
+            similarity = 2 * shared / (len(query) + len(candidate) + 1)
+            if similarity >= MIN_FUZZY_SIMILARITY:
+                scored.append((similarity, candidate))
+        return heapq.nlargest(limit, scored)
+
+    def _token_matches(self, token: str) -> Dict[str, float]:
+        """Maps indexed tokens to the best score for one query token."""
+        matches: Dict[str, float] = {}
+        exact = self._has_token(token)
+        if exact:
+            matches[token] = EXACT_SCORE
+        if len(token) >= 3:
+            for candidate in self._prefix_matches(token):
+                matches.setdefault(candidate, PREFIX_SCORE)
+            # An exact hit means the name was transcribed correctly; sound-alikes would only add noise
+            if token.isalpha() and not exact:
+                query = token_trigrams(token)
+                for candidate in self._phonetic_bucket(soundex(token)):
+                    if abs(len(candidate) - len(token)) <= 3:
+                        # Soundex buckets are coarse; rank sound-alikes by spelling similarity
+                        similarity = _similarity(query, candidate)
+                        matches.setdefault(candidate, PHONETIC_SCORE * (0.5 + 0.5 * similarity))
+        if len(token) >= 4 and not matches:
+            for similarity, candidate in self._fuzzy_matches(token):
+                matches.setdefault(candidate, FUZZY_WEIGHT * similarity)
+        return matches
+
+    def search(self, text: str, top_k: int = DEFAULT_TOP_K) -> List[Tuple[float, str, str]]:
+        """Returns up to top_k (score, name, email) candidates for the names mentioned in text."""
+        scores: Dict[int, float] = defaultdict(float)
+        for token in dict.fromkeys(_tokens(text)):
+            if token in STOPWORDS or len(token) < 2:
+                continue
+            matches = self._token_matches(token)
+            if not matches:
+                continue
+            for candidate, contact_id in self._postings(list(matches)):
+                scores[contact_id] += matches[candidate]
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        contacts = self._contacts([contact_id for contact_id, _ in best])
+        # An import committed between the two reads may have removed some of them
+        return [(score, *contacts[contact_id]) for contact_id, score in best if contact_id in contacts]
+
+    def shortlist(self, text: str, top_k: int = DEFAULT_TOP_K) -> Dict[str, str]:
+        """
+        Returns the {name: email} subset worth sending to the email prompt.
+
+        Small address books are returned whole, since shortlisting them saves nothing.
+        """
+        if len(self) <= top_k:
+            return self._all_contacts()
+        return {name: email for _, name, email in self.search(text, top_k)}
+
+
+class ContactIndex(ContactLookup):
+    """
+    In-memory shortlist index over a {name: email} contact dictionary.
+
+    Built once per contacts file. Every distinct name token is indexed four ways:
+    exact (dict), prefix (sorted list + bisect), phonetic (Soundex buckets) and
+    fuzzy (trigram postings). Lookups only touch the tokens of the transcript, so
+    their cost depends on the transcript length, not on the directory size.
+
+    At 100k contacts lookups measure about 0.2-1.3 ms (bench_contact_index.py),
+    not microseconds: a common name or a short prefix still matches thousands
+    of postings, and summing their scores is most of the cost. That is the
+    accepted target. The app looks contacts up in ContactStore; this index is
+    kept as the in-memory baseline for the benchmark.
+    """
+
+    def __init__(self, contacts: Dict[str, str]):
+        self.names: List[str] = []
+        self.emails: List[str] = []
+        postings: Dict[str, List[int]] = defaultdict(list)
+
+        for name, email in contacts.items():
+            contact_id = len(self.names)
+            self.names.append(name)
+            self.emails.append(email)
+            for token in contact_tokens(name, email):
+                postings[token].append(contact_id)
+
+        self.postings = dict(postings)
+        self.sorted_tokens = sorted(self.postings)
+
+        self.phonetic: Dict[str, List[str]] = defaultdict(list)
+        self.trigrams: Dict[str, List[str]] = defaultdict(list)
+        for token in self.sorted_tokens:
+            if token.isalpha():
+                self.phonetic[soundex(token)].append(token)
+                for trigram in token_trigrams(token):
+                    self.trigrams[trigram].append(token)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _has_token(self, token: str) -> bool:
+        return token in self.postings
+
+    def _prefix_matches(self, token: str, limit: int = 50) -> List[str]:
+        matches = []
+        position = bisect_left(self.sorted_tokens, token)
+        while position < len(self.sorted_tokens) and len(matches) < limit:
+            candidate = self.sorted_tokens[position]
+            if not candidate.startswith(token):
+                break
+            matches.append(candidate)
+            position += 1
+        return matches
+
+    def _phonetic_bucket(self, code: str) -> Iterable[str]:
+        return self.phonetic.get(code, ())
+
+    def _trigram_tokens(self, trigram: str) -> Iterable[str]:
+        return self.trigrams.get(trigram, ())
+
+    def _postings(self, tokens: List[str]) -> Iterable[Tuple[str, int]]:
+        for token in tokens:
+            for contact_id in self.postings[token]:
+                yield token, contact_id
+
+    def _contacts(self, contact_ids: List[int]) -> Dict[int, Tuple[str, str]]:
+        return {contact_id: (self.names[contact_id], self.emails[contact_id]) for contact_id in contact_ids}
+
+    def _all_contacts(self) -> Dict[str, str]:
+        return dict(zip(self.names, self.emails))
@@ -0,0 +1,388 @@
+import csv
+import heapq
+import json
+import os
+import sqlite3
+import threading
+from urllib.request import pathname2url
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from contact_index import MIN_FUZZY_SIMILARITY, ContactLookup, contact_tokens, soundex, token_trigrams
+
+SUPPORTED_EXTENSIONS = (".json", ".csv", ".vcf", ".vcard")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    UNIQUE (source, name, email)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    token TEXT NOT NULL,
+    contact_id INTEGER NOT NULL REFERENCES contacts(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS postings_token ON postings(token);
+CREATE INDEX IF NOT EXISTS postings_contact ON postings(contact_id);
+CREATE TABLE IF NOT EXISTS vocabulary (
+    token TEXT PRIMARY KEY,
+    soundex TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS vocabulary_soundex ON vocabulary(soundex);
+CREATE TABLE IF NOT EXISTS trigrams (
+    trigram TEXT NOT NULL,
+    token TEXT NOT NULL,
+    PRIMARY KEY (trigram, token)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+
+# New contacts indexed per batch during an import
+INDEX_BATCH_SIZE = 50_000
+# Characters read per chunk when streaming a JSON contacts file
+JSON_CHUNK_CHARS = 1 << 16
+_json_decoder = json.JSONDecoder()
+
+
+def _stream_json(f) -> Iterator[Tuple[Optional[str], Any]]:
+    """
+    Yields the members of a top-level JSON object as (key, value), or the items
+    of a top-level array as (None, value), reading f a chunk at a time.
+
+    Each member is decoded on its own with JSONDecoder.raw_decode, so only one
+    chunk and one contact are held in memory at a time, not the whole file.
+    """
+    buffer, pos, eof = "", 0, False
+
+    def more() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = f.read(JSON_CHUNK_CHARS)
+        if not chunk:
+            eof = True
+            return False
+        buffer, pos = buffer[pos:] + chunk, 0
+        return True
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not more():
+                raise ValueError("Contacts file ends unexpectedly")
+
+    def value() -> Any:
+        nonlocal pos
+        peek()
+        while True:
+            try:
+                decoded, end = _json_decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Most likely cut off at the end of the chunk; a real error stays one once the file is read
+                if eof or not more():
+                    raise
+                continue
+            # A number at the very end of the chunk may go on in the next one
+            if end == len(buffer) and not eof and more():
+                continue
+            pos = end
+            return decoded
+
+    opening = peek()
+    if opening not in "{[":
+        raise ValueError("Contacts file should contain a dictionary or a list of contacts")
+    closing = "}" if opening == "{" else "]"
+    pos += 1
+    if peek() == closing:
+        return
+    while True:
+        if opening == "{":
+            key = value()
+            if not isinstance(key, str) or peek() != ":":
+                raise ValueError("Malformed contacts dictionary")
+            pos += 1
+            yield key, value()
+        else:
+            yield None, value()
+        separator = peek()
+        pos += 1
+        if separator == closing:
+            return
+        if separator != ",":
+            raise ValueError(f"Malformed contacts file: expected ',' or '{closing}', got {separator!r}")
+
+
+def _read_json(path: str) -> Iterator[Tuple[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for name, entry in _stream_json(f):
+            if name is not None:
+                yield name, str(entry)
+            elif isinstance(entry, dict) and entry.get("email"):
+                yield str(entry.get("name") or entry["email"]), str(entry["email"])
+
+
+def _read_csv(path: str) -> Iterator[Tuple[str, str]]:
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.DictReader(f)
+        columns = [column.lower() for column in reader.fieldnames or []]
+        email_column = next((c for c in reader.fieldnames or [] if "mail" in c.lower()), None)
+        if email_column is None:
+            raise ValueError(f"CSV contacts need an email column, got {columns}")
+        name_columns = [c for c in reader.fieldnames if "name" in c.lower() and c != email_column]
+        full_name = next((c for c in name_columns if c.lower() in ("name", "full name", "display name")), None)
+        for row in reader:
+            email = (row.get(email_column) or "").strip()
+            if not email:
+                continue
+            if full_name:
+                name = row.get(full_name) or ""
+            else:
+                name = " ".join(row.get(c) or "" for c in name_columns)
+            yield name.strip() or email, email
+
+
+def _read_vcard(path: str) -> Iterator[Tuple[str, str]]:
+    name, emails = "", []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            key, _, value = line.partition(":")
+            field = key.split(";", 1)[0].upper()
+            if field == "BEGIN":
+                name, emails = "", []
+            elif field == "FN":
+                name = value.strip()
+            elif field == "EMAIL":
+                emails.append(value.strip())
+            elif field == "END":
+                for email in emails:
+                    yield name or email, email
+
+
+def read_contacts_file(path: str) -> Iterator[Tuple[str, str]]:
+    """Yields (name, email) pairs from a JSON, CSV or vCard contacts file."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return _read_csv(path)
+    if extension in (".vcf", ".vcard"):
+        return _read_vcard(path)
+    return _read_json(path)
+
+
+class ContactStore(ContactLookup):
+    """
+    SQLite-backed contact directory.
+
+    Contacts are imported from JSON, CSV or vCard files into indexed tables
+    (postings, vocabulary with Soundex codes, token trigrams), and lookups go
+    through those indexes, so the directory never has to be held in Python
+    objects. Re-importing a changed file applies only the difference.
+
+    Imports write through one connection under a lock; lookups read through
+    a read-only connection per thread, which WAL lets see the last committed
+    contacts while an import is still running.
+    """
+
+    def __init__(self, db_path: str):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.execute("PRAGMA cache_size = -65536")
+        self._conn.executescript(_SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+    def _reader(self) -> sqlite3.Connection:
+        """This thread's read-only connection, never blocked by an import."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = "file:" + pathname2url(os.path.abspath(self.db_path)) + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        with self._lock:
+            self._conn.close()
+
+    def __len__(self):
+        return self._count
+
+    def is_current(self, path: str) -> bool:
+        """True when the file was already imported and has not changed since."""
+        stat = os.stat(path)
+        row = self._reader().execute("SELECT mtime, size FROM sources WHERE path = ?", (path,)).fetchone()
+        return row is not None and row[0] == stat.st_mtime and row[1] == stat.st_size
+
+    def import_file(self, path: str, replace_other_sources: bool = True) -> Tuple[int, int]:
+        """
+        Imports a contacts file incrementally.
+
+        Args:
+            path (str): JSON, CSV or vCard file.
+            replace_other_sources (bool): Drop contacts imported from other files.
+
+        Returns:
+            Tuple[int, int]: Number of contacts added and removed.
+        """
+        stat = os.stat(path)
+        rows = read_contacts_file(path)
+        with self._lock, self._conn:
+            conn = self._conn
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (name TEXT, email TEXT)")
+            conn.execute("DELETE FROM incoming")
+            conn.executemany("INSERT INTO incoming (name, email) VALUES (?, ?)", rows)
+            conn.execute("CREATE INDEX IF NOT EXISTS temp.incoming_key ON incoming (name, email)")
+
+            removed = 0
+            if replace_other_sources:
+                removed += conn.execute("DELETE FROM contacts WHERE source != ?", (path,)).rowcount
+                conn.execute("DELETE FROM sources WHERE path != ?", (path,))
+            removed += conn.execute(
+                """DELETE FROM contacts WHERE source = ? AND NOT EXISTS (
+                       SELECT 1 FROM incoming i WHERE i.name = contacts.name AND i.email = contacts.email)""",
+                (path,),
+            ).rowcount
+
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM contacts").fetchone()[0]
+            added = conn.execute(
+                "INSERT OR IGNORE INTO contacts (source, name, email) SELECT DISTINCT ?, name, email FROM incoming",
+                (path,),
+            ).rowcount
+            conn.execute("DELETE FROM incoming")
+
+            # Indexed a batch at a time, so the postings of a large import are never all in memory
+            while True:
+                batch = conn.execute("SELECT id, name, email FROM contacts WHERE id > ? ORDER BY id LIMIT ?",
+                                     (last_id, INDEX_BATCH_SIZE)).fetchall()
+                if not batch:
+                    break
+                self._index_rows(batch)
+                last_id = batch[-1][0]
+            if removed:
+                conn.execute("DELETE FROM vocabulary WHERE token NOT IN (SELECT token FROM postings)")
+                conn.execute("DELETE FROM trigrams WHERE token NOT IN (SELECT token FROM vocabulary)")
+
+            conn.execute(
+                "INSERT OR REPLACE INTO sources (path, mtime, size) VALUES (?, ?, ?)",
+                (path, stat.st_mtime, stat.st_size),
+            )
+            self._count = conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+        print(f"Imported contacts from {os.path.basename(path)}: +{added} -{removed} ({self._count} total)")
+        return added, removed
+
+    def _index_rows(self, rows: Iterable[Tuple[int, str, str]]):
+        # Rows are inserted in key order: appending to the B-trees is several times
+        # faster than inserting the same rows in arrival order.
+        cursor = self._conn.cursor()
+        postings: List[Tuple[str, int]] = []
+        vocabulary: Dict[str, str] = {}
+        for contact_id, name, email in rows:
+            for token in contact_tokens(name, email):
+                postings.append((token, contact_id))
+                if token not in vocabulary:
+                    vocabulary[token] = soundex(token) if token.isalpha() else ""
+        postings.sort()
+        cursor.executemany("INSERT INTO postings (token, contact_id) VALUES (?, ?)", postings)
+        del postings
+
+        known = set()
+        tokens = list(vocabulary)
+        for start in range(0, len(tokens), 500):
+            chunk = tokens[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            known.update(row[0] for row in cursor.execute(
+                f"SELECT token FROM vocabulary WHERE token IN ({placeholders})", chunk))
+        new_tokens = sorted(token for token in tokens if token not in known)
+        cursor.executemany("INSERT INTO vocabulary (token, soundex) VALUES (?, ?)",
+                           ((token, vocabulary[token]) for token in new_tokens))
+        # Tokens with digits (mostly email local parts) are never misheard names, so they skip fuzzy indexing
+        trigram_rows = sorted((trigram, token) for token in new_tokens if token.isalpha()
+                              for trigram in token_trigrams(token))
+        cursor.executemany("INSERT INTO trigrams (trigram, token) VALUES (?, ?)", trigram_rows)
+
+    def _has_token(self, token: str) -> bool:
+        return self._reader().execute("SELECT 1 FROM vocabulary WHERE token = ?", (token,)).fetchone() is not None
+
+    def _prefix_matches(self, token: str, limit: int = 50) -> List[str]:
+        rows = self._reader().execute(
+            "SELECT token FROM vocabulary WHERE token >= ? AND token < ? ORDER BY token LIMIT ?",
+            (token, token + "\uffff", limit),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def _phonetic_bucket(self, code: str) -> Iterable[str]:
+        rows = self._reader().execute("SELECT token FROM vocabulary WHERE soundex = ?", (code,)).fetchall()
+        return [row[0] for row in rows]
+
+    def _trigram_tokens(self, trigram: str) -> Iterable[str]:
+        rows = self._reader().execute("SELECT token FROM trigrams WHERE trigram = ?", (trigram,)).fetchall()
+        return [row[0] for row in rows]
+
+    def _fuzzy_matches(self, token: str, limit: int = 10) -> List[Tuple[float, str]]:
+        # Count shared trigrams in SQL so only plausible candidates leave the database
+        query = token_trigrams(token)
+        placeholders = ",".join("?" * len(query))
+        min_shared = max(1, int(MIN_FUZZY_SIMILARITY * len(query) / 2))
+        rows = self._reader().execute(
+            f"""SELECT token, COUNT(*) FROM trigrams WHERE trigram IN ({placeholders})
+                GROUP BY token HAVING COUNT(*) >= ?""",
+            (*query, min_shared),
+        ).fetchall()
+        scored = []
+        for candidate, shared in rows:
+            similarity = 2 * shared / (len(query) + len(candidate) + 1)
+            if similarity >= MIN_FUZZY_SIMILARITY:
+                scored.append((similarity, candidate))
+        return heapq.nlargest(limit, scored)
+
+    def _postings(self, tokens: List[str]) -> Iterable[Tuple[str, int]]:
+        placeholders = ",".join("?" * len(tokens))
+        return self._reader().execute(
+            f"SELECT token, contact_id FROM postings WHERE token IN ({placeholders})", tokens
+        ).fetchall()
+
+    def _contacts(self, contact_ids: List[int]) -> Dict[int, Tuple[str, str]]:
+        if not contact_ids:
+            return {}
+        placeholders = ",".join("?" * len(contact_ids))
+        rows = self._reader().execute(
+            f"SELECT id, name, email FROM contacts WHERE id IN ({placeholders})", contact_ids
+        ).fetchall()
+        return {contact_id: (name, email) for contact_id, name, email in rows}
+
+    def _all_contacts(self) -> Dict[str, str]:
+        return dict(self._reader().execute("SELECT name, email FROM contacts").fetchall())
+
+
+def validate_contacts_file(path: str) -> Optional[str]:
+    """Returns an error message if the file cannot be read as contacts, or None."""
+    try:
+        for _ in read_contacts_file(path):
+            return None
+        return "Contacts file is empty"
+    except Exception as e:
+        return str(e)
@@ -0,0 +1,134 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Prompt history is capped in tokens, so a long session costs no more per request than a short one
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "300"))
+CONTEXT_MAX_TURNS = int(os.getenv("CONTEXT_MAX_TURNS", "16"))
+# After this long without a completed job the next instruction starts a fresh session
+CONTEXT_IDLE_RESET = float(os.getenv("CONTEXT_IDLE_RESET", "900"))
+# Long results (an email body, a Jira description) are cut before they are stored
+MAX_TURN_CHARS = 400
+
+# Scores: the previous turn is nearly always what a follow-up refers to; older
+# turns need words in common with the new instruction to be worth their tokens
+RECENCY_DECAY = 0.5
+MIN_RELEVANCE = 0.15
+# Turns of another mode ("email that to Sara" after an agent answer) are offered only from the last few
+# jobs, and rank below same-mode turns
+CROSS_MODE_RECENT = 2
+CROSS_MODE_WEIGHT = 0.5
+
+_WORD_RE = re.compile(r"[a-z0-9_.~/-]+")
+STOPWORDS = {
+    "a", "an", "and", "all", "as", "at", "do", "for", "from", "in", "into", "it", "its", "me", "my", "now",
+    "of", "on", "one", "please", "same", "that", "the", "then", "this", "to", "too", "with",
+}
+
+
+def _estimate_tokens(text: str) -> int:
+    # Same four-characters-per-token estimate as prompts.token_usage, which needs API settings to import
+    return max(1, (len(text) + 3) // 4)
+
+
+def _words(text: str) -> set:
+    return {word for word in _WORD_RE.findall(text.lower()) if word not in STOPWORDS}
+
+
+class Turn:
+    __slots__ = ("mode", "instruction", "result", "words", "tokens", "created")
+
+    def __init__(self, mode: str, instruction: str, result: str):
+        self.mode = mode
+        self.instruction = instruction
+        self.result = result
+        self.words = _words(instruction) | _words(result)
+        # Two messages, each with a few tokens of chat framing
+        self.tokens = _estimate_tokens(instruction) + _estimate_tokens(result) + 8
+        self.created = time.monotonic()
+
+
+class ConversationContext:
+    """
+    Recent completed jobs of one session, for follow-ups such as "now do the same for Downloads".
+
+    Turns live in a ring buffer of CONTEXT_MAX_TURNS. For a new instruction,
+    messages() picks the most relevant turns (recency plus word overlap) that
+    fit the token budget and returns them oldest first as user/assistant
+    pairs, ready to go between the system prompt and the instruction. Turns of
+    the same mode come first; the last CROSS_MODE_RECENT jobs of other modes
+    may follow, marked with their mode, if there is budget left.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKEN_BUDGET, max_turns: int = CONTEXT_MAX_TURNS,
+                 idle_reset: float = CONTEXT_IDLE_RESET):
+        self.budget = budget
+        self.idle_reset = idle_reset
+        self.turns = deque(maxlen=max_turns)
+        self.stats = {"requests": 0, "with_history": 0, "history_tokens": 0}
+        self._lock = threading.Lock()
+
+    def add(self, mode: str, instruction: str, result: Any):
+        """Remembers a job the user confirmed; dicts (email, Jira) are stored as the JSON the model returns."""
+        if not instruction or result is None:
+            return
+        if not isinstance(result, str):
+            result = json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._expire()
+            self.turns.append(Turn(mode, instruction.strip()[:MAX_TURN_CHARS], result.strip()[:MAX_TURN_CHARS]))
+
+    def clear(self):
+        with self._lock:
+            self.turns.clear()
+
+    def _expire(self):
+        if self.turns and time.monotonic() - self.turns[-1].created > self.idle_reset:
+            self.turns.clear()
+
+    def select(self, mode: str, instruction: str, budget: Optional[int] = None) -> List[Turn]:
+        budget = self.budget if budget is None else budget
+        words = _words(instruction)
+        with self._lock:
+            self._expire()
+            candidates = list(self.turns)
+        scored = []
+        same_mode_age = 0
+        for age, turn in enumerate(reversed(candidates)):
+            overlap = len(words & turn.words) / len(words) if words else 0.0
+            if turn.mode == mode:
+                score = RECENCY_DECAY ** same_mode_age + overlap
+                relevant = same_mode_age == 0 or overlap >= MIN_RELEVANCE
+                same_mode_age += 1
+            else:
+                score = CROSS_MODE_WEIGHT * (RECENCY_DECAY ** age + overlap)
+                relevant = age < CROSS_MODE_RECENT and (age == 0 or overlap >= MIN_RELEVANCE)
+            if relevant:
+                scored.append((score, -age, turn))
+        chosen, used = [], 0
+        for score, _, turn in sorted(scored, key=lambda item: item[:2], reverse=True):
+            # Other modes' turns also carry their "(mode) " marker
+            tokens = turn.tokens if turn.mode == mode else turn.tokens + _estimate_tokens(turn.mode) + 1
+            if used + tokens <= budget:
+                chosen.append(turn)
+                used += tokens
+        chosen.sort(key=lambda turn: turn.created)
+        return chosen
+
+    def messages(self, mode: str, instruction: str, budget: Optional[int] = None) -> List[Dict[str, str]]:
+        turns = self.select(mode, instruction, budget)
+        with self._lock:
+            self.stats["requests"] += 1
+            if turns:
+                self.stats["with_history"] += 1
+                self.stats["history_tokens"] += sum(turn.tokens for turn in turns)
+        history = []
+        for turn in turns:
+            instruction = turn.instruction if turn.mode == mode else f"({turn.mode}) {turn.instruction}"
+            history.append({"role": "user", "content": instruction})
+            history.append({"role": "assistant", "content": turn.result})
+        return history
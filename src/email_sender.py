@@ -3,16 +3,30 @@ import smtplib
 import sys
 import json
 from email.message import EmailMessage
-from prompts.email_prompt import get_email_prompt
+from prompts.email_prompt import aget_email_prompt, get_email_prompt
+from ratelimit import get_limiter
 from typing import Optional
 
 SENDER_EMAIL = os.getenv("GMAIL_USER")
 SENDER_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD")
 
 
-def generate_email_from_prompt(prompt: str, contacts) -> Optional[dict]:
+def generate_email_from_prompt(prompt: str, contacts, history=()) -> Optional[dict]:
     try:
-        response, error = get_email_prompt(prompt, contacts)
+        response, error = get_email_prompt(prompt, contacts, history)
+        print(response)
+        if not error:
+            return response
+        else:
+            print("❌ LLM did not return a valid email response.")
+            return None
+    except Exception as e:
+        print(f"❌ Error generating email: {e}")
+        return None
+
+async def agenerate_email_from_prompt(prompt: str, contacts, history=()) -> Optional[dict]:
+    try:
+        response, error = await aget_email_prompt(prompt, contacts, history)
         print(response)
         if not error:
             return response
@@ -48,7 +62,7 @@ def send_email(contact: str, subject: str, body: str):
     """, subtype='html')
 
     try:
-        with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
+        with get_limiter("gmail").slot(), smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
             server.login(SENDER_EMAIL, SENDER_APP_PASSWORD)
             server.send_message(msg)
             print(f"✅ Email sent to {contact}")
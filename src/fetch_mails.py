@@ -1,53 +1,32 @@
-import os
 import base64
 import email
 from email.header import decode_header
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
 import imaplib
+from google_services import GMAIL_SCOPES, get_google_services
+from ratelimit import get_limiter
 
-SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
-CREDENTIALS_FILE = '../credentials.json'
-TOKEN_FILE = '../token.json'
 
 def get_oauth_credentials():
-    creds = None
-
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            print("Refreshing expired credentials...")
-            creds.refresh(Request())
-        else:
-            print("Initiating OAuth2 flow...")
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-            creds = flow.run_local_server(port=8080)
-
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
-
-    return creds
+    return get_google_services().credentials(GMAIL_SCOPES)
 
 
 def fetch_last_unread_email(credentials):
     try:
         auth_string = f"user={credentials.token}\x01auth=Bearer {credentials.token}\x01\x01"
-        mail = imaplib.IMAP4_SSL('imap.gmail.com')
+        with get_limiter("gmail").slot():
+            mail = imaplib.IMAP4_SSL('imap.gmail.com')
 
-        mail.authenticate('XOAUTH2', lambda x: auth_string)
+            mail.authenticate('XOAUTH2', lambda x: auth_string)
 
-        mail.select('inbox')
-        status, messages = mail.search(None, '(UNSEEN)')
-        if status != 'OK' or not messages[0]:
-            print("No unread emails found.")
-            return
+            mail.select('inbox')
+            status, messages = mail.search(None, '(UNSEEN)')
+            if status != 'OK' or not messages[0]:
+                print("No unread emails found.")
+                return
 
-        email_ids = messages[0].split()
-        latest_email_id = email_ids[-1]
-        status, msg_data = mail.fetch(latest_email_id, '(RFC822)')
+            email_ids = messages[0].split()
+            latest_email_id = email_ids[-1]
+            status, msg_data = mail.fetch(latest_email_id, '(RFC822)')
 
         if status != 'OK':
             print("Failed to fetch email.")
@@ -0,0 +1,194 @@
+import datetime
+import json
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional
+
+from ratelimit import request_with_limits
+
+# One token covers every Google API the app uses, so calendar and Gmail share a single consent
+CALENDAR_SCOPES = ['https://www.googleapis.com/auth/calendar.events']
+GMAIL_SCOPES = ['https://www.googleapis.com/auth/gmail.readonly']
+GOOGLE_SCOPES = CALENDAR_SCOPES + GMAIL_SCOPES
+
+GOOGLE_CREDENTIALS_FILE = os.getenv("GOOGLE_CREDENTIALS_FILE", "../credentials.json")
+GOOGLE_TOKEN_FILE = os.getenv("GOOGLE_TOKEN_FILE", "../token.json")
+GOOGLE_DISCOVERY_CACHE = os.getenv("GOOGLE_DISCOVERY_CACHE") or os.path.join(os.path.expanduser("~"), ".taskcrafters",
+                                                                              "discovery")
+DISCOVERY_URL = "https://www.googleapis.com/discovery/v1/apis/{api}/{version}/rest"
+# Access tokens are refreshed in the background this long before they expire
+TOKEN_REFRESH_MARGIN = float(os.getenv("GOOGLE_TOKEN_REFRESH_MARGIN", "300"))
+REFRESH_RETRY = 60.0
+GOOGLE_HTTP_TIMEOUT = float(os.getenv("GOOGLE_HTTP_TIMEOUT", "20"))
+
+
+def _seconds_left(creds) -> Optional[float]:
+    if not creds.expiry:
+        return None
+    # google-auth keeps expiry as a naive UTC datetime
+    now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return (creds.expiry - now).total_seconds()
+
+
+class GoogleServices:
+    """
+    Process-wide Google credentials and API clients.
+
+    The token is read from GOOGLE_TOKEN_FILE once and kept in memory; a
+    background thread refreshes it TOKEN_REFRESH_MARGIN before it expires and
+    writes it back, so requests never wait on a refresh. Discovery documents are
+    parsed once and kept in GOOGLE_DISCOVERY_CACHE. Each thread gets its own
+    authorized HTTP session and service objects (httplib2 is not thread-safe),
+    reused for every later call from that thread.
+    """
+
+    def __init__(self, token_file: str = GOOGLE_TOKEN_FILE, credentials_file: str = GOOGLE_CREDENTIALS_FILE,
+                 discovery_cache: str = GOOGLE_DISCOVERY_CACHE, client_options: Optional[Dict[str, Any]] = None):
+        self.token_file = token_file
+        self.credentials_file = credentials_file
+        self.discovery_cache = discovery_cache
+        self.client_options = client_options
+        self.stats = {"token_loads": 0, "refreshes": 0, "background_refreshes": 0, "flows": 0,
+                      "documents_loaded": 0, "sessions": 0}
+        self._lock = threading.RLock()
+        self._creds = None
+        self._documents: Dict[str, Any] = {}
+        self._local = threading.local()
+        self._refresher = None
+        self._wake = threading.Event()
+        self._refresh_request = None
+
+    def _request(self):
+        from google.auth.transport.requests import Request
+        if self._refresh_request is None:
+            self._refresh_request = Request()
+        return self._refresh_request
+
+    def _save(self, creds):
+        with open(self.token_file, 'w') as token_file:
+            token_file.write(creds.to_json())
+
+    def _refresh(self, creds):
+        """Caller holds the lock."""
+        creds.refresh(self._request())
+        self.stats["refreshes"] += 1
+        self._save(creds)
+
+    def credentials(self, scopes: Iterable[str] = GOOGLE_SCOPES, interactive: bool = True):
+        """
+        Valid credentials covering scopes, running the consent flow only when no usable token exists.
+
+        Background callers pass interactive=False to get a PermissionError instead of a browser window.
+        """
+        with self._lock:
+            creds = self._creds
+            if creds is None and os.path.exists(self.token_file):
+                from google.oauth2.credentials import Credentials
+                # Loaded with the scopes it was granted, so a token missing one is noticed
+                creds = Credentials.from_authorized_user_file(self.token_file)
+                self.stats["token_loads"] += 1
+            if creds is not None and not creds.has_scopes(list(scopes)):
+                creds = None
+            if creds is not None and not creds.valid and creds.refresh_token:
+                self._refresh(creds)
+            if (creds is None or not creds.valid) and not interactive:
+                raise PermissionError("Google account not connected")
+            if creds is None or not creds.valid:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+                print("Initiating OAuth2 flow...")
+                flow = InstalledAppFlow.from_client_secrets_file(self.credentials_file, GOOGLE_SCOPES)
+                creds = flow.run_local_server(port=8080)
+                self.stats["flows"] += 1
+                self._save(creds)
+            if creds is not self._creds:
+                self._creds = creds
+                # Sessions hold the old credentials object
+                self._local = threading.local()
+            self._start_refresher()
+            return creds
+
+    def _start_refresher(self):
+        if self._refresher is None:
+            self._refresher = threading.Thread(target=self._refresh_loop, daemon=True, name="google-token")
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        while True:
+            with self._lock:
+                creds = self._creds
+                left = _seconds_left(creds) if creds is not None else None
+            if left is None or not creds.refresh_token:
+                wait = REFRESH_RETRY * 10
+            elif left > TOKEN_REFRESH_MARGIN:
+                wait = left - TOKEN_REFRESH_MARGIN
+            else:
+                try:
+                    with self._lock:
+                        self._refresh(creds)
+                        self.stats["background_refreshes"] += 1
+                    continue
+                except Exception as e:
+                    # The token is refreshed on the next request instead
+                    print(f"Background token refresh failed: {e}")
+                    wait = REFRESH_RETRY
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def discovery_document(self, api: str, version: str) -> Dict[str, Any]:
+        """The parsed discovery document: from memory, the local cache, the copy bundled with the client, or the web."""
+        key = f"{api}.{version}"
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                return document
+            path = os.path.join(self.discovery_cache, f"{key}.json")
+            text = None
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    text = f.read()
+            if text is None:
+                from googleapiclient.discovery_cache import get_static_doc
+                text = get_static_doc(api, version)
+            if text is None:
+                url = DISCOVERY_URL.format(api=api, version=version)
+                response = request_with_limits("google_discovery", "GET", url, timeout=GOOGLE_HTTP_TIMEOUT)
+                response.raise_for_status()
+                text = response.text
+            if not os.path.exists(path):
+                os.makedirs(self.discovery_cache, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(text)
+            document = self._documents[key] = json.loads(text)
+            self.stats["documents_loaded"] += 1
+            return document
+
+    def service(self, api: str, version: str, scopes: Iterable[str] = GOOGLE_SCOPES, interactive: bool = True):
+        """This thread's client for the API, built on first use and kept."""
+        creds = self.credentials(scopes, interactive)
+        local = self._local
+        services = getattr(local, "services", None)
+        if services is None:
+            import google_auth_httplib2
+            import httplib2
+            local.http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http(timeout=GOOGLE_HTTP_TIMEOUT))
+            services = local.services = {}
+            with self._lock:
+                self.stats["sessions"] += 1
+        key = f"{api}.{version}"
+        if key not in services:
+            from googleapiclient.discovery import build_from_document
+            services[key] = build_from_document(self.discovery_document(api, version), http=local.http,
+                                                client_options=self.client_options)
+        return services[key]
+
+
+_services_lock = threading.Lock()
+_services: Optional[GoogleServices] = None
+
+
+def get_google_services() -> GoogleServices:
+    global _services
+    with _services_lock:
+        if _services is None:
+            _services = GoogleServices()
+        return _services
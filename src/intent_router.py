@@ -0,0 +1,213 @@
+import re
+import time
+import numpy as np
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Order matches the mode tabs in the main window.
+MODES = ("command", "email", "jira", "taskcrafters")
+
+CONFIDENCE_THRESHOLD = 0.5
+
+TRAINING_EXAMPLES: Dict[str, List[str]] = {
+    "command": [
+        "open the terminal",
+        "list all files including hidden ones",
+        "create a folder called test on the desktop",
+        "delete the temp folder in downloads",
+        "open firefox",
+        "launch visual studio code",
+        "show disk usage",
+        "how much free memory do I have",
+        "kill the process running on port 8080",
+        "copy report.pdf to the documents folder",
+        "move all images from downloads to pictures",
+        "find all python files in my home directory",
+        "rename notes.txt to todo.txt",
+        "show my ip address configuration",
+        "compress the project folder into a zip file",
+        "shut down the computer",
+        "restart the network service",
+        "open the calculator app",
+        "show running processes",
+        "install the requests package with pip",
+        "change directory to downloads and list files",
+        "make the script executable",
+    ],
+    "email": [
+        "send an email to sarah about the project deadline",
+        "email john that the meeting is moved to friday",
+        "write a mail to my manager asking for a day off",
+        "send a reminder email to the team about the review",
+        "tell alice by email that the report is ready",
+        "compose an email to mouncef thanking him for the help",
+        "mail the client the updated invoice details",
+        "send a message to david saying I will be late",
+        "email hr about my vacation request",
+        "write to bob and ask if he received the contract",
+        "send an email inviting everyone to lunch",
+        "reply to maria that I agree with the proposal",
+        "drop an email to the support team about the login issue",
+        "notify karim by email that the build passed",
+        "send a thank you email to the recruiter",
+        "email my professor asking for an extension",
+    ],
+    "jira": [
+        "create a bug ticket in project DEV about login page not working",
+        "list all jira projects",
+        "create a new project called marketing",
+        "open an issue for the checkout crash",
+        "list all issues in the last seven days",
+        "create a task in project WEB to update the footer",
+        "show recent tickets from this week",
+        "add a story to the backlog for dark mode",
+        "create an epic for the payment redesign",
+        "fetch issues created in the last three days",
+        "log a bug about the broken search filter",
+        "make a new jira project for the mobile team",
+        "what issues were opened yesterday",
+        "create a ticket to upgrade the database",
+        "list the projects in jira",
+        "file an issue in project API about slow responses",
+    ],
+    "taskcrafters": [
+        "what is the weather in casablanca today",
+        "who is the president of france",
+        "schedule a meeting tomorrow at 3pm with the team",
+        "add an event to my calendar for friday",
+        "find a youtube tutorial about docker",
+        "what is the latest news about ai",
+        "search the web for cheap flights to paris",
+        "tell me about the eiffel tower",
+        "book a calendar event for the sprint review next monday",
+        "what time is it in tokyo",
+        "find videos about learning python",
+        "what is quantum computing",
+        "look up the score of last night's game",
+        "where am I located right now",
+        "create a calendar event called dentist on thursday at 10",
+        "how tall is mount everest",
+        "what is the exchange rate of dollar to dirham",
+        "remind me about the interview next week in my calendar",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def _features(text: str) -> List[str]:
+    words = _TOKEN_RE.findall(text.lower())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class IntentRouter:
+    """
+    Local TF-IDF + softmax-regression classifier that maps a transcript to a mode.
+
+    The model is trained from the bundled examples when the router is created
+    (tens of milliseconds, once) and classifies a transcript in well under a millisecond,
+    so it can run on the GUI path before any LLM request is made.
+    """
+
+    def __init__(self, examples: Dict[str, List[str]] = TRAINING_EXAMPLES,
+                 threshold: float = CONFIDENCE_THRESHOLD, epochs: int = 300, learning_rate: float = 0.5):
+        self.modes = tuple(mode for mode in MODES if mode in examples)
+        self.threshold = threshold
+
+        documents, labels = [], []
+        for label, mode in enumerate(self.modes):
+            for example in examples[mode]:
+                documents.append(_features(example))
+                labels.append(label)
+
+        self.vocabulary: Dict[str, int] = {}
+        for features in documents:
+            for feature in features:
+                self.vocabulary.setdefault(feature, len(self.vocabulary))
+
+        document_frequency = np.zeros(len(self.vocabulary))
+        for features in documents:
+            for index in {self.vocabulary[f] for f in features}:
+                document_frequency[index] += 1
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1.0
+
+        matrix = np.vstack([self._vectorize(features) for features in documents])
+        targets = np.eye(len(self.modes))[labels]
+        self.weights = np.zeros((matrix.shape[1], len(self.modes)))
+        self.bias = np.zeros(len(self.modes))
+        for _ in range(epochs):
+            probabilities = self._softmax(matrix @ self.weights + self.bias)
+            gradient = probabilities - targets
+            self.weights -= learning_rate * (matrix.T @ gradient / len(documents) + 1e-3 * self.weights)
+            self.bias -= learning_rate * gradient.mean(axis=0)
+
+    @staticmethod
+    def _softmax(scores: np.ndarray) -> np.ndarray:
+        scores = scores - scores.max(axis=-1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    def _vectorize(self, features: List[str]) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary))
+        for feature in features:
+            index = self.vocabulary.get(feature)
+            if index is not None:
+                vector[index] += 1.0
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """Returns the most likely mode and its probability."""
+        counts: Dict[int, float] = {}
+        for feature in _features(text):
+            index = self.vocabulary.get(feature)
+            if index is not None:
+                counts[index] = counts.get(index, 0.0) + 1.0
+        if not counts:
+            return self.modes[0], 0.0
+
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=float, count=len(counts)) * self.idf[indices]
+        values /= np.linalg.norm(values)
+        probabilities = self._softmax(values @ self.weights[indices] + self.bias)
+        best = int(probabilities.argmax())
+        return self.modes[best], float(probabilities[best])
+
+    def _local_route(self, text: str) -> Tuple[str, float]:
+        start = time.perf_counter()
+        mode, confidence = self.classify(text)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        print(f"Intent router: {mode} ({confidence:.2f}) in {elapsed_ms:.3f} ms")
+        return mode, confidence
+
+    def _pick(self, mode: str, confidence: float, llm_mode: Optional[str], error: Optional[str]) -> Tuple[str, float, str]:
+        if error or llm_mode not in self.modes:
+            print(f"Intent router LLM fallback failed, keeping local result: {error or llm_mode}")
+            return mode, confidence, "local"
+        return llm_mode, confidence, "llm"
+
+    def route(self, text: str, llm_fallback: Optional[Callable[[str], Tuple[Optional[str], Optional[str]]]] = None
+              ) -> Tuple[str, float, str]:
+        """
+        Routes a transcript to a mode.
+
+        Args:
+            text (str): The transcribed instruction.
+            llm_fallback (Callable, optional): Called with the transcript when the local
+                confidence is below the threshold; must return (mode, error).
+
+        Returns:
+            Tuple[str, float, str]: The mode, the local confidence and the source ("local" or "llm").
+        """
+        mode, confidence = self._local_route(text)
+        if confidence >= self.threshold or llm_fallback is None:
+            return mode, confidence, "local"
+        return self._pick(mode, confidence, *llm_fallback(text))
+
+    async def aroute(self, text: str, llm_fallback: Optional[Callable[[str], Awaitable[Tuple[Optional[str], Optional[str]]]]] = None
+                     ) -> Tuple[str, float, str]:
+        """Async variant of route; llm_fallback is a coroutine function."""
+        mode, confidence = self._local_route(text)
+        if confidence >= self.threshold or llm_fallback is None:
+            return mode, confidence, "local"
+        return self._pick(mode, confidence, *(await llm_fallback(text)))
@@ -1,9 +1,9 @@
-import requests
 from requests.auth import HTTPBasicAuth
 import json
 import os
 from jira import JIRA
 from dotenv import load_dotenv
+from ratelimit import get_limiter, request_with_limits
 
 load_dotenv()
 
@@ -55,7 +55,9 @@ def create_issue(issue_name: str, description: str, project_key : str, task_type
         }
     }
 
-    response = requests.post(
+    response = request_with_limits(
+        "jira",
+        "POST",
         url_issue,
         json=payload,
         headers=headers,
@@ -89,7 +91,8 @@ def create_project(project_name, description):
         "avatarId": 10401
     }
 
-    response = requests.request(
+    response = request_with_limits(
+        "jira",
         "POST",
         url_project,
         data=json.dumps(payload),
@@ -106,7 +109,8 @@ def create_project(project_name, description):
 
 def list_project():
     url_project=f"{BASE_URL}/project"
-    response = requests.request(
+    response = request_with_limits(
+        "jira",
         "GET",
         url_project,
         headers=headers,
@@ -118,11 +122,11 @@ def list_project():
 # function to fetch last issues based on how much days
 
 def fetch_recent_issues(days):
-    jira = JIRA(server=JIRA_SERVER, basic_auth=(JIRA_EMAIL, JIRA_API_TOKEN))
-    
     jql_query = f'created >= "-{days}d" ORDER BY created DESC'
-    
-    issues = jira.search_issues(jql_query)
+
+    with get_limiter("jira").slot():
+        jira = JIRA(server=JIRA_SERVER, basic_auth=(JIRA_EMAIL, JIRA_API_TOKEN))
+        issues = jira.search_issues(jql_query)
     
     issue_list = []
     for issue in issues:
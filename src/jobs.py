@@ -0,0 +1,130 @@
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+# States a job card moves through; a card may also end FAILED or CANCELLED
+RECORDED = "recorded"
+TRANSCRIBING = "transcribing"
+GENERATING = "generating"
+AWAITING_CONFIRMATION = "awaiting_confirmation"
+EXECUTING = "executing"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+STATUS_LABELS = {
+    RECORDED: "Recorded",
+    TRANSCRIBING: "Transcribing",
+    GENERATING: "Generating",
+    AWAITING_CONFIRMATION: "Needs confirmation",
+    EXECUTING: "Executing",
+    DONE: "Done",
+    FAILED: "Failed",
+    CANCELLED: "Cancelled",
+}
+
+
+class Job:
+    """
+    One recording and everything derived from it.
+
+    The pipeline thread fills in the transcription, mode and result as stages
+    complete; the GUI only reads a job and changes its state in response to the
+    user confirming or cancelling it.
+    """
+
+    def __init__(self, job_id: int, mode: str):
+        self.id = job_id
+        self.mode = mode
+        self.status = RECORDED
+        self.transcription = ""
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.message = ""
+        self.task_id: Optional[int] = None
+        self.timestamps = {RECORDED: time.monotonic()}
+
+    def advance(self, status: str):
+        self.status = status
+        self.timestamps[status] = time.monotonic()
+
+    def fail(self, error: str):
+        self.error = error
+        self.advance(FAILED)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def summary(self) -> str:
+        """One line for the job card list."""
+        text = self.transcription.strip() or "..."
+        if len(text) > 60:
+            text = text[:57] + "..."
+        return f"#{self.id} [{self.mode}] {STATUS_LABELS[self.status]}: {text}"
+
+
+class JobBoard:
+    """Ordered, thread-safe collection of job cards, oldest first."""
+
+    def __init__(self, max_finished: int = 20):
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[int, Job]" = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._first_recorded: Optional[float] = None
+        self._done_times: List[float] = []
+
+    def create(self, mode: str) -> Job:
+        with self._lock:
+            job = Job(next(self._ids), mode)
+            self._jobs[job.id] = job
+            if self._first_recorded is None:
+                self._first_recorded = job.timestamps[RECORDED]
+            return job
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def remove(self, job_id: int):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def next_awaiting(self) -> Optional[Job]:
+        """Oldest card still waiting for the user to confirm it."""
+        for job in self.jobs():
+            if job.status == AWAITING_CONFIRMATION:
+                return job
+        return None
+
+    def complete(self, job: Job, message: str = ""):
+        job.message = message
+        job.advance(DONE)
+        with self._lock:
+            self._done_times.append(job.timestamps[DONE])
+
+    def commands_per_minute(self) -> float:
+        """Completed commands per minute since the first recording of the session."""
+        with self._lock:
+            if not self._done_times:
+                return 0.0
+            elapsed = self._done_times[-1] - self._first_recorded
+            return 60.0 * len(self._done_times) / elapsed if elapsed > 0 else 0.0
+
+    def prune(self) -> List[int]:
+        """Forgets the oldest finished cards beyond max_finished and returns their ids."""
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.is_finished]
+            dropped = finished[:max(0, len(finished) - self.max_finished)]
+            for job_id in dropped:
+                del self._jobs[job_id]
+            return dropped
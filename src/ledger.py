@@ -0,0 +1,186 @@
+"""
+Append-only ledger of LLM calls and a report over it.
+
+Each call (one request to one backend) is a JSON line with short keys:
+ts, mode, src, backend, model, pt/ct (prompt/completion tokens), ttft and ms
+(time to first token and total latency, in ms), q (client-side queue wait, ms)
+and err (exception class, for failed calls).
+
+Report from src/: python ledger.py [--days 14] [--path FILE]
+"""
+import argparse
+import datetime
+import json
+import os
+import statistics
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional
+
+LEDGER_PATH = os.getenv("LLM_LEDGER") or os.path.join(os.path.expanduser("~"), ".taskcrafters", "llm_ledger.jsonl")
+LEDGER_ENABLED = os.getenv("LLM_LEDGER_ENABLED", "1") != "0"
+
+# A day is flagged when a metric is this much worse than the median of the days before it
+REGRESSION_THRESHOLD = 1.25
+REGRESSION_MIN_CALLS = 10
+REGRESSION_BASELINE_DAYS = 7
+
+_lock = threading.Lock()
+_file = None
+
+
+def record(mode: str, src: str, backend: Optional[str], model: Optional[str], prompt_tokens: int,
+           completion_tokens: int, seconds: float, ttft: Optional[float] = None, queued: float = 0.0,
+           error: Optional[BaseException] = None):
+    """Appends one call to the ledger. Never raises: metering must not break a request."""
+    global _file
+    if not LEDGER_ENABLED:
+        return
+    entry: Dict[str, Any] = {
+        "ts": round(time.time(), 3),
+        "mode": mode,
+        "src": src,
+        "backend": backend,
+        "model": model,
+        "pt": prompt_tokens,
+        "ct": completion_tokens,
+        "ttft": round(ttft * 1000) if ttft is not None else None,
+        "ms": round(seconds * 1000),
+    }
+    if queued >= 0.001:
+        entry["q"] = round(queued * 1000)
+    if error is not None:
+        entry["err"] = error.__class__.__name__
+    line = json.dumps(entry, separators=(",", ":")) + "\n"
+    try:
+        with _lock:
+            if _file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(LEDGER_PATH)), exist_ok=True)
+                _file = open(LEDGER_PATH, "a", encoding="utf-8", buffering=1)
+            _file.write(line)
+    except OSError as e:
+        print(f"Could not write LLM ledger: {e}")
+
+
+def read_entries(path: str, since: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line after a crash; the rest of the ledger is still good
+                continue
+            if since is None or entry.get("ts", 0) >= since:
+                yield entry
+
+
+def _day(entry: Dict[str, Any]) -> str:
+    return datetime.date.fromtimestamp(entry["ts"]).isoformat()
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(entries: List[Dict[str, Any]]) -> Dict[str, float]:
+    ok = [e for e in entries if "err" not in e]
+    latencies = [e["ms"] for e in ok] or [0]
+    ttfts = [e["ttft"] for e in ok if e.get("ttft") is not None]
+    return {
+        "calls": len(entries),
+        "errors": len(entries) - len(ok),
+        "prompt_tokens": sum(e.get("pt", 0) for e in entries),
+        "completion_tokens": sum(e.get("ct", 0) for e in entries),
+        "tokens_per_call": sum(e.get("pt", 0) + e.get("ct", 0) for e in entries) / len(entries),
+        "p50_ms": _percentile(latencies, 0.5),
+        "p95_ms": _percentile(latencies, 0.95),
+        "ttft_p50_ms": _percentile(ttfts, 0.5) if ttfts else None,
+        "queue_ms": sum(e.get("q", 0) for e in entries) / len(entries),
+    }
+
+
+def group(entries: List[Dict[str, Any]], key) -> Dict[str, Dict[str, float]]:
+    groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for entry in entries:
+        groups[key(entry)].append(entry)
+    return {name: summarize(items) for name, items in sorted(groups.items())}
+
+
+def find_regressions(entries: List[Dict[str, Any]]) -> List[str]:
+    """
+    Compares each mode's latest day with the median of up to REGRESSION_BASELINE_DAYS days before it.
+
+    Flags p50/p95 latency, time to first token and tokens per call that grew by
+    more than REGRESSION_THRESHOLD, and error rates that went up by 5 points or more.
+    """
+    flags = []
+    by_mode: Dict[str, Dict[str, List[Dict[str, Any]]]] = defaultdict(lambda: defaultdict(list))
+    for entry in entries:
+        by_mode[entry.get("mode", "?")][_day(entry)].append(entry)
+
+    for mode, days in sorted(by_mode.items()):
+        ordered = sorted(days)
+        latest = ordered[-1]
+        baseline_days = [d for d in ordered[:-1][-REGRESSION_BASELINE_DAYS:] if len(days[d]) >= REGRESSION_MIN_CALLS]
+        if len(days[latest]) < REGRESSION_MIN_CALLS or not baseline_days:
+            continue
+        current = summarize(days[latest])
+        baselines = [summarize(days[d]) for d in baseline_days]
+        for metric in ("p50_ms", "p95_ms", "ttft_p50_ms", "tokens_per_call"):
+            history = [b[metric] for b in baselines if b[metric]]
+            if current[metric] is None or not history:
+                continue
+            reference = statistics.median(history)
+            if reference and current[metric] > reference * REGRESSION_THRESHOLD:
+                flags.append(f"{mode}: {metric} {current[metric]:.0f} on {latest} vs {reference:.0f} "
+                             f"({current[metric] / reference - 1:+.0%})")
+        error_rate = current["errors"] / current["calls"]
+        reference = statistics.median(b["errors"] / b["calls"] for b in baselines)
+        if error_rate - reference >= 0.05:
+            flags.append(f"{mode}: error rate {error_rate:.0%} on {latest} vs {reference:.0%}")
+    return flags
+
+
+def _print_table(title: str, rows: Dict[str, Dict[str, float]]):
+    print(f"\n{title}")
+    print(f"  {'':24} {'calls':>6} {'err':>4} {'prompt':>9} {'compl':>8} {'tok/call':>8} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'ttft':>6} {'queue':>6}")
+    for name, s in rows.items():
+        ttft = f"{s['ttft_p50_ms']:.0f}" if s["ttft_p50_ms"] is not None else "-"
+        print(f"  {name[:24]:24} {s['calls']:6} {s['errors']:4} {s['prompt_tokens']:9} {s['completion_tokens']:8} "
+              f"{s['tokens_per_call']:8.0f} {s['p50_ms']:7.0f} {s['p95_ms']:7.0f} {ttft:>6} {s['queue_ms']:6.0f}")
+
+
+def report(path: str, days: int):
+    if not os.path.exists(path):
+        print(f"No ledger at {path}")
+        return
+    entries = list(read_entries(path, time.time() - days * 86400))
+    if not entries:
+        print(f"No LLM calls recorded in the last {days} days")
+        return
+    print(f"{len(entries)} LLM calls in the last {days} days ({path})")
+    _print_table("By mode", group(entries, lambda e: e.get("mode", "?")))
+    _print_table("By day", group(entries, _day))
+    _print_table("By backend", group(entries, lambda e: f"{e.get('backend') or '?'} / {e.get('model') or '?'}"))
+
+    flags = find_regressions(entries)
+    print("\nRegressions")
+    for flag in flags:
+        print(f"  ⚠️ {flag}")
+    if not flags:
+        print("  none")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token and latency report over the LLM call ledger")
+    parser.add_argument("--path", default=LEDGER_PATH)
+    parser.add_argument("--days", type=int, default=14)
+    args = parser.parse_args()
+    report(args.path, args.days)
+
+
+if __name__ == "__main__":
+    main()
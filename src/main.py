@@ -3,22 +3,35 @@ import sys
 import os
 import sounddevice as sd
 import numpy as np
-import threading
-import queue
+import asyncio
 from pywhispercpp.model import Model
 
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QTextEdit, QMessageBox, QGroupBox, QSizePolicy,
-    QDialog, QLineEdit, QFormLayout, QTabWidget, QScrollArea, QFileDialog
+    QDialog, QLineEdit, QFormLayout, QTabWidget, QScrollArea, QFileDialog,
+    QCheckBox, QListWidget, QListWidgetItem, QSpinBox
 )
-from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QObject, QSettings
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal, QObject, QSettings, QFileSystemWatcher, QStandardPaths
 from PyQt6.QtGui import QFont, QPalette, QColor, QMovie
 
 from styles import APP_STYLESHEET
+from intent_router import IntentRouter, MODES
+from contacts_store import ContactStore, validate_contacts_file
+from pipeline import PipelineEngine
+from jobs import (
+    AWAITING_CONFIRMATION, CANCELLED, DONE, EXECUTING, FAILED, GENERATING, STATUS_LABELS, TRANSCRIBING,
+    Job, JobBoard
+)
+from speculation import DEFAULT_STABILITY, SKIPPED, Speculator
+from conversation import ConversationContext
 
 SAMPLE_RATE = 16000
 CHANNELS = 1
+# How often the audio recorded so far is re-transcribed while speculative generation is on
+PARTIAL_TRANSCRIPT_INTERVAL_MS = 1500
+# The Taskcrafters agent is warmed in the background this long after the window appears
+AGENT_WARMUP_DELAY_MS = 3000
 
 class WorkerSignals(QObject):
     result = pyqtSignal(str, object)
@@ -55,10 +68,16 @@ class SettingsDialog(QDialog):
         self.nebius_base_url_input = QLineEdit()
         self.nebius_api_key_input.setEchoMode(QLineEdit.EchoMode.Password)
         self.nebius_model_input = QLineEdit()
+        self.nebius_small_model_input = QLineEdit()
+        self.nebius_small_model_input.setPlaceholderText("Optional: tried first, escalates to Model on failure")
+        self.nebius_backends_input = QLineEdit()
+        self.nebius_backends_input.setPlaceholderText('JSON list or file: [{"name", "base_url", "api_key", "model", "weight"}]')
         
         nebius_layout.addRow("API Key:", self.nebius_api_key_input)
         nebius_layout.addRow("Base URL:", self.nebius_base_url_input)
         nebius_layout.addRow("Model:", self.nebius_model_input)
+        nebius_layout.addRow("Small model:", self.nebius_small_model_input)
+        nebius_layout.addRow("Extra backends:", self.nebius_backends_input)
 
         
         scroll_layout.addRow(self.nebius_group)
@@ -90,6 +109,36 @@ class SettingsDialog(QDialog):
         
         scroll_layout.addRow(self.whisper_settings_group)
 
+        self.routing_group = QGroupBox("Mode Routing")
+        routing_layout = QFormLayout(self.routing_group)
+
+        self.auto_route_checkbox = QCheckBox("Pick the mode automatically from what I say")
+
+        routing_layout.addRow(self.auto_route_checkbox)
+
+        scroll_layout.addRow(self.routing_group)
+
+        self.agent_group = QGroupBox("Taskcrafters Agent")
+        agent_layout = QFormLayout(self.agent_group)
+
+        self.native_agent_checkbox = QCheckBox("Use native tool calling instead of the LangChain agent")
+
+        agent_layout.addRow(self.native_agent_checkbox)
+
+        scroll_layout.addRow(self.agent_group)
+
+        self.speculation_group = QGroupBox("Speculative Generation")
+        speculation_layout = QFormLayout(self.speculation_group)
+
+        self.speculation_checkbox = QCheckBox("Start generating before I finish speaking")
+        self.speculation_stability_input = QSpinBox()
+        self.speculation_stability_input.setRange(1, 10)
+
+        speculation_layout.addRow(self.speculation_checkbox)
+        speculation_layout.addRow("Stable partials required:", self.speculation_stability_input)
+
+        scroll_layout.addRow(self.speculation_group)
+
         self.contacts_group = QGroupBox("Contacts Management")
         self.contacts_path_label = QLabel("No contacts file loaded")
         self.load_contacts_button = QPushButton("Load Contacts File")
@@ -140,17 +189,16 @@ class SettingsDialog(QDialog):
     def load_contacts_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
             self, 
-            "Select Contacts JSON File", 
+            "Select Contacts File", 
             "", 
-            "JSON Files (*.json);;All Files (*)"
+            "Contacts (*.json *.csv *.vcf *.vcard);;All Files (*)"
         )
         if file_path:
             try:
                 # Validate the contacts file
-                with open(file_path, 'r') as f:
-                    contacts = json.load(f)
-                    if not isinstance(contacts, dict):
-                        raise ValueError("Contacts file should contain a dictionary")
+                error = validate_contacts_file(file_path)
+                if error:
+                    raise ValueError(error)
                 
                 # Save the contacts path to settings
                 self.settings.setValue("contacts/path", file_path)
@@ -164,6 +212,8 @@ class SettingsDialog(QDialog):
         self.nebius_api_key_input.setText(self.settings.value("nebius/api_key", ""))
         self.nebius_base_url_input.setText(self.settings.value("nebius/base_url", ""))
         self.nebius_model_input.setText(self.settings.value("nebius/model", ""))
+        self.nebius_small_model_input.setText(self.settings.value("nebius/small_model", ""))
+        self.nebius_backends_input.setText(self.settings.value("nebius/backends", ""))
         self.sender_email_input.setText(self.settings.value("email/sender", ""))
         self.sender_password_input.setText(self.settings.value("email/password", ""))
         self.default_recipient_input.setText(self.settings.value("email/default_recipient", ""))
@@ -174,6 +224,10 @@ class SettingsDialog(QDialog):
         self.whisper_model_input.setText(self.settings.value("whisper/model", "base"))
         self.whisper_lang_input.setText(self.settings.value("whisper/lang", "en"))
         self.whisper_threads_input.setText(self.settings.value("whisper/threads", "4"))
+        self.auto_route_checkbox.setChecked(self.settings.value("routing/auto", False, type=bool))
+        self.native_agent_checkbox.setChecked(self.settings.value("agent/native", False, type=bool))
+        self.speculation_checkbox.setChecked(self.settings.value("speculation/enabled", False, type=bool))
+        self.speculation_stability_input.setValue(self.stability_setting())
         contacts_path = self.settings.value("contacts/path", "")
         if contacts_path:
             self.contacts_path_label.setText(f"Loaded: {os.path.basename(contacts_path)}")
@@ -182,6 +236,8 @@ class SettingsDialog(QDialog):
         self.settings.setValue("nebius/api_key", self.nebius_api_key_input.text())
         self.settings.setValue("nebius/base_url", self.nebius_base_url_input.text())
         self.settings.setValue("nebius/model", self.nebius_model_input.text())
+        self.settings.setValue("nebius/small_model", self.nebius_small_model_input.text())
+        self.settings.setValue("nebius/backends", self.nebius_backends_input.text())
         self.settings.setValue("email/sender", self.sender_email_input.text())
         self.settings.setValue("email/password", self.sender_password_input.text())
         self.settings.setValue("jira/email", self.jira_email_input.text())
@@ -193,14 +249,27 @@ class SettingsDialog(QDialog):
         self.settings.setValue("whisper/model", self.whisper_model_input.text())
         self.settings.setValue("whisper/lang", self.whisper_lang_input.text())
         self.settings.setValue("whisper/threads", self.whisper_threads_input.text())
+        self.settings.setValue("routing/auto", self.auto_route_checkbox.isChecked())
+        self.settings.setValue("agent/native", self.native_agent_checkbox.isChecked())
+        self.settings.setValue("speculation/enabled", self.speculation_checkbox.isChecked())
+        self.settings.setValue("speculation/stability", self.speculation_stability_input.value())
         self.accept()
 
+    def stability_setting(self):
+        """The saved stability, or DEFAULT_STABILITY if what is stored (e.g. by an older version) is not a number."""
+        try:
+            return max(1, int(self.settings.value("speculation/stability", DEFAULT_STABILITY)))
+        except (TypeError, ValueError):
+            return DEFAULT_STABILITY
+
     def get_settings(self):
         return {
             "nebius": {
                 "api_key": self.settings.value("nebius/api_key", ""),
                 "base_url": self.settings.value("nebius/base_url", ""),
-                "model": self.settings.value("nebius/model", "")
+                "model": self.settings.value("nebius/model", ""),
+                "small_model": self.settings.value("nebius/small_model", ""),
+                "backends": self.settings.value("nebius/backends", "")
             },
             "email": {
                 "sender": self.settings.value("email/sender", ""),
@@ -215,6 +284,16 @@ class SettingsDialog(QDialog):
                 "lang": self.settings.value("whisper/lang", "en"),
                 "threads": int(self.settings.value("whisper/threads", 4))
             },
+            "routing": {
+                "auto": self.settings.value("routing/auto", False, type=bool)
+            },
+            "agent": {
+                "native": self.settings.value("agent/native", False, type=bool)
+            },
+            "speculation": {
+                "enabled": self.settings.value("speculation/enabled", False, type=bool),
+                "stability": self.stability_setting()
+            },
             "jira": {
                 "email": self.settings.value("jira/email", ""),
                 "token": self.settings.value("jira/token", ""),
@@ -233,10 +312,22 @@ class VoiceRecorderApp(QMainWindow):
         self.is_recording = False
         self.audio_data = []
         self.stream = None
-        self.current_transcription = ""
-        self.suggested_command = ""
-        self.result_queue = queue.Queue()
         self.current_mode = "command"
+        # Every recording becomes a job card that moves through the pipeline on its own
+        self.jobs = JobBoard()
+        self.job_items = {}
+        self.selected_job_id = None
+        # Speculative generation for the recording in progress
+        self.speculator = None
+        self.partial_pending = False
+        self.intent_router = IntentRouter()
+        # Confirmed jobs of this session, so follow-ups can refer back to them
+        self.context = ConversationContext()
+
+        # Pipeline stages run on an asyncio loop in the background; results come back as queued signals
+        self.engine = PipelineEngine()
+        self.signals = WorkerSignals()
+        self.signals.result.connect(self.handle_result)
         
         # Initialize UI first
         self.init_ui()
@@ -257,13 +348,17 @@ class VoiceRecorderApp(QMainWindow):
         # Now safe to call methods that use UI elements
         self.check_audio_input()
         self.set_ui_state('idle')
-        
-        # Set up queue timer
-        self.queue_timer = QTimer(self)
-        self.queue_timer.timeout.connect(self.check_queue)
-        self.queue_timer.start(100)
 
-        self.contacts = {}
+        # Contacts live in a local SQLite store that follows the configured file
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+        self.contact_store = ContactStore(os.path.join(data_dir, "contacts.db"))
+        self.contacts_watcher = QFileSystemWatcher(self)
+        self.contacts_watcher.fileChanged.connect(self.on_contacts_file_changed)
+        self.contacts_reload_timer = QTimer(self)
+        self.contacts_reload_timer.setSingleShot(True)
+        self.contacts_reload_timer.timeout.connect(self.load_contacts)
+        self.partial_timer = QTimer(self)
+        self.partial_timer.timeout.connect(self.transcribe_partial_snapshot)
         self.load_contacts()
         self.update_environment_variables()
 
@@ -322,6 +417,15 @@ class VoiceRecorderApp(QMainWindow):
         self.record_button.clicked.connect(self.toggle_recording)
         main_layout.addWidget(self.record_button)
 
+        # Job cards: one per recording, selectable to review and confirm independently
+        jobs_group = QGroupBox("Jobs")
+        jobs_layout = QVBoxLayout(jobs_group)
+        self.job_list = QListWidget()
+        self.job_list.setMaximumHeight(120)
+        self.job_list.currentItemChanged.connect(self.on_job_selected)
+        jobs_layout.addWidget(self.job_list)
+        main_layout.addWidget(jobs_group)
+
         # Transcription Group
         transcription_group = QGroupBox("Transcription / Instruction")
         transcription_layout = QVBoxLayout(transcription_group)
@@ -421,72 +525,61 @@ class VoiceRecorderApp(QMainWindow):
     
 
     def load_contacts(self):
-        """Load contacts from the configured JSON file"""
+        """Watch the configured contacts file and import it into the store if it changed"""
         contacts_path = self.app_settings["contacts"]["path"]
-        if contacts_path and os.path.exists(contacts_path):
-            try:
-                with open(contacts_path, 'r') as f:
-                    self.contacts = json.load(f)
-                    if not isinstance(self.contacts, dict):
-                        raise ValueError("Contacts file should contain a dictionary")
-                print(f"Loaded {len(self.contacts)} contacts")
-            except Exception as e:
-                print(f"Error loading contacts: {e}")
-                self.contacts = {}
+        watched = self.contacts_watcher.files()
+        if watched:
+            self.contacts_watcher.removePaths(watched)
+        if not contacts_path or not os.path.exists(contacts_path):
+            return
+
+        # Editors often save by replacing the file, which drops it from the watcher
+        self.contacts_watcher.addPath(contacts_path)
+        if self.contact_store.is_current(contacts_path):
+            print(f"Contacts up to date ({len(self.contact_store)} contacts)")
+            return
+
+        self.engine.submit(self.run_contacts_import(contacts_path))
+
+    async def run_contacts_import(self, contacts_path):
+        try:
+            # No deadline: a first import of a large address book legitimately takes a while
+            added, removed = await self.engine.run_blocking("contacts", self.contact_store.import_file, contacts_path)
+            self.emit("contacts_loaded", f"Contacts updated (+{added} -{removed}, {len(self.contact_store)} total)")
+        except Exception as e:
+            print(f"Error loading contacts: {e}")
+            self.emit("contacts_error", f"Error loading contacts: {e}")
+
+    def on_contacts_file_changed(self, path):
+        # Debounce: a single save can emit several change notifications
+        self.contacts_reload_timer.start(500)
 
     def set_ui_state(self, state):
-        if state == 'idle':
-            self.record_button.setText("Record")
-            self.record_button.setEnabled(True)
-            self.execute_button.setEnabled(False)
-            self.cancel_button.setEnabled(False)
-            self.send_email_button.setEnabled(False)
-            self.cancel_email_button.setEnabled(False)
-            self.execute_jira_button.setEnabled(False)
-            self.cancel_jira_button.setEnabled(False)
-            self.cancel_taskcrafters_button.setEnabled(False)
-            self.update_status("Idle. Press Record.")
-        elif state == 'recording':
+        # Recording is never blocked by jobs still in the pipeline
+        self.record_button.setEnabled(True)
+        if state == 'recording':
             self.record_button.setText("Stop Recording")
-            self.record_button.setEnabled(True)
-            self.execute_button.setEnabled(False)
-            self.cancel_button.setEnabled(False)
-            self.send_email_button.setEnabled(False)
-            self.cancel_email_button.setEnabled(False)
-            self.execute_jira_button.setEnabled(False)
-            self.cancel_jira_button.setEnabled(False)
-            self.cancel_taskcrafters_button.setEnabled(False)
-            self.update_transcription_display("Recording...")
-            self.update_command_display("...")
-            self.update_email_display("...")
-            self.update_jira_display("...")
-            self.update_taskcrafters_display("...")
             self.update_status("Recording audio...")
-        elif state == 'processing':
-            self.record_button.setText("Processing...")
-            self.record_button.setEnabled(False)
-            self.execute_button.setEnabled(False)
-            self.cancel_button.setEnabled(False)
-            self.send_email_button.setEnabled(False)
-            self.cancel_email_button.setEnabled(False)
-            self.execute_jira_button.setEnabled(False)
-            self.cancel_jira_button.setEnabled(False)
-            self.cancel_taskcrafters_button.setEnabled(False)
-        elif state == 'awaiting_confirmation':
+        else:
             self.record_button.setText("Record")
-            self.record_button.setEnabled(True)
-            if self.current_mode == "command":
-                self.execute_button.setEnabled(True)
-                self.cancel_button.setEnabled(True)
-            elif self.current_mode == "email":
-                self.send_email_button.setEnabled(True)
-                self.cancel_email_button.setEnabled(True)
-            elif self.current_mode == "jira":
-                self.execute_jira_button.setEnabled(True)
-                self.cancel_jira_button.setEnabled(True)
-            elif self.current_mode == "taskcrafters":
-                self.cancel_taskcrafters_button.setEnabled(True)
-            self.update_status("Review suggested command and Execute or Clear.")
+            if state == 'idle':
+                self.update_status("Idle. Press Record.")
+        self.refresh_controls()
+
+    def refresh_controls(self):
+        """Enable the action buttons that apply to the selected job card."""
+        job = self.selected_job()
+        mode = job.mode if job else None
+        awaiting = job is not None and job.status == AWAITING_CONFIRMATION
+        # An executing card's side effect (mail, ticket, command) runs on a thread that cannot be stopped
+        cancellable = job is not None and job.status != EXECUTING
+        self.execute_button.setEnabled(awaiting and mode == "command")
+        self.cancel_button.setEnabled(cancellable and mode == "command")
+        self.send_email_button.setEnabled(awaiting and mode == "email")
+        self.cancel_email_button.setEnabled(cancellable and mode == "email")
+        self.execute_jira_button.setEnabled(awaiting and mode == "jira")
+        self.cancel_jira_button.setEnabled(cancellable and mode == "jira")
+        self.cancel_taskcrafters_button.setEnabled(cancellable and mode == "taskcrafters")
 
     def check_audio_input(self):
         try:
@@ -501,12 +594,21 @@ class VoiceRecorderApp(QMainWindow):
         os.environ["NEBIUS_API_KEY"] = self.app_settings["nebius"]["api_key"]
         os.environ["NEBIUS_BASE_URL"] = self.app_settings["nebius"]["base_url"]
         os.environ["MODEL"] = self.app_settings["nebius"]["model"]
+        os.environ["SMALL_MODEL"] = self.app_settings["nebius"]["small_model"]
+        os.environ["LLM_BACKENDS"] = self.app_settings["nebius"]["backends"]
+        os.environ["TASKCRAFTERS_ENGINE"] = "native" if self.app_settings["agent"]["native"] else "langchain"
         os.environ["GMAIL_USER"] = self.app_settings["email"]["sender"]
         os.environ["GMAIL_APP_PASSWORD"] = self.app_settings["email"]["password"]
         os.environ["JIRA_EMAIL"] = self.app_settings["jira"]["email"]
         os.environ["JIRA_API_KEY"] = self.app_settings["jira"]["token"]
         os.environ["JIRA_USER_ID"] = self.app_settings["jira"]["userid"]
         os.environ["JIRA_BASE_URL"] = self.app_settings["jira"]["base_url"]
+        # The LLM call ledger, tool result cache, last known location and calendar mirror live next to the app's other data unless set elsewhere
+        data_dir = QStandardPaths.writableLocation(QStandardPaths.StandardLocation.AppDataLocation)
+        os.environ.setdefault("LLM_LEDGER", os.path.join(data_dir, "llm_ledger.jsonl"))
+        os.environ.setdefault("TOOL_CACHE", os.path.join(data_dir, "tool_cache.db"))
+        os.environ.setdefault("LOCATION_CACHE", os.path.join(data_dir, "location.json"))
+        os.environ.setdefault("CALENDAR_MIRROR", os.path.join(data_dir, "calendar.db"))
 
 
 
@@ -520,8 +622,16 @@ class VoiceRecorderApp(QMainWindow):
                 n_threads=self.app_settings["whisper"]["threads"],
                 print_realtime=False
             )
+            self.load_contacts()
             self.update_status("Settings updated successfully")
 
+    def show_mode_tab(self, mode):
+        # Follow the selected job to its tab without going through set_mode
+        self.current_mode = mode
+        self.mode_tabs.blockSignals(True)
+        self.mode_tabs.setCurrentIndex(MODES.index(mode))
+        self.mode_tabs.blockSignals(False)
+
     def set_mode_from_tab(self, index):
         if index == 0:
             self.set_mode("command")
@@ -533,8 +643,9 @@ class VoiceRecorderApp(QMainWindow):
             self.set_mode("taskcrafters")
 
     def set_mode(self, mode):
+        # Only affects the next recording; jobs already in flight keep their mode
         self.current_mode = mode
-        self.clear_command()
+        self.refresh_controls()
 
     def update_jira_display(self, text):
         self.jira_label.setText(text if text else "...")
@@ -570,8 +681,6 @@ class VoiceRecorderApp(QMainWindow):
 
         self.is_recording = True
         self.audio_data = []
-        self.current_transcription = ""
-        self.suggested_command = ""
         self.set_ui_state('recording')
         self.show_animation()
         try:
@@ -582,6 +691,13 @@ class VoiceRecorderApp(QMainWindow):
                 dtype='int16'
             )
             self.stream.start()
+            mode = self.current_mode
+            # Without routing a taskcrafters recording could only ever be skipped (see speculate)
+            if self.app_settings["speculation"]["enabled"] and (
+                    mode != "taskcrafters" or self.app_settings["routing"]["auto"]):
+                self.speculator = Speculator(lambda text: self.speculate(text, mode),
+                                             self.app_settings["speculation"]["stability"])
+                self.partial_timer.start(PARTIAL_TRANSCRIPT_INTERVAL_MS)
         except Exception as e:
             QMessageBox.critical(self, "Recording Error", f"Could not start recording stream: {e}")
             self.is_recording = False
@@ -594,9 +710,11 @@ class VoiceRecorderApp(QMainWindow):
             return
 
         self.is_recording = False
-        self.set_ui_state('processing')
+        self.set_ui_state('stopped')
         self.hide_animation()
         self.update_status("Stopping recording...")
+        self.partial_timer.stop()
+        speculator, self.speculator = self.speculator, None
 
         try:
             if self.stream:
@@ -605,22 +723,23 @@ class VoiceRecorderApp(QMainWindow):
                 self.stream = None
 
             if not self.audio_data:
+                if speculator:
+                    self.engine.loop.call_soon_threadsafe(speculator.discard)
                 self.update_status("Status: No audio recorded.")
                 self.set_ui_state('idle')
                 return
 
-            self.update_status("Status: Processing audio...")
             recording = np.concatenate(self.audio_data, axis=0)
             audio_float32 = (recording / 32768.0).astype(np.float32)
 
-            self.update_status("Transcribing audio (Whisper)...")
-            self.update_transcription_display("Transcribing...")
-
-            transcribe_thread = threading.Thread(target=self.run_whisper, args=(audio_float32,))
-            transcribe_thread.daemon = True
-            transcribe_thread.start()
+            job = self.jobs.create(self.current_mode)
+            self.add_job_card(job)
+            job.task_id = self.engine.submit(self.process_utterance(job, audio_float32, speculator))
+            self.update_status(f"Job #{job.id} queued. You can record the next command.")
 
         except Exception as e:
+            if speculator:
+                self.engine.loop.call_soon_threadsafe(speculator.discard)
             QMessageBox.critical(self, "Processing Error", f"Error processing audio: {e}")
             self.update_status("Status: Error processing audio", is_error=True)
             self.set_ui_state('idle')
@@ -640,321 +759,483 @@ class VoiceRecorderApp(QMainWindow):
         self.animation_label.hide()
 
 
-    def run_whisper(self, audio_data):
+    def emit(self, message_type, data):
+        # Called from the pipeline thread; Qt queues the delivery onto the GUI thread
+        self.signals.result.emit(message_type, data)
+
+    def transcribe(self, audio_data):
+        segments = self.model.transcribe(audio_data)
+        transcription = " ".join(segment.text for segment in segments)
+        print(f"Whisper Output:\n{transcription}")
+        return transcription
+
+    def transcribe_partial_snapshot(self):
+        # Skip a tick rather than queue partials behind each other on the Whisper executor
+        if self.partial_pending or not self.audio_data or self.speculator is None:
+            return
+        self.partial_pending = True
+        audio = (np.concatenate(list(self.audio_data), axis=0) / 32768.0).astype(np.float32)
+        self.engine.submit(self.transcribe_partial(self.speculator, audio))
+
+    async def transcribe_partial(self, speculator, audio_data):
         try:
-            segments = self.model.transcribe(audio_data)
-            transcription = " ".join(segment.text for segment in segments)
-            print(f"Whisper Output:\n{transcription}")
-            self.result_queue.put(("transcription_success", transcription))
+            partial = await self.engine.run_cpu("transcribe", self.transcribe, audio_data)
+            speculator.observe(partial)
+        except Exception as e:
+            print(f"Partial transcription failed: {e}", flush=True)
+        finally:
+            self.partial_pending = False
+
+    async def speculate(self, text, mode):
+        """Generation on a partial transcript. Only the LLM is called; nothing runs until the user confirms."""
+        shadow = Job(0, mode)
+        shadow.transcription = text
+        if self.app_settings["routing"]["auto"]:
+            shadow.mode = await self.engine.stage("route", self.route_instruction(text))
+        # The LangChain agent runs in a worker thread and cannot be cancelled, so it is never speculated
+        if shadow.mode == "taskcrafters":
+            return SKIPPED
+        await self.generate(shadow, route=False)
+        return shadow
+
+    async def process_utterance(self, job, audio_data, speculator=None):
+        try:
+            await self.run_job(job, audio_data, speculator)
+        finally:
+            # Cancelled, failed or already resolved: nothing speculative may outlive its job
+            if speculator:
+                speculator.discard()
+
+    async def run_job(self, job, audio_data, speculator):
+        job.advance(TRANSCRIBING)
+        self.emit("job_updated", job.id)
+        try:
+            job.transcription = await self.engine.run_cpu("transcribe", self.transcribe, audio_data)
         except Exception as e:
             error_message = f"An unexpected error occurred during transcription: {e}"
             print(error_message, flush=True)
-            self.result_queue.put(("transcription_error", error_message))
+            job.fail(error_message)
+            self.emit("job_updated", job.id)
+            return
 
-    def run_gpt_command_thread(self, instruction):
+        if job.transcription.strip():
+            job.advance(GENERATING)
+            self.emit("job_updated", job.id)
+            speculative = await speculator.resolve(job.transcription) if speculator else None
+            if speculative is None:
+                await self.generate(job)
+            elif speculative.status == FAILED:
+                job.mode = speculative.mode
+                job.fail(speculative.error)
+            else:
+                job.mode = speculative.mode
+                self.propose(job, speculative.result)
+        else:
+            job.fail("Transcription was empty.")
+        self.emit("job_updated", job.id)
+
+    async def route_instruction(self, instruction):
+        mode, confidence, source = await self.intent_router.aroute(instruction, llm_fallback=aget_mode_prompt)
+        print(f"Routed instruction to {mode} mode ({source}, confidence {confidence:.2f})")
+        return mode
+
+    @staticmethod
+    def propose(job, result):
+        job.result = result
+        job.advance(AWAITING_CONFIRMATION)
+
+    async def generate(self, job, route=True):
+        instruction = job.transcription
         try:
-            if self.current_mode == "command":
-                command, error = get_cmd(instruction)
+            if route and self.app_settings["routing"]["auto"]:
+                job.mode = await self.engine.stage("route", self.route_instruction(instruction))
+                self.emit("job_updated", job.id)
+
+            # The agent takes no chat history, so none is selected for it
+            history = [] if job.mode == "taskcrafters" else self.context.messages(job.mode, instruction)
+            if job.mode == "command":
+                command, error = await self.engine.stage("generate", aget_cmd(instruction, history))
                 if error:
-                    self.result_queue.put(("gpt_error", error))
+                    job.fail(error)
                 elif command:
-                    self.result_queue.put(("gpt_success", command))
+                    self.propose(job, command)
                 else:
-                    self.result_queue.put(("gpt_error", "Failed to generate command (Unknown reason)."))
-            elif self.current_mode == "email":
-                email_data = generate_email_from_prompt(instruction, self.contacts)
+                    job.fail("Failed to generate command (Unknown reason).")
+            elif job.mode == "email":
+                # Only the contacts mentioned in the instruction are sent to the LLM
+                # SQLite lookups block, so they run on the I/O pool rather than the event loop
+                candidates = await self.engine.run_blocking("contacts", self.contact_store.shortlist, instruction)
+                email_data = await self.engine.stage("generate", agenerate_email_from_prompt(instruction, candidates, history))
                 if email_data:
-                    self.result_queue.put(("email_success", email_data))
+                    self.propose(job, email_data)
                 else:
-                    self.result_queue.put(("email_error", "Failed to generate email content."))
-            elif self.current_mode == "taskcrafters":
-                real_time_data = generate_response(instruction)
+                    job.fail("Failed to generate email content.")
+            elif job.mode == "taskcrafters":
+                # The LangChain agent is synchronous, so it runs on the I/O pool
+                real_time_data = await self.engine.run_blocking("generate", generate_response, instruction)
                 if real_time_data:
-                    self.result_queue.put(("success_answer", real_time_data))
+                    job.result = real_time_data
+                    self.jobs.complete(job, real_time_data)
+                    # So a follow-up in another mode ("email that to Sara") can refer to the answer
+                    self.context.add(job.mode, instruction, real_time_data)
                 else:
-                    self.result_queue.put(("no_answer", "Failed to Find answer!."))
+                    job.fail("Failed to Find answer!.")
             else:  # jira mode
-                jira_data, error = get_jira_prompt(instruction)
+                jira_data, error = await self.engine.stage("generate", aget_jira_prompt(instruction, history))
                 if error:
-                    self.result_queue.put(("jira_error", error))
+                    job.fail(error)
                 elif jira_data:
-                    self.result_queue.put(("jira_success", jira_data))
+                    self.propose(job, jira_data)
                 else:
-                    self.result_queue.put(("jira_error", "Failed to generate Jira operation"))
+                    job.fail("Failed to generate Jira operation")
         except Exception as e:
             error_message = f"An unexpected error occurred during command generation: {e}"
             print(error_message, flush=True)
-            if self.current_mode == "command":
-                self.result_queue.put(("gpt_error", error_message))
-            elif self.current_mode == "email":
-                self.result_queue.put(("email_error", error_message))
-            elif self.current_mode == "taskcrafters":
-                self.result_queue.put(("no_answer", error_message))
-            else:
-                self.result_queue.put(("jira_error", error_message))
+            job.fail(error_message)
 
-    def check_queue(self):
+    def handle_result(self, message_type, data):
         try:
-            message_type, data = self.result_queue.get_nowait()
-
-            if message_type == "transcription_success":
-                self.current_transcription = data
-                self.update_transcription_display(self.current_transcription)
-                if self.current_transcription:
-                    self.update_status("Generating command (Automation)...")
-                    gpt_thread = threading.Thread(target=self.run_gpt_command_thread, args=(self.current_transcription,))
-                    gpt_thread.daemon = True
-                    gpt_thread.start()
-                else:
-                    self.update_status("Transcription was empty.", is_error=True)
-                    self.set_ui_state('idle')
+            if message_type == "job_updated":
+                self.on_job_updated(data)
 
-            elif message_type == "transcription_error":
-                self.update_transcription_display(f"Error: {data}")
-                self.update_status(f"Transcription failed", is_error=True)
-                QMessageBox.critical(self, "Transcription Error", data)
-                self.set_ui_state('idle')
-
-            elif message_type == "gpt_success":
-                self.suggested_command = data
-                self.update_command_display(self.suggested_command)
-                self.set_ui_state('awaiting_confirmation')
+            elif message_type == "execute_error":
+                job_id, title, message = data
+                self.on_job_updated(job_id)
+                QMessageBox.critical(self, title, message)
 
-            elif message_type == "success_answer":
-                self.suggested_command = data
-                self.update_taskcrafters_display(self.suggested_command)
-                self.set_ui_state('awaiting_confirmation')
+            elif message_type == "contacts_loaded":
+                self.update_status(data)
 
-            elif message_type == "no_answer":
-                self.update_command_display(f"Error generating command.")
-                self.update_status(f"Command generation failed", is_error=True)
-                QMessageBox.critical("Command Generation Error")
-                self.set_ui_state('idle')
+            elif message_type == "contacts_error":
+                self.update_status(data, is_error=True)
 
-            elif message_type == "gpt_error":
-                self.update_command_display(f"Error generating command.")
-                self.update_status(f"Command generation failed", is_error=True)
-                QMessageBox.critical(self, "Command Generation Error", data)
-                self.set_ui_state('idle')
-                
-            elif message_type == "email_success":
-                self.suggested_command = data
-                email_text = f"To: {data['contact']}\nSubject: {data['subject']}\n\n{data['body']}"
-                self.update_email_display(email_text)
-                self.set_ui_state('awaiting_confirmation')
-                
-            elif message_type == "email_error":
-                self.update_email_display(f"Error generating email content.")
-                self.update_status(f"Email generation failed", is_error=True)
-                QMessageBox.critical(self, "Email Generation Error", data)
-                self.set_ui_state('idle')
-
-            elif message_type == "jira_success":
-                self.suggested_command = data
-                operation = data["operation"]
-                display_text = f"Operation: {operation}\n"
-                
-                if operation == "create_issue":
-                    params = data["params"]
-                    display_text += f"Issue: {params['issue_name']}\n"
-                    display_text += f"Project: {params['project_key']}\n"
-                    display_text += f"Type: {params['task_type']}\n"
-                    display_text += f"Description: {params['description']}"
-                elif operation == "create_project":
-                    params = data["params"]
-                    display_text += f"Project: {params['project_name']}\n"
-                    display_text += f"Description: {params['description']}"
-                elif operation == "fetch_recent_issues":
-                    params = data["params"]
-                    display_text += f"Will list all available tasks before {params['days']}"
-                elif operation == "list_project":
-                    display_text += "Will list all available projects"
-                
-                self.update_jira_display(display_text)
-                self.set_ui_state('awaiting_confirmation')
-                
-            elif message_type == "jira_error":
-                self.update_jira_display(f"Error generating Jira operation.")
-                self.update_status(f"Jira operation generation failed", is_error=True)
-                QMessageBox.critical(self, "Jira Generation Error", data)
-                self.set_ui_state('idle')
-
-        except queue.Empty:
-            pass
         except Exception as e:
-            print(f"Error processing queue: {e}", flush=True)
+            print(f"Error handling pipeline result: {e}", flush=True)
             self.update_status(f"Internal GUI error: {e}", is_error=True)
 
-    def execute_jira_command(self):
-        if not self.suggested_command or not isinstance(self.suggested_command, dict):
+    def selected_job(self):
+        return self.jobs.get(self.selected_job_id) if self.selected_job_id is not None else None
+
+    def add_job_card(self, job):
+        item = QListWidgetItem(job.summary())
+        item.setData(Qt.ItemDataRole.UserRole, job.id)
+        self.job_list.addItem(item)
+        self.job_items[job.id] = item
+        if self.selected_job() is None:
+            self.job_list.setCurrentItem(item)
+
+    def remove_job_card(self, job_id):
+        self.jobs.remove(job_id)
+        item = self.job_items.pop(job_id, None)
+        if item is not None:
+            self.job_list.takeItem(self.job_list.row(item))
+
+    def on_job_selected(self, current, previous):
+        self.selected_job_id = current.data(Qt.ItemDataRole.UserRole) if current else None
+        job = self.selected_job()
+        if job:
+            self.show_job(job)
+        else:
+            self.update_transcription_display("")
+            for mode in MODES:
+                self.update_mode_display(mode, "")
+            self.refresh_controls()
+
+    def select_next_job(self):
+        """Move to the oldest card needing confirmation unless the user is busy with the selected one."""
+        selected = self.selected_job()
+        if selected is not None and selected.status in (AWAITING_CONFIRMATION, EXECUTING):
             return
-
-        operation = self.suggested_command["operation"]
-        result = None
-        
-        try:
-            if operation == "list_project":
-                result = list_project()
+        job = self.jobs.next_awaiting()
+        if job:
+            self.job_list.setCurrentItem(self.job_items[job.id])
+
+    def on_job_updated(self, job_id):
+        job = self.jobs.get(job_id)
+        item = self.job_items.get(job_id)
+        if job is None or item is None:
+            return  # cancelled and removed while the update was queued
+        item.setText(job.summary())
+
+        selected = self.selected_job()
+        if selected is job:
+            self.show_job(job)
+        elif job.status == AWAITING_CONFIRMATION and (selected is None or not selected.is_finished):
+            # A finished card keeps its outcome on screen briefly and then moves on by itself
+            self.select_next_job()
+
+        if job.status == DONE:
+            print(f"Job #{job.id} done. Throughput: {self.jobs.commands_per_minute():.1f} commands/min")
+        if job.is_finished:
+            if selected is job:
+                QTimer.singleShot(2000, self.select_next_job)
+            for dropped in self.jobs.prune():
+                item = self.job_items.pop(dropped, None)
+                if item is not None:
+                    self.job_list.takeItem(self.job_list.row(item))
+
+    def show_job(self, job):
+        self.show_mode_tab(job.mode)
+        self.update_transcription_display(job.transcription or f"{STATUS_LABELS[job.status]}...")
+        self.update_mode_display(job.mode, self.describe_job(job))
+        if not self.is_recording:
+            if job.status == FAILED:
+                self.update_status(f"Job #{job.id} failed: {job.error}", is_error=True)
+            elif job.status == AWAITING_CONFIRMATION:
+                self.update_status(f"Job #{job.id}: Review suggested command and Execute or Clear.")
+            elif job.status == DONE:
+                self.update_status(f"Job #{job.id}: {job.message if job.mode != 'taskcrafters' else 'Answer ready.'}")
+            else:
+                self.update_status(f"Job #{job.id}: {STATUS_LABELS[job.status]}...")
+        self.refresh_controls()
+
+    def update_mode_display(self, mode, text):
+        if mode == "command":
+            self.update_command_display(text)
+        elif mode == "email":
+            self.update_email_display(text)
+        elif mode == "jira":
+            self.update_jira_display(text)
+        else:
+            self.update_taskcrafters_display(text)
+
+    @staticmethod
+    def describe_job(job):
+        if job.status == FAILED:
+            return f"Error: {job.error}"
+        if job.status == DONE and job.message:
+            return job.message
+        data = job.result
+        if data is None:
+            return "..."
+        if job.mode == "email":
+            return f"To: {data['contact']}\nSubject: {data['subject']}\n\n{data['body']}"
+        if job.mode == "jira":
+            operation = data["operation"]
+            display_text = f"Operation: {operation}\n"
+
+            if operation == "create_issue":
+                params = data["params"]
+                display_text += f"Issue: {params['issue_name']}\n"
+                display_text += f"Project: {params['project_key']}\n"
+                display_text += f"Type: {params['task_type']}\n"
+                display_text += f"Description: {params['description']}"
             elif operation == "create_project":
-                params = self.suggested_command["params"]
-                result = create_project(
-                    project_name=params["project_name"],
-                    description=params["description"]
-                )
-            elif operation == "create_issue":
-                params = self.suggested_command["params"]
-                result = create_issue(
-                    issue_name=params["issue_name"],
-                    description=params["description"],
-                    project_key=params["project_key"],
-                    task_type=params["task_type"]
-                )
+                params = data["params"]
+                display_text += f"Project: {params['project_name']}\n"
+                display_text += f"Description: {params['description']}"
             elif operation == "fetch_recent_issues":
-                params = self.suggested_command["params"]
-                result = fetch_recent_issues(
-                    days=params["days"]
-                )
-            else:
-                raise ValueError(f"Unknown Jira operation: {operation}")
-            
+                params = data["params"]
+                display_text += f"Will list all available tasks before {params['days']}"
+            elif operation == "list_project":
+                display_text += "Will list all available projects"
+            return display_text
+        return str(data)
+
+    @staticmethod
+    def call_jira(operation, params):
+        if operation == "list_project":
+            return list_project()
+        elif operation == "create_project":
+            return create_project(
+                project_name=params["project_name"],
+                description=params["description"]
+            )
+        elif operation == "create_issue":
+            return create_issue(
+                issue_name=params["issue_name"],
+                description=params["description"],
+                project_key=params["project_key"],
+                task_type=params["task_type"]
+            )
+        elif operation == "fetch_recent_issues":
+            return fetch_recent_issues(
+                days=params["days"]
+            )
+        raise ValueError(f"Unknown Jira operation: {operation}")
+
+    def execution_failed(self, job, title, message):
+        # Back to the card's confirmation step so the user can retry or clear it
+        job.error = message
+        job.advance(AWAITING_CONFIRMATION)
+        self.emit("execute_error", (job.id, title, message))
+
+    async def run_jira_operation(self, job):
+        try:
+            operation = job.result["operation"]
+            result = await self.engine.run_blocking("execute", self.call_jira, operation, job.result.get("params", {}))
+
             # Generate success message
-            success_msg, error = generate_success_message(result)
+            success_msg, error = await self.engine.stage("generate", agenerate_success_message(result))
             print(success_msg)
-            
+
             if error:
                 raise Exception(error)
-                
-            self.update_status(success_msg)
-            self.update_jira_display(success_msg)
-            QTimer.singleShot(2000, lambda: self.set_ui_state('idle'))
-            
+
+            self.jobs.complete(job, success_msg)
+            self.context.add(job.mode, job.transcription, job.result)
+            self.emit("job_updated", job.id)
+        except Exception as e:
+            self.execution_failed(job, "Jira Error", f"Failed to execute Jira operation: {str(e)}")
+
+    async def run_command(self, job):
+        try:
+            success, error_msg = await self.engine.run_blocking("execute", execute_cmd, job.result)
+        except Exception as e:
+            success, error_msg = False, str(e)
+        if success:
+            self.jobs.complete(job, "Command sent to new terminal.")
+            self.context.add(job.mode, job.transcription, job.result)
+            self.emit("job_updated", job.id)
+        else:
+            self.execution_failed(job, "Execution Failed", error_msg or "Execution failed")
+
+    async def run_send_email(self, job):
+        try:
+            await self.engine.run_blocking("execute", send_email, job.result['contact'], job.result['subject'], job.result['body'])
+            self.jobs.complete(job, "✅ Email sent successfully!")
+            self.context.add(job.mode, job.transcription, job.result)
+            self.emit("job_updated", job.id)
+        except Exception as e:
+            self.execution_failed(job, "Email Error", f"Failed to send email: {str(e)}")
+
+    async def run_taskcrafters_command(self, job):
+        try:
+            response = await self.engine.run_blocking("generate", generate_response, job.result)
+            if not response:
+                raise ValueError("Failed to generate a valid response.")
+            job.result = response
+            self.jobs.complete(job, response)
+            self.context.add(job.mode, job.transcription, response)
+            self.emit("job_updated", job.id)
         except Exception as e:
-            error_msg = f"Failed to execute Jira operation: {str(e)}"
-            self.update_status(error_msg, is_error=True)
-            QMessageBox.critical(self, "Jira Error", error_msg)
-            self.set_ui_state('awaiting_confirmation')
+            self.execution_failed(job, "Taskcrafters Error", f"Failed to execute Taskcrafters command: {str(e)}")
+
+    def start_execution(self, job, coroutine):
+        job.error = None
+        job.advance(EXECUTING)
+        job.task_id = self.engine.submit(coroutine)
+        self.on_job_updated(job.id)
+
+    def awaiting_job(self, mode):
+        job = self.selected_job()
+        if job is None or job.mode != mode or job.status != AWAITING_CONFIRMATION:
+            return None
+        return job
+
+    def execute_jira_command(self):
+        job = self.awaiting_job("jira")
+        if not job or not isinstance(job.result, dict):
+            return
+
+        self.start_execution(job, self.run_jira_operation(job))
 
     def execute_suggested_command(self):
-        if not self.suggested_command:
+        job = self.awaiting_job("command")
+        if not job:
             return
 
         reply = QMessageBox.question(
             self,
             "Confirm Execution",
             f"<b>WARNING:</b> You are about to execute the following command:<br/><br/>"
-            f"<pre>{self.suggested_command}</pre><br/>"
+            f"<pre>{job.result}</pre><br/>"
             "Executing AI-generated commands can be dangerous.<br/><b>Are you sure?</b>",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
             QMessageBox.StandardButton.No
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            self.update_status(f"Executing: {self.suggested_command}")
-            success, error_msg = execute_cmd(self.suggested_command)
-            if success:
-                self.update_status("Command sent to new terminal. Resetting.")
-                QTimer.singleShot(2000, lambda: self.set_ui_state('idle'))
-            else:
-                self.update_status(f"Execution failed", is_error=True)
-                QMessageBox.critical(self, "Execution Failed", error_msg)
-                self.set_ui_state('awaiting_confirmation')
+            self.start_execution(job, self.run_command(job))
         else:
             self.update_status("Execution cancelled by user.")
-            self.set_ui_state('awaiting_confirmation')
 
     def send_email_command(self):
-        if not self.suggested_command or not isinstance(self.suggested_command, dict):
+        job = self.awaiting_job("email")
+        if not job or not isinstance(job.result, dict):
             return
-            
+
         email_settings = self.app_settings["email"]
-        
+
         if not email_settings["sender"] or not email_settings["password"]:
             QMessageBox.critical(self, "Email Error", "Email settings are not configured. Please set up your email in Settings.")
             return
-            
+
         reply = QMessageBox.question(
             self,
             "Confirm Email",
             f"<b>You are about to send the following email:</b><br/><br/>"
-            f"<b>To:</b> {self.suggested_command['contact']}<br/>"
-            f"<b>Subject:</b> {self.suggested_command['subject']}<br/><br/>"
-            f"<b>Body:</b><br/>{self.suggested_command['body']}<br/><br/>"
+            f"<b>To:</b> {job.result['contact']}<br/>"
+            f"<b>Subject:</b> {job.result['subject']}<br/><br/>"
+            f"<b>Body:</b><br/>{job.result['body']}<br/><br/>"
             "<b>Are you sure you want to send this email?</b>",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
             QMessageBox.StandardButton.No
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                send_email(
-                    self.suggested_command['contact'],
-                    self.suggested_command['subject'],
-                    self.suggested_command['body'],
-                )
-                self.update_status("✅ Email sent successfully!")
-                self.update_email_display("✅ Email sent successfully!")
-                QTimer.singleShot(2000, lambda: self.set_ui_state('idle'))
-            except Exception as e:
-                self.update_status(f"Failed to send email: {str(e)}", is_error=True)
-                QMessageBox.critical(self, "Email Error", f"Failed to send email: {str(e)}")
-                self.set_ui_state('awaiting_confirmation')
+            self.start_execution(job, self.run_send_email(job))
         else:
             self.update_status("Email cancelled by user.")
-            self.set_ui_state('awaiting_confirmation')
 
     def send_taskcrafters_command(self):
-        if not self.suggested_command:
+        job = self.awaiting_job("taskcrafters")
+        if not job:
             self.update_status("No valid command found for Taskcrafters.", is_error=True)
-            self.set_ui_state('idle')
             return
 
         reply = QMessageBox.question(
             self,
             "Confirm Taskcrafters Command",
             f"<b>You are about to execute the following Taskcrafters command:</b><br/><br/>"
-            f"{self.suggested_command}<br/><br/>"
+            f"{job.result}<br/><br/>"
             "<b>Are you sure you want to proceed?</b>",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
             QMessageBox.StandardButton.No
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            try:
-                response = generate_response(self.suggested_command)
-                if response:
-                    self.update_taskcrafters_display(response)
-                    self.update_status("Taskcrafters response generated successfully!")
-                    QTimer.singleShot(2000, lambda: self.set_ui_state('idle'))
-                else:
-                    raise ValueError("Failed to generate a valid response.")
-            except Exception as e:
-                error_msg = f"Failed to execute Taskcrafters command: {str(e)}"
-                self.update_status(error_msg, is_error=True)
-                QMessageBox.critical(self, "Taskcrafters Error", error_msg)
-                self.set_ui_state('awaiting_confirmation')
+            self.start_execution(job, self.run_taskcrafters_command(job))
         else:
             self.update_status("Taskcrafters command cancelled by user.")
-            self.set_ui_state('idle')
 
     def clear_command(self):
-        self.suggested_command = ""
-        self.update_command_display("")
-        self.update_email_display("")
-        self.update_jira_display("")
-        self.set_ui_state('idle')
+        """Cancel the selected job card (if still in flight) and remove it; executing cards are kept."""
+        job = self.selected_job()
+        if job is None:
+            return
+        if job.status == EXECUTING:
+            self.update_status("The action is already running and cannot be cancelled; its card stays until it ends.")
+            return
+        if not job.is_finished:
+            if job.task_id is not None:
+                self.engine.cancel(job.task_id)
+            job.advance(CANCELLED)
+        self.remove_job_card(job.id)
+        if self.jobs.next_awaiting() is None and not self.is_recording:
+            self.set_ui_state('idle')
+        self.select_next_job()
+
+    def closeEvent(self, event):
+        self.engine.shutdown()
+        super().closeEvent(event)
 
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     main_window = VoiceRecorderApp()
-    from cli_commands import execute_cmd, get_cmd 
-    from email_sender import generate_email_from_prompt, send_email
+    from cli_commands import aget_cmd, execute_cmd
+    from email_sender import agenerate_email_from_prompt, send_email
     from jira_automation import create_issue, create_project, list_project, fetch_recent_issues
-    from prompts import get_jira_prompt, generate_success_message
+    from prompts import aget_jira_prompt, agenerate_success_message, aget_mode_prompt
     try:
-        from taskcrafters_agent.real_time_response import generate_response
+        from taskcrafters_agent.real_time_response import generate_response, warm_up
     except Exception as err:
         print(err)
+        warm_up = None
 
     main_window.show()
+    if warm_up is not None and os.getenv("TASKCRAFTERS_WARMUP", "1") != "0":
+        # The agent is built lazily; build it on the I/O pool once the window is up
+        QTimer.singleShot(AGENT_WARMUP_DELAY_MS, lambda: main_window.engine.io_executor.submit(warm_up))
     sys.exit(app.exec())
@@ -0,0 +1,103 @@
+import asyncio
+import concurrent.futures
+import functools
+import itertools
+import threading
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Optional
+
+# Seconds each stage may take before it is cancelled and reported as failed
+STAGE_DEADLINES = {
+    "transcribe": 120.0,
+    "route": 15.0,
+    "generate": 90.0,
+    "execute": 120.0,
+}
+
+
+class StageTimeout(Exception):
+    def __init__(self, stage: str, deadline: float):
+        super().__init__(f"{stage} did not finish within {deadline:g}s")
+        self.stage = stage
+        self.deadline = deadline
+
+
+class PipelineEngine:
+    """
+    Runs the voice pipeline on an asyncio event loop owned by a background thread.
+
+    The GUI submits one coroutine per utterance (or per confirmed action) and gets
+    back a job id it can cancel. Stages are awaited with deadlines; blocking work
+    runs in executors: Whisper on a single-worker CPU executor (the model is not
+    re-entrant and already uses all configured threads), everything else that is
+    still synchronous (SMTP, Jira, the LangChain agent) on an I/O pool. Results
+    reach the GUI through Qt signals emitted by the coroutines themselves, which
+    Qt delivers on the GUI thread.
+    """
+
+    def __init__(self, io_workers: int = 8):
+        self.loop = asyncio.new_event_loop()
+        self.cpu_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisper")
+        self.io_executor = concurrent.futures.ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="pipeline-io")
+        self._jobs: Dict[int, concurrent.futures.Future] = {}
+        self._jobs_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._thread = threading.Thread(target=self._run_loop, name="pipeline-loop", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.set_default_executor(self.io_executor)
+        self.loop.run_forever()
+
+    def submit(self, coroutine: Coroutine[Any, Any, Any]) -> int:
+        """Schedules a coroutine on the pipeline loop from any thread and returns its job id."""
+        job_id = next(self._ids)
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        with self._jobs_lock:
+            self._jobs[job_id] = future
+        future.add_done_callback(lambda _: self._forget(job_id))
+        return job_id
+
+    def _forget(self, job_id: int):
+        with self._jobs_lock:
+            self._jobs.pop(job_id, None)
+
+    def cancel(self, job_id: int) -> bool:
+        with self._jobs_lock:
+            future = self._jobs.get(job_id)
+        return future.cancel() if future else False
+
+    def cancel_all(self):
+        with self._jobs_lock:
+            futures = list(self._jobs.values())
+        for future in futures:
+            future.cancel()
+
+    def in_flight(self) -> int:
+        with self._jobs_lock:
+            return len(self._jobs)
+
+    async def stage(self, name: str, awaitable: Awaitable[Any], deadline: Optional[float] = None) -> Any:
+        """Awaits one pipeline stage, cancelling it when it overruns its deadline."""
+        deadline = deadline if deadline is not None else STAGE_DEADLINES.get(name)
+        try:
+            return await asyncio.wait_for(awaitable, timeout=deadline)
+        except asyncio.TimeoutError:
+            raise StageTimeout(name, deadline) from None
+
+    async def run_cpu(self, name: str, func: Callable[..., Any], *args, deadline: Optional[float] = None) -> Any:
+        """Runs CPU-bound work (Whisper) on the dedicated executor as a stage."""
+        call = functools.partial(func, *args)
+        return await self.stage(name, self.loop.run_in_executor(self.cpu_executor, call), deadline)
+
+    async def run_blocking(self, name: str, func: Callable[..., Any], *args, deadline: Optional[float] = None) -> Any:
+        """Runs a blocking I/O call on the I/O pool as a stage."""
+        call = functools.partial(func, *args)
+        return await self.stage(name, self.loop.run_in_executor(self.io_executor, call), deadline)
+
+    def shutdown(self):
+        self.cancel_all()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=2)
+        self.cpu_executor.shutdown(wait=False, cancel_futures=True)
+        self.io_executor.shutdown(wait=False, cancel_futures=True)
@@ -1,3 +1,4 @@
-from .cmd_prompt import get_cmd_prompt
-from .email_prompt import get_email_prompt
-from .jira_prompt import generate_success_message, get_jira_prompt
\ No newline at end of file
+from .cmd_prompt import aget_cmd_prompt, get_cmd_prompt
+from .email_prompt import aget_email_prompt, get_email_prompt
+from .jira_prompt import agenerate_success_message, aget_jira_prompt, generate_success_message, get_jira_prompt
+from .router_prompt import aget_mode_prompt, get_mode_prompt
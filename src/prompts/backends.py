@@ -0,0 +1,176 @@
+import json
+import os
+import random
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+from openai import AsyncOpenAI, OpenAI
+
+from .resilience import CircuitBreaker, CircuitOpenError, record_stat
+
+EWMA_ALPHA = 0.2
+# Each point of recent error rate makes a backend look this much slower
+ERROR_PENALTY = 4.0
+IN_FLIGHT_PENALTY = 0.5
+# Share of requests sent to a random healthy backend so slow ones get re-measured
+EXPLORE_RATE = 0.05
+
+
+class Backend:
+    """One OpenAI-compatible endpoint with its own clients, breaker and latency/error estimates."""
+
+    def __init__(self, name: str, base_url: Optional[str], api_key: Optional[str], model: Optional[str] = None,
+                 weight: float = 1.0, small_model: Optional[str] = None):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.small_model = small_model
+        self.weight = max(float(weight), 0.01)
+        self.breaker = CircuitBreaker(name)
+        self.ewma_latency: Dict[str, float] = {}
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self._client: Optional[OpenAI] = None
+        self._async_client: Optional[AsyncOpenAI] = None
+
+    @property
+    def client(self) -> OpenAI:
+        if self._client is None:
+            self._client = OpenAI(base_url=self.base_url, api_key=self.api_key, max_retries=0)
+        return self._client
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        if self._async_client is None:
+            self._async_client = AsyncOpenAI(base_url=self.base_url, api_key=self.api_key, max_retries=0)
+        return self._async_client
+
+    def model_for(self, tier: str) -> Optional[str]:
+        return self.small_model if tier == "small" else self.model
+
+    def expected_latency(self, mode: str) -> Optional[float]:
+        if mode in self.ewma_latency:
+            return self.ewma_latency[mode]
+        if self.ewma_latency:
+            return sum(self.ewma_latency.values()) / len(self.ewma_latency)
+        return None
+
+    def score(self, mode: str) -> float:
+        """Lower is better. Backends never measured score 0 so they get probed first."""
+        latency = self.expected_latency(mode)
+        if latency is None:
+            return 0.0
+        return latency * (1 + ERROR_PENALTY * self.error_rate) * (1 + IN_FLIGHT_PENALTY * self.in_flight) / self.weight
+
+
+class BackendRouter:
+    """
+    Picks the backend for each request: the healthy one with the best
+    latency/error/weight score, falling back to the others on failure.
+    """
+
+    def __init__(self, backends: List[Backend]):
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = backends
+        self._lock = threading.Lock()
+
+    def _healthy(self, exclude: Iterable[str] = ()) -> List[Backend]:
+        exclude = set(exclude)
+        return [b for b in self.backends if b.name not in exclude and b.breaker.state != "open"]
+
+    def has_healthy(self, exclude: Iterable[str] = ()) -> bool:
+        return bool(self._healthy(exclude))
+
+    def acquire(self, mode: str, avoid: Iterable[str] = ()) -> Backend:
+        """
+        Reserves the best backend for one request, preferring ones not in avoid.
+
+        Raises CircuitOpenError when every backend's breaker is open.
+        """
+        with self._lock:
+            candidates = self._healthy(avoid) or self._healthy()
+            if len(candidates) > 1 and random.random() < EXPLORE_RATE:
+                candidates = random.choices(candidates, weights=[b.weight for b in candidates], k=1) + candidates
+            else:
+                candidates = sorted(candidates, key=lambda b: b.score(mode))
+            for backend in candidates:
+                if backend.breaker.allow():
+                    backend.in_flight += 1
+                    backend.requests += 1
+                    return backend
+        record_stat("breaker_rejections")
+        raise CircuitOpenError("No LLM backend is available; all circuit breakers are open")
+
+    def release(self, backend: Backend, mode: str, seconds: Optional[float] = None, failed: bool = False):
+        """Records the outcome of a request; seconds=None with failed=False means it was abandoned."""
+        with self._lock:
+            backend.in_flight -= 1
+            if failed:
+                backend.failures += 1
+                backend.error_rate = (1 - EWMA_ALPHA) * backend.error_rate + EWMA_ALPHA
+            elif seconds is not None:
+                backend.error_rate = (1 - EWMA_ALPHA) * backend.error_rate
+                previous = backend.ewma_latency.get(mode)
+                backend.ewma_latency[mode] = seconds if previous is None else (
+                    (1 - EWMA_ALPHA) * previous + EWMA_ALPHA * seconds)
+        if failed:
+            backend.breaker.record_failure()
+        elif seconds is not None:
+            backend.breaker.record_success()
+        else:
+            # Abandoned (e.g. lost a hedge): frees a half-open trial without judging the backend
+            backend.breaker.release_trial()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [{
+                "name": b.name,
+                "weight": b.weight,
+                "state": b.breaker.state,
+                "requests": b.requests,
+                "failures": b.failures,
+                "error_rate": round(b.error_rate, 3),
+                "latency_ms": {mode: round(seconds * 1000) for mode, seconds in b.ewma_latency.items()},
+            } for b in self.backends]
+
+
+def _read_backend_config(value: str) -> List[Dict[str, Any]]:
+    """LLM_BACKENDS holds either a JSON list or the path of a JSON file containing one."""
+    value = value.strip()
+    if not value:
+        return []
+    if not value.startswith("["):
+        with open(value, "r", encoding="utf-8") as f:
+            value = f.read()
+    entries = json.loads(value)
+    if not isinstance(entries, list):
+        raise ValueError("LLM backend config must be a JSON list")
+    return entries
+
+
+def load_backends(base_url: Optional[str], api_key: Optional[str], model: Optional[str],
+                  small_model: Optional[str] = None) -> List[Backend]:
+    """
+    The configured Nebius endpoint plus any extra backends from LLM_BACKENDS.
+
+    Extra entries: {"name", "base_url", "api_key"?, "model"?, "small_model"?, "weight"?};
+    a missing api_key or model falls back to the Nebius settings.
+    """
+    backends = [Backend("nebius", base_url, api_key, model, float(os.getenv("LLM_PRIMARY_WEIGHT", "1")), small_model)]
+    try:
+        extra = [Backend(
+            entry.get("name") or f"backend-{i + 1}",
+            entry["base_url"],
+            entry.get("api_key") or api_key,
+            entry.get("model") or model,
+            entry.get("weight", 1.0),
+            entry.get("small_model") or small_model,
+        ) for i, entry in enumerate(_read_backend_config(os.getenv("LLM_BACKENDS", "")))]
+    except Exception as e:
+        print(f"Ignoring LLM_BACKENDS: {e}")
+        extra = []
+    return backends + extra
@@ -0,0 +1,166 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .resilience import deadline_for
+from .token_usage import estimate_message_tokens
+
+# Cheaper model tried first for the modes below; unset disables the cascade
+SMALL_MODEL = os.getenv("SMALL_MODEL") or None
+CASCADE_MODES = {mode.strip() for mode in os.getenv("CASCADE_MODES", "command,email,jira").split(",") if mode.strip()}
+
+_lock = threading.Lock()
+CASCADE_STATS: Dict[str, Dict[str, float]] = {}
+
+# parse(response) -> (data, error); check(data) -> error or None, applied to small-model output only
+Parser = Callable[[Any], Tuple[Optional[Any], Optional[str]]]
+Checker = Callable[[Any], Optional[str]]
+
+
+def cascade_enabled(mode: str) -> bool:
+    return SMALL_MODEL is not None and mode in CASCADE_MODES
+
+
+def _tokens(response, messages) -> int:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return estimate_message_tokens(messages)
+    return (getattr(usage, "prompt_tokens", 0) or 0) + (getattr(usage, "completion_tokens", 0) or 0)
+
+
+def _record(mode: str, outcome: str, seconds: float, small_seconds: float = 0.0, small_tokens: int = 0,
+            large_seconds: float = 0.0):
+    with _lock:
+        stats = CASCADE_STATS.setdefault(mode, {
+            "requests": 0,
+            "accepted": 0,
+            "escalated": 0,
+            "seconds": 0.0,
+            "small_seconds": 0.0,
+            "large_seconds": 0.0,
+            "large_requests": 0,
+            "tokens_offloaded": 0,
+            "tokens_wasted": 0,
+        })
+        stats["requests"] += 1
+        stats["seconds"] += seconds
+        stats["small_seconds"] += small_seconds
+        if outcome == "accepted":
+            stats["accepted"] += 1
+            stats["tokens_offloaded"] += small_tokens
+        else:
+            stats["escalated"] += 1
+            stats["tokens_wasted"] += small_tokens
+            stats["large_requests"] += 1
+            stats["large_seconds"] += large_seconds
+
+
+def get_cascade_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Per-mode cascade counters plus derived rates.
+
+    "tokens_offloaded" are tokens the small model served that the large model
+    would otherwise have processed; "tokens_wasted" were spent on small-model
+    answers that failed the local check. "latency_saved_ms" compares the average
+    cascade latency with the large model's measured average, when known.
+    """
+    with _lock:
+        snapshot = {mode: dict(stats) for mode, stats in CASCADE_STATS.items()}
+    for stats in snapshot.values():
+        stats["escalation_rate"] = stats["escalated"] / stats["requests"]
+        stats["avg_ms"] = stats["seconds"] / stats["requests"] * 1000
+        if stats["large_requests"]:
+            large_ms = stats["large_seconds"] / stats["large_requests"] * 1000
+            stats["latency_saved_ms"] = large_ms - stats["avg_ms"]
+        stats["net_tokens_saved"] = stats["tokens_offloaded"] - stats["tokens_wasted"]
+    return snapshot
+
+
+def describe(mode: str) -> str:
+    stats = get_cascade_stats().get(mode)
+    if not stats:
+        return ""
+    saved = f", ~{stats['latency_saved_ms']:.0f} ms saved per request" if "latency_saved_ms" in stats else ""
+    return (f"[{mode}] cascade: {stats['escalation_rate']:.0%} escalated ({stats['escalated']}/{stats['requests']}), "
+            f"avg {stats['avg_ms']:.0f} ms{saved}, {stats['net_tokens_saved']} large-model tokens saved")
+
+
+def _remaining(mode: str, small_seconds: float) -> float:
+    """What the small attempt left of the mode's deadline, so escalating never overruns it."""
+    return max(0.0, deadline_for(mode) - small_seconds)
+
+
+def _small_result(response, parse: Parser, check: Optional[Checker]) -> Tuple[Optional[Any], Optional[str]]:
+    data, error = parse(response)
+    if error is None and check is not None:
+        error = check(data)
+    return data, error
+
+
+def cascade(mode: str, call: Callable[..., Any], parse: Parser, check: Optional[Checker] = None, **kwargs):
+    """
+    Runs call(**kwargs) on the small model first and on the large one only if its answer fails locally.
+
+    The small answer is accepted when parse() succeeds and check() finds nothing
+    wrong; otherwise the large call gets what is left of the mode's deadline as
+    its budget. Without a small model configured for the mode this is a single
+    call.
+
+    Returns:
+        Tuple[Any, Optional[Any], Optional[str]]: the response used, its parsed data and the parse error.
+    """
+    if not cascade_enabled(mode):
+        response = call(**kwargs)
+        return (response,) + parse(response)
+
+    start = time.perf_counter()
+    small_tokens = 0
+    try:
+        response = call(tier="small", **kwargs)
+        small_tokens = _tokens(response, kwargs.get("messages", []))
+        data, error = _small_result(response, parse, check)
+    except Exception as e:
+        error = str(e)
+    small_seconds = time.perf_counter() - start
+    if error is None:
+        _record(mode, "accepted", small_seconds, small_seconds, small_tokens)
+        print(describe(mode))
+        return response, data, None
+
+    print(f"[{mode}] small model answer rejected ({error}), escalating")
+    response = call(budget=_remaining(mode, small_seconds), **kwargs)
+    _record(mode, "escalated", time.perf_counter() - start, small_seconds, small_tokens,
+            time.perf_counter() - start - small_seconds)
+    print(describe(mode))
+    return (response,) + parse(response)
+
+
+async def acascade(mode: str, call: Callable[..., Any], parse: Parser, check: Optional[Checker] = None, **kwargs):
+    """Async variant of cascade; call must return an awaitable."""
+    if not cascade_enabled(mode):
+        response = await call(**kwargs)
+        return (response,) + parse(response)
+
+    start = time.perf_counter()
+    small_tokens = 0
+    try:
+        response = await call(tier="small", **kwargs)
+        small_tokens = _tokens(response, kwargs.get("messages", []))
+        # The check may shell out (bash -n), so keep it off the pipeline loop
+        data, error = await asyncio.to_thread(_small_result, response, parse, check)
+    except Exception as e:
+        error = str(e)
+    small_seconds = time.perf_counter() - start
+    if error is None:
+        _record(mode, "accepted", small_seconds, small_seconds, small_tokens)
+        print(describe(mode))
+        return response, data, None
+
+    print(f"[{mode}] small model answer rejected ({error}), escalating")
+    response = await call(budget=_remaining(mode, small_seconds), **kwargs)
+    _record(mode, "escalated", time.perf_counter() - start, small_seconds, small_tokens,
+            time.perf_counter() - start - small_seconds)
+    print(describe(mode))
+    return (response,) + parse(response)
@@ -1,21 +1,17 @@
 import platform
-from openai import OpenAI
-import os
+import shutil
+import subprocess
+import time
+from .cascade import acascade, cascade
+from .llm_client import MODEL, acreate_completion, create_completion
+from .token_usage import log_prompt_usage
 
-NEBIUS_API_KEY = os.getenv("NEBIUS_API_KEY")
-NEBIUS_BASE_URL = os.getenv("NEBIUS_BASE_URL")
-MODEL = os.getenv("MODEL")
+# The OS does not change while the app runs, so the system prompt is built once at import.
+# Keeping it byte-identical across requests lets the provider reuse its prefix cache.
+OS_TYPE = platform.system().lower()
 
-client = OpenAI(
-    base_url=NEBIUS_BASE_URL,
-    api_key=NEBIUS_API_KEY,
-)
-
-def get_cmd_prompt(instruction):
-    os_type = platform.system().lower()
-
-    if "windows" in os_type:
-        prompt = f"""
+if "windows" in OS_TYPE:
+    SYSTEM_PROMPT = f"""
 You are an expert assistant that translates natural language instructions into executable commands for Windows Command Prompt (cmd.exe).
 Only return the command with no explanation or formatting.
 The user is on: {platform.system()} {platform.release()}.
@@ -26,8 +22,8 @@ Output: mkdir "%USERPROFILE%\\Desktop\\test"
 
 Now, convert this instruction into a single Windows CMD command:
 """
-    elif "linux" in os_type:
-        prompt = f"""
+elif "linux" in OS_TYPE:
+    SYSTEM_PROMPT = """
 You are an expert assistant that translates natural language instructions into shell commands for Linux (bash).
 Only return the shell command, no extra explanation or formatting.
 
@@ -37,22 +33,76 @@ Output: ls -la
 
 Now, convert this instruction into a single Linux bash command:
 """
-    else:
-        return None, f"Unsupported OS: {os_type}"
+else:
+    SYSTEM_PROMPT = None
+
+# `bash -n` parses without executing; cmd.exe has no equivalent
+SHELL_CHECK = ["bash", "-n", "-c"] if "windows" not in OS_TYPE and shutil.which("bash") else None
+
+REQUEST_OPTIONS = {
+    "temperature": 0.0,
+    "max_tokens": 100,
+}
 
+def _messages(instruction, history=()):
+    # Earlier turns go after the system prompt, which keeps its prefix cacheable
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        *history,
+        {"role": "user", "content": instruction}
+    ]
+
+def _parse_command(response):
+    command = response.choices[0].message.content.strip().strip('`')
+    if not command:
+        return None, "Empty command"
+    return command, None
+
+def _check_command(command):
+    """Rejects small-model commands that span several lines or do not parse as shell syntax."""
+    if "\n" in command.strip():
+        return "expected a single command line"
+    if SHELL_CHECK is None:
+        return None
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": instruction}
-            ],
-            temperature=0.0,
-            max_tokens=100,
+        result = subprocess.run(SHELL_CHECK + [command], capture_output=True, text=True, timeout=2)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return f"syntax error: {result.stderr.strip()}"
+    return None
+
+def get_cmd_prompt(instruction, history=()):
+    if SYSTEM_PROMPT is None:
+        return None, f"Unsupported OS: {OS_TYPE}"
+
+    messages = _messages(instruction, history)
+    try:
+        start = time.perf_counter()
+        response, command, error = cascade(
+            "command", lambda **kwargs: create_completion("command", **kwargs), _parse_command, _check_command,
+            model=MODEL, messages=messages, **REQUEST_OPTIONS
         )
+        log_prompt_usage("command", messages, response, time.perf_counter() - start, SYSTEM_PROMPT)
+        return command, error
+
+    except Exception as e:
+        return None, f"CMD prompt error: {e}"
 
-        command = response.choices[0].message.content.strip().strip('`')
-        return command, None
+async def aget_cmd_prompt(instruction, history=()):
+    """Async variant of get_cmd_prompt, used by the pipeline engine."""
+    if SYSTEM_PROMPT is None:
+        return None, f"Unsupported OS: {OS_TYPE}"
+
+    messages = _messages(instruction, history)
+    try:
+        start = time.perf_counter()
+        response, command, error = await acascade(
+            "command", lambda **kwargs: acreate_completion("command", **kwargs), _parse_command, _check_command,
+            model=MODEL, messages=messages, **REQUEST_OPTIONS
+        )
+        log_prompt_usage("command", messages, response, time.perf_counter() - start, SYSTEM_PROMPT)
+        return command, error
 
     except Exception as e:
         return None, f"CMD prompt error: {e}"
@@ -1,77 +1,127 @@
 import json
-from openai import OpenAI
-import os
-from typing import List, Dict, Tuple, Optional
+import time
+from typing import List, Dict, Sequence, Tuple, Optional
+from .cascade import acascade, cascade
+from .llm_client import MODEL
+from .structured_output import acreate_structured_completion, create_structured_completion, parse_structured_response
+from .token_usage import log_prompt_usage
 
-NEBIUS_API_KEY = os.getenv("NEBIUS_API_KEY")
-NEBIUS_BASE_URL = os.getenv("NEBIUS_BASE_URL")
-MODEL = os.getenv("MODEL")
+EMAIL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "contact": {"type": "string"},
+        "subject": {"type": "string"},
+        "body": {"type": "string"}
+    },
+    "required": ["contact", "subject", "body"]
+}
 
-client = OpenAI(
-    base_url=NEBIUS_BASE_URL,
-    api_key=NEBIUS_API_KEY,
-)
-
-def get_email_prompt(instruction: str, contacts: List[Dict[str, str]]) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
-    """
-    Generates an email based on the provided instruction and a contact list.
-
-    This function uses OpenAI's language model to extract email content, subject, and contact information 
-    based on the given instruction and list of contacts.
-
-    Args:
-        instruction (str): The instruction or prompt detailing what email should be composed.
-        contacts (List[Dict[str, str]]): A list of dictionaries containing contact information with 'name' and 'email' keys.
-
-    Returns:
-        Tuple[Optional[Dict[str, str]], Optional[str]]:
-            - A dictionary containing 'contact', 'subject', and 'body' of the email if successful.
-            - An error message if an exception occurs, or None if successful.
-    """
-    
-    prompt = f"""
+SYSTEM_PROMPT = """
 You are a helpful assistant that extracts email information from user instructions.
 
-You are given this contact list:
-{json.dumps(contacts, indent=2)}
+You are given a contact list in the next message.
 
 You must return a JSON object in this format:
-{{
+{
   "contact": "<email from contact list>",
   "subject": "<short subject>",
   "body": "<email body>"
-}}
+}
 
 Example:
 Instruction: send a reminder email to Sarah about the project deadline
 Response:
-{{
+{
   "contact": "sarah@example.com",
   "subject": "Project Deadline Reminder",
   "body": "Hi Sarah, just a reminder about the project deadline coming up soon."
-}}
+}
 
 ONLY return the JSON object. Do NOT include any other explanation or text.
 
-Now process this instruction:
+Now process the user's instruction.
 """
 
+REQUEST_OPTIONS = {
+    "temperature": 0.3,
+    "max_tokens": 250,
+}
+
+def _messages(instruction: str, contacts: Dict[str, str],
+              history: Sequence[Dict[str, str]] = ()) -> List[Dict[str, str]]:
+    # Static instructions first, then the contact list, then the instruction: the
+    # request prefix stays identical across calls and only the tail varies.
+    contact_message = "Contact list:\n" + json.dumps(contacts, ensure_ascii=False, separators=(",", ":"))
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": contact_message},
+        *history,
+        {"role": "user", "content": instruction}
+    ]
+
+def _parse_email(response) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    # Parse the model's response into the expected format, repairing it locally if needed
+    result = response.choices[0].message.content.strip()
+    email_data, error = parse_structured_response(result, EMAIL_SCHEMA)
+    if error:
+        return None, f"Email prompt error: {error}"
+    return email_data, None  # Return the email data and None as no error
+
+def _contact_checker(contacts: Dict[str, str]):
+    # A small model that invents an address escalates instead of mailing a stranger
+    addresses = {email.lower() for email in contacts.values()} if isinstance(contacts, dict) else set()
+
+    def check(email_data: Dict[str, str]) -> Optional[str]:
+        if addresses and email_data["contact"].lower() not in addresses:
+            return f"contact {email_data['contact']!r} is not in the contact list"
+        return None
+    return check
+
+def get_email_prompt(instruction: str, contacts: List[Dict[str, str]],
+                     history: Sequence[Dict[str, str]] = ()) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """
+    Generates an email based on the provided instruction and a contact list.
+
+    This function uses OpenAI's language model to extract email content, subject, and contact information 
+    based on the given instruction and list of contacts.
+
+    Args:
+        instruction (str): The instruction or prompt detailing what email should be composed.
+        contacts (List[Dict[str, str]]): A list of dictionaries containing contact information with 'name' and 'email' keys.
+        history (Sequence[Dict[str, str]]): Earlier instructions and results of the session, as chat messages.
+
+    Returns:
+        Tuple[Optional[Dict[str, str]], Optional[str]]:
+            - A dictionary containing 'contact', 'subject', and 'body' of the email if successful.
+            - An error message if an exception occurs, or None if successful.
+    """
+
+    messages = _messages(instruction, contacts, history)
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": instruction}
-            ],
-            temperature=0.3,
-            max_tokens=250,
+        start = time.perf_counter()
+        response, email_data, error = cascade(
+            "email", lambda **kwargs: create_structured_completion("email", "email", EMAIL_SCHEMA, **kwargs),
+            _parse_email, _contact_checker(contacts), model=MODEL, messages=messages, **REQUEST_OPTIONS
         )
-
-        # Parse the model's response into the expected format
-        result = response.choices[0].message.content.strip()
-        email_data = json.loads(result)
-        return email_data, None  # Return the email data and None as no error
+        log_prompt_usage("email", messages, response, time.perf_counter() - start, SYSTEM_PROMPT)
+        return email_data, error
 
     except Exception as e:
         # Handle exceptions and return the error message
         return None, f"Email prompt error: {e}"
+
+async def aget_email_prompt(instruction: str, contacts: Dict[str, str],
+                            history: Sequence[Dict[str, str]] = ()) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """Async variant of get_email_prompt, used by the pipeline engine."""
+    messages = _messages(instruction, contacts, history)
+    try:
+        start = time.perf_counter()
+        response, email_data, error = await acascade(
+            "email", lambda **kwargs: acreate_structured_completion("email", "email", EMAIL_SCHEMA, **kwargs),
+            _parse_email, _contact_checker(contacts), model=MODEL, messages=messages, **REQUEST_OPTIONS
+        )
+        log_prompt_usage("email", messages, response, time.perf_counter() - start, SYSTEM_PROMPT)
+        return email_data, error
+
+    except Exception as e:
+        return None, f"Email prompt error: {e}"
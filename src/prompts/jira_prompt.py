@@ -1,130 +1,206 @@
 import json
-from openai import OpenAI
-import os
-from typing import Tuple, Optional, Dict, Any
-
-NEBIUS_API_KEY = os.getenv("NEBIUS_API_KEY")
-NEBIUS_BASE_URL = os.getenv("NEBIUS_BASE_URL")
-MODEL = os.getenv("MODEL")
-
-client = OpenAI(
-    base_url=NEBIUS_BASE_URL,
-    api_key=NEBIUS_API_KEY,
-)
-
-def get_jira_prompt(instruction: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
-    """
-    Generates Jira operation details based on the provided instruction.
-
-    Args:
-        instruction (str): The instruction detailing what Jira operation to perform.
-
-    Returns:
-        Tuple[Optional[Dict[str, Any]], Optional[str]]:
-            - A dictionary containing 'operation' and operation-specific parameters
-            - An error message if an exception occurs, or None if successful.
-    """
-    
-    prompt = f"""
+import time
+from typing import Tuple, Optional, Dict, Any, List, Sequence
+from .cascade import acascade, cascade
+from .llm_client import MODEL, acreate_completion, create_completion
+from .structured_output import acreate_structured_completion, create_structured_completion, parse_structured_response
+from .token_usage import log_prompt_usage
+
+def _operation_schema(operation: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    schema = {
+        "type": "object",
+        "properties": {"operation": {"type": "string", "enum": [operation]}},
+        "required": ["operation"]
+    }
+    if params:
+        schema["properties"]["params"] = {
+            "type": "object",
+            "properties": params,
+            "required": list(params)
+        }
+        schema["required"].append("params")
+    return schema
+
+JIRA_SCHEMA = {
+    "anyOf": [
+        _operation_schema("list_project"),
+        _operation_schema("create_project", {
+            "project_name": {"type": "string"},
+            "description": {"type": "string"}
+        }),
+        _operation_schema("create_issue", {
+            "issue_name": {"type": "string"},
+            "description": {"type": "string"},
+            "project_key": {"type": "string"},
+            "task_type": {"type": "string"}
+        }),
+        _operation_schema("fetch_recent_issues", {
+            "days": {"type": "string"}
+        })
+    ]
+}
+
+SYSTEM_PROMPT = """
 You are a Jira operations assistant that extracts task details from user instructions.
 
 You must return a JSON object with one of these formats:
 
 1. For listing projects:
-{{
+{
   "operation": "list_project"
-}}
+}
 
 2. For creating a project:
-{{
+{
   "operation": "create_project",
-  "params": {{
+  "params": {
     "project_name": "<project name>",
     "description": "<project description>"
-  }}
-}}
+  }
+}
 
 3. For creating an issue:
-{{
+{
   "operation": "create_issue",
-  "params": {{
+  "params": {
     "issue_name": "<issue name>",
     "description": "<issue description>",
     "project_key": "<project key>",
     "task_type": "<task type>"
-  }}
-}}
+  }
+}
 
 
 Examples:
 1. Instruction: list all projects
 Response:
-{{
+{
   "operation": "list_project"
-}}
+}
 
 2. Instruction: create a new project called Marketing with description for marketing team
 Response:
-{{
+{
   "operation": "create_project",
-  "params": {{
+  "params": {
     "project_name": "Marketing",
     "description": "Project for marketing team"
-  }}
-}}
+  }
+}
 
 3. Instruction: create a bug ticket in project DEV about login page not working
 Response:
-{{
+{
   "operation": "create_issue",
-  "params": {{
+  "params": {
     "issue_name": "Login page not working",
     "description": "The login page returns 500 error when submitting credentials",
     "project_key": "DEV",
     "task_type": "bug"
-  }}
-}}
+  }
+}
 
 4. Instruction: list all issues in the last seven days
 Response:
-{{
+{
   "operation": "fetch_recent_issues",
-  "params": {{
+  "params": {
     "days": "7"
-  }}
-}}
+  }
+}
 
 ONLY return the JSON object. Do NOT include any other explanation or text.
 
-Now process this instruction:
+Now process the user's instruction.
 """
 
+REQUEST_OPTIONS = {
+    "temperature": 0.3,
+    "max_tokens": 250,
+}
+
+def _messages(instruction: str, history: Sequence[Dict[str, str]] = ()) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        *history,
+        {"role": "user", "content": instruction}
+    ]
+
+def _parse_operation(response) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    result = response.choices[0].message.content.strip()
+
+    # Parse, repair and validate the operation against the schema
+    jira_data, error = parse_structured_response(result, JIRA_SCHEMA)
+    if error:
+        return None, error
+    return jira_data, None
+
+def get_jira_prompt(instruction: str, history: Sequence[Dict[str, str]] = ()) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Generates Jira operation details based on the provided instruction.
+
+    Args:
+        instruction (str): The instruction detailing what Jira operation to perform.
+        history (Sequence[Dict[str, str]]): Earlier instructions and results of the session, as chat messages.
+
+    Returns:
+        Tuple[Optional[Dict[str, Any]], Optional[str]]:
+            - A dictionary containing 'operation' and operation-specific parameters
+            - An error message if an exception occurs, or None if successful.
+    """
+    messages = _messages(instruction, history)
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": instruction}
-            ],
-            temperature=0.3,
-            max_tokens=250,
+        start = time.perf_counter()
+        response, jira_data, error = cascade(
+            "jira", lambda **kwargs: create_structured_completion("jira", "jira_operation", JIRA_SCHEMA, **kwargs),
+            _parse_operation, model=MODEL, messages=messages, **REQUEST_OPTIONS
         )
+        log_prompt_usage("jira", messages, response, time.perf_counter() - start, SYSTEM_PROMPT)
+        return jira_data, error
 
-        result = response.choices[0].message.content.strip()
-        jira_data = json.loads(result)
-        
-        # Validate the operation type
-        valid_operations = ["list_project", "create_project", "create_issue", "fetch_recent_issues"]
-        if jira_data["operation"] not in valid_operations:
-            return None, f"Invalid operation type: {jira_data['operation']}"
-            
-        return jira_data, None
-
-    except json.JSONDecodeError:
-        return None, "Invalid JSON response from model"
     except Exception as e:
         return None, f"Jira prompt error: {e}"
-    
+
+async def aget_jira_prompt(instruction: str, history: Sequence[Dict[str, str]] = ()) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Async variant of get_jira_prompt, used by the pipeline engine."""
+    messages = _messages(instruction, history)
+    try:
+        start = time.perf_counter()
+        response, jira_data, error = await acascade(
+            "jira", lambda **kwargs: acreate_structured_completion("jira", "jira_operation", JIRA_SCHEMA, **kwargs),
+            _parse_operation, model=MODEL, messages=messages, **REQUEST_OPTIONS
+        )
+        log_prompt_usage("jira", messages, response, time.perf_counter() - start, SYSTEM_PROMPT)
+        return jira_data, error
+
+    except Exception as e:
+        return None, f"Jira prompt error: {e}"
+
+SUCCESS_SYSTEM_PROMPT = """
+You are a Jira assistant that generates friendly messages for completed operations.
+
+You will receive a JSON object describing a completed Jira operation and you must return
+a brief, friendly humain readable description that summarize the operation (if there are some lists please mention them, for example list of projects, or issues you will say them and description of each issue or project in a good format if exist).
+
+only the message.
+"""
+
+SUCCESS_REQUEST_OPTIONS = {
+    "temperature": 0.2,  # Lower temperature for more predictable responses
+    "max_tokens": 100,
+}
+
+def _success_messages(operation_result: Dict[str, Any]) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SUCCESS_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(operation_result)}
+    ]
+
+def _parse_success_message(response) -> str:
+    message = response.choices[0].message.content.strip()
+    # Remove any accidental JSON formatting or quotes
+    return message.strip('"').strip("'").strip()
+
 def generate_success_message(operation_result: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
     """
     Generates a human-readable success message based on the completed Jira operation.
@@ -139,32 +215,24 @@ def generate_success_message(operation_result: Dict[str, Any]) -> Tuple[Optional
             - A success message string if successful
             - An error message if an exception occurs, or None if successful
     """
-    prompt = f"""
-You are a Jira assistant that generates friendly messages for completed operations.
-
-You will receive a JSON object describing a completed Jira operation and you must return
-a brief, friendly humain readable description that summarize the operation (if there are some lists please mention them, for example list of projects, or issues you will say them and description of each issue or project in a good format if exist).
+    messages = _success_messages(operation_result)
+    try:
+        start = time.perf_counter()
+        response = create_completion("jira_summary", model=MODEL, messages=messages, **SUCCESS_REQUEST_OPTIONS)
+        log_prompt_usage("jira_summary", messages, response, time.perf_counter() - start, SUCCESS_SYSTEM_PROMPT)
+        return _parse_success_message(response), None
 
-only the message.
-Now generate a message for this completed operation:
-{json.dumps(operation_result, indent=2)}
-"""
+    except Exception as e:
+        return None, f"Failed to generate success message: {e}"
 
+async def agenerate_success_message(operation_result: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """Async variant of generate_success_message, used by the pipeline engine."""
+    messages = _success_messages(operation_result)
     try:
-        response = client.chat.completions.create(
-            model=MODEL,
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": json.dumps(operation_result)}
-            ],
-            temperature=0.2,  # Lower temperature for more predictable responses
-            max_tokens=100,
-        )
-
-        message = response.choices[0].message.content.strip()
-        # Remove any accidental JSON formatting or quotes
-        message = message.strip('"').strip("'").strip()
-        return message, None
+        start = time.perf_counter()
+        response = await acreate_completion("jira_summary", model=MODEL, messages=messages, **SUCCESS_REQUEST_OPTIONS)
+        log_prompt_usage("jira_summary", messages, response, time.perf_counter() - start, SUCCESS_SYSTEM_PROMPT)
+        return _parse_success_message(response), None
 
     except Exception as e:
-        return None, f"Failed to generate success message: {e}"
\ No newline at end of file
+        return None, f"Failed to generate success message: {e}"
@@ -0,0 +1,221 @@
+import asyncio
+import os
+import time
+from typing import Optional
+import ledger
+from ratelimit import get_limiter, retry_after_from
+from singleflight import SingleFlight, request_key
+from .backends import Backend, BackendRouter, load_backends
+from .cascade import SMALL_MODEL
+from .resilience import (
+    MAX_ATTEMPTS, DeadlineExceeded, LatencyTracker, backoff_delay, deadline_for, first_of_hedged, is_rate_limited,
+    is_transient, record_stat
+)
+from .streaming import asend, send
+from .token_usage import estimate_message_tokens, estimate_tokens, record_sink_usage
+
+NEBIUS_API_KEY = os.getenv("NEBIUS_API_KEY")
+NEBIUS_BASE_URL = os.getenv("NEBIUS_BASE_URL")
+MODEL = os.getenv("MODEL")
+
+# Every prompt module goes through here: the sync path serves the blocking helpers
+# (cli_commands, email_sender), the async path serves the pipeline engine. Each
+# request is sent to the best healthy backend (Nebius plus any LLM_BACKENDS);
+# retries are done here (per-mode budget, jitter, failover, breakers), not by the SDK.
+router = BackendRouter(load_backends(NEBIUS_BASE_URL, NEBIUS_API_KEY, MODEL, SMALL_MODEL))
+
+latency = LatencyTracker()
+
+# Identical requests in flight share one call; a successful answer is reused for this many seconds
+LLM_REUSE_TTL = float(os.getenv("LLM_REUSE_TTL", "10"))
+flight = SingleFlight("llm", LLM_REUSE_TTL)
+
+
+def get_backend_stats():
+    return router.snapshot()
+
+
+def _request_kwargs(backend: Backend, tier: str, kwargs):
+    model = backend.model_for(tier)
+    if model:
+        return {**kwargs, "model": model}
+    return kwargs
+
+
+def _estimated_tokens(kwargs) -> int:
+    # Charged against the tokens-per-minute quota up front, corrected once usage comes back
+    return estimate_message_tokens(kwargs.get("messages", [])) + kwargs.get("max_tokens", 0)
+
+
+def _used_tokens(response):
+    return getattr(getattr(response, "usage", None), "total_tokens", None)
+
+
+def _throttled(backend: Backend, error: Exception, failed: set) -> float:
+    """A 429 says nothing about the backend's health: steer away from it and hold its queue."""
+    failed.add(backend.name)
+    return get_limiter(f"llm:{backend.name}").throttled(retry_after_from(error))
+
+
+def _meter(mode: str, backend: Backend, request, seconds: float, response=None, ttft=None, queued=0.0,
+           error: BaseException = None):
+    """Writes one backend call to the ledger, estimating tokens the backend did not report."""
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or estimate_message_tokens(request.get("messages", []))
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if completion_tokens is None:
+        content = response.choices[0].message.content if response is not None else None
+        completion_tokens = estimate_tokens(content) if content else 0
+    ledger.record(mode, "app", backend.name, request.get("model"), prompt_tokens, completion_tokens, seconds, ttft,
+                  queued, error)
+
+
+def _tier_key(mode: str, tier: str) -> str:
+    # Small and large models are tracked separately; their latencies have little to do with each other
+    return mode if tier == "large" else f"{mode}/{tier}"
+
+
+def _retry_delay(mode: str, error: Exception, attempt: int, deadline: float, failed: set) -> float:
+    """Returns how long to wait before the next attempt, or re-raises if there should be none."""
+    if not is_transient(error) or attempt + 1 >= MAX_ATTEMPTS:
+        raise error
+    record_stat("retries")
+    if router.has_healthy(exclude=failed):
+        # Another backend is up: fail over straight away instead of backing off
+        print(f"[{mode}] transient LLM error ({error.__class__.__name__}), failing over")
+        return 0.0
+    delay = backoff_delay(attempt)
+    if time.monotonic() + delay >= deadline:
+        record_stat("deadline_exceeded")
+        raise DeadlineExceeded(f"{mode} request cannot be retried before its deadline: {error}") from error
+    print(f"[{mode}] transient LLM error ({error.__class__.__name__}), retrying in {delay:.2f}s")
+    return delay
+
+
+def create_completion(mode: str, tier: str = "large", budget: Optional[float] = None, **kwargs):
+    """budget (seconds) overrides the mode's deadline, e.g. with what a cascade has left of it."""
+    return flight.do(request_key(mode, tier, **kwargs), _create_completion, mode, tier, budget, **kwargs)
+
+
+def _create_completion(mode: str, tier: str, budget: Optional[float] = None, **kwargs):
+    record_stat("requests")
+    deadline = time.monotonic() + (deadline_for(mode, tier) if budget is None else budget)
+    mode = _tier_key(mode, tier)
+    failed = set()
+    attempt = 0
+    while True:
+        backend = router.acquire(mode, avoid=failed)
+        limiter = get_limiter(f"llm:{backend.name}")
+        request = _request_kwargs(backend, tier, kwargs)
+        tokens = _estimated_tokens(kwargs)
+        queued_at = start = time.monotonic()
+        try:
+            with limiter.slot(tokens):
+                start = time.monotonic()
+                response, ttft = send(backend.client, request, deadline)
+        except Exception as e:
+            _meter(mode, backend, request, time.monotonic() - start, queued=start - queued_at, error=e)
+            if is_rate_limited(e):
+                router.release(backend, mode)
+                pause = _throttled(backend, e, failed)
+                if not router.has_healthy(exclude=failed) and time.monotonic() + pause >= deadline:
+                    record_stat("deadline_exceeded")
+                    raise DeadlineExceeded(f"{mode} request is rate limited past its deadline: {e}") from e
+                # Queued again rather than counted as a failed attempt
+                continue
+            # A non-transient error still means the endpoint answered
+            transient = is_transient(e)
+            router.release(backend, mode, None if transient else time.monotonic() - start, failed=transient)
+            failed.add(backend.name)
+            time.sleep(_retry_delay(mode, e, attempt, deadline, failed))
+            attempt += 1
+            continue
+        seconds = time.monotonic() - start
+        _meter(mode, backend, request, seconds, response, ttft, start - queued_at)
+        limiter.settle_tokens(tokens, _used_tokens(response))
+        router.release(backend, mode, seconds)
+        latency.record(mode, seconds)
+        return response
+
+
+async def _attempt(mode: str, tier: str, deadline: float, kwargs, failed: set, in_use: set):
+    """One request to one backend, released however it ends (including losing a hedge)."""
+    backend = router.acquire(mode, avoid=failed | in_use)
+    in_use.add(backend.name)
+    limiter = get_limiter(f"llm:{backend.name}")
+    request = _request_kwargs(backend, tier, kwargs)
+    tokens = _estimated_tokens(kwargs)
+    queued_at = start = time.monotonic()
+    outcome = {}
+    sent = False
+    try:
+        async with limiter.aslot(tokens):
+            start = time.monotonic()
+            sent = True
+            response, ttft = await asend(backend.async_client, request, deadline)
+        outcome["seconds"] = time.monotonic() - start
+        _meter(mode, backend, request, outcome["seconds"], response, ttft, start - queued_at)
+        limiter.settle_tokens(tokens, _used_tokens(response))
+        return response
+    except asyncio.CancelledError as e:
+        # Cancelled at the deadline means the backend hung; otherwise it lost a hedge or the job was dropped
+        if sent:
+            _meter(mode, backend, request, time.monotonic() - start, queued=start - queued_at, error=e)
+        if sent and time.monotonic() >= deadline:
+            outcome["failed"] = True
+        raise
+    except Exception as e:
+        _meter(mode, backend, request, time.monotonic() - start, queued=start - queued_at, error=e)
+        if is_rate_limited(e):
+            _throttled(backend, e, failed)
+        elif is_transient(e):
+            outcome["failed"] = True
+            failed.add(backend.name)
+        else:
+            outcome["seconds"] = time.monotonic() - start
+        raise
+    finally:
+        in_use.discard(backend.name)
+        router.release(backend, mode, **outcome)
+
+
+async def _acreate_with_retries(mode: str, tier: str, deadline: float, kwargs):
+    failed, in_use = set(), set()
+    attempt = 0
+    while True:
+        start = time.monotonic()
+        try:
+            # A duplicate goes to another backend if this one runs past the mode's recent p95; first answer wins
+            response = await first_of_hedged(lambda: _attempt(mode, tier, deadline, kwargs, failed, in_use),
+                                             latency.hedge_delay(mode))
+        except Exception as e:
+            if is_rate_limited(e):
+                # Queued again behind the backend's Retry-After; the overall deadline still applies
+                continue
+            await asyncio.sleep(_retry_delay(mode, e, attempt, deadline, failed))
+            attempt += 1
+            continue
+        latency.record(mode, time.monotonic() - start)
+        return response
+
+
+async def acreate_completion(mode: str, tier: str = "large", budget: Optional[float] = None, **kwargs):
+    return await flight.ado(request_key(mode, tier, **kwargs),
+                            lambda: _acreate_completion(mode, tier, budget, **kwargs))
+
+
+async def _acreate_completion(mode: str, tier: str, budget: Optional[float] = None, **kwargs):
+    record_stat("requests")
+    budget = deadline_for(mode, tier) if budget is None else budget
+    mode = _tier_key(mode, tier)
+    try:
+        response = await asyncio.wait_for(_acreate_with_retries(mode, tier, time.monotonic() + budget, kwargs), budget)
+    except asyncio.TimeoutError:
+        record_sink_usage(kwargs.get("messages", []))
+        record_stat("deadline_exceeded")
+        raise DeadlineExceeded(f"{mode} request did not finish within {budget:g}s") from None
+    except asyncio.CancelledError:
+        record_sink_usage(kwargs.get("messages", []))
+        raise
+    record_sink_usage(kwargs.get("messages", []), response)
+    return response
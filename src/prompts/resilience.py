@@ -0,0 +1,214 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+
+import openai
+
+# Client-side latency budget per mode, in seconds, covering retries and hedges
+MODE_DEADLINES = {
+    "router": 5.0,
+    "command": 20.0,
+    "email": 30.0,
+    "jira": 30.0,
+    "jira_summary": 20.0,
+}
+DEFAULT_DEADLINE = float(os.getenv("LLM_DEADLINE", "30"))
+# Small-model attempts in a cascade get this share of the budget, leaving room to escalate
+SMALL_TIER_DEADLINE_SHARE = 0.4
+
+MAX_ATTEMPTS = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 4.0
+
+# A hedge goes out once a request has run longer than this percentile of recent latencies
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_MIN_DELAY = 0.3
+HEDGING_ENABLED = os.getenv("LLM_HEDGING", "1") != "0"
+
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30.0
+
+# Errors worth another attempt; everything else (bad request, auth, ...) fails immediately
+TRANSIENT_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+_stats_lock = threading.Lock()
+RESILIENCE_STATS = {
+    "requests": 0,
+    "retries": 0,
+    "hedges": 0,
+    "hedge_wins": 0,
+    "deadline_exceeded": 0,
+    "breaker_rejections": 0,
+}
+
+
+def record_stat(name: str):
+    with _stats_lock:
+        RESILIENCE_STATS[name] += 1
+
+
+def get_resilience_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(RESILIENCE_STATS)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+def deadline_for(mode: str, tier: str = "large") -> float:
+    deadline = MODE_DEADLINES.get(mode, DEFAULT_DEADLINE)
+    return deadline * SMALL_TIER_DEADLINE_SHARE if tier == "small" else deadline
+
+
+def is_transient(error: Exception) -> bool:
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return isinstance(error, openai.RateLimitError)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter, so clients that failed together do not retry together."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class LatencyTracker:
+    """Sliding window of successful request latencies per mode."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, mode: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(mode, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, mode: str, fraction: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(mode, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def hedge_delay(self, mode: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history to know what slow is."""
+        if not HEDGING_ENABLED:
+            return None
+        p95 = self.percentile(mode, HEDGE_PERCENTILE)
+        return max(HEDGE_MIN_DELAY, p95) if p95 is not None else None
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated transient failures instead of making every request wait out its deadline.
+
+    Closed: requests flow. After BREAKER_FAILURE_THRESHOLD consecutive failures it
+    opens and rejects requests for BREAKER_RESET_SECONDS; then one trial request is
+    let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def check(self):
+        if not self.allow():
+            record_stat("breaker_rejections")
+            raise CircuitOpenError(f"LLM endpoint {self.name} is unavailable; not retrying for now")
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                if self.opened_at is None:
+                    print(f"Circuit breaker for {self.name} opened after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+
+async def first_of_hedged(make_request, hedge_delay: Optional[float]):
+    """
+    Runs make_request(), and a duplicate if the first has not answered after hedge_delay.
+
+    The first successful response wins and the other request is cancelled. If one
+    attempt fails the other is still awaited; the error is raised only if both fail.
+    """
+    tasks = [asyncio.ensure_future(make_request())]
+    try:
+        if hedge_delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                record_stat("hedges")
+                tasks.append(asyncio.ensure_future(make_request()))
+
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if len(tasks) > 1 and task is tasks[1]:
+                        record_stat("hedge_wins")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
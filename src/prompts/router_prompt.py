@@ -0,0 +1,76 @@
+import time
+from typing import Tuple, Optional
+from .llm_client import MODEL, acreate_completion, create_completion
+from .token_usage import log_prompt_usage
+
+VALID_MODES = ["command", "email", "jira", "taskcrafters"]
+
+SYSTEM_PROMPT = """
+You are a router that decides which assistant should handle a voice instruction.
+
+Answer with exactly one word:
+- command: run a shell command or open an application on this computer
+- email: write or send an email to someone
+- jira: create or list Jira projects, issues or tickets
+- taskcrafters: questions, web search, weather, news, videos or calendar events
+
+ONLY return the word. Do NOT include any other explanation or text.
+
+Now classify the user's instruction.
+"""
+
+def _messages(instruction: str):
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": instruction}
+    ]
+
+def _parse_mode(response) -> Tuple[Optional[str], Optional[str]]:
+    mode = response.choices[0].message.content.strip().strip('.').lower()
+    if mode not in VALID_MODES:
+        return None, f"Invalid mode: {mode}"
+    return mode, None
+
+def get_mode_prompt(instruction: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Classifies an instruction into one of the application modes.
+
+    Used as a fallback when the local intent router is not confident enough.
+
+    Args:
+        instruction (str): The transcribed user instruction.
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]:
+            - The mode name ("command", "email", "jira" or "taskcrafters") if successful.
+            - An error message if an exception occurs, or None if successful.
+    """
+
+    messages = _messages(instruction)
+    try:
+        start = time.perf_counter()
+        response = create_completion(
+            "router",
+            model=MODEL,
+            messages=messages,
+            temperature=0.0,
+            max_tokens=5,
+        )
+        log_prompt_usage("router", messages, response, time.perf_counter() - start, SYSTEM_PROMPT)
+
+        return _parse_mode(response)
+
+    except Exception as e:
+        return None, f"Router prompt error: {e}"
+
+async def aget_mode_prompt(instruction: str) -> Tuple[Optional[str], Optional[str]]:
+    """Async variant of get_mode_prompt, used by the pipeline engine."""
+    messages = _messages(instruction)
+    try:
+        start = time.perf_counter()
+        response = await acreate_completion("router", model=MODEL, messages=messages, temperature=0.0, max_tokens=5)
+        log_prompt_usage("router", messages, response, time.perf_counter() - start, SYSTEM_PROMPT)
+        return _parse_mode(response)
+
+    except Exception as e:
+        return None, f"Router prompt error: {e}"
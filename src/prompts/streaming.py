@@ -0,0 +1,126 @@
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from openai.types.chat import ChatCompletion, ChatCompletionMessage, ChatCompletionMessageToolCall
+from openai.types.chat.chat_completion import Choice
+
+from .resilience import DeadlineExceeded
+
+# Responses are streamed so the ledger can see time to first token. A backend
+# that rejects streaming switches the process to plain responses, once.
+_streaming = os.getenv("LLM_STREAM", "1") != "0"
+
+
+def _is_stream_rejection(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    return status in (400, 422) and "stream" in str(error).lower()
+
+
+def _disable_streaming(error: Exception):
+    global _streaming
+    print(f"Backend rejected streaming, falling back to plain responses: {error}")
+    _streaming = False
+
+
+class _Assembler:
+    """Rebuilds a ChatCompletion from streamed chunks and notes when the first content arrived."""
+
+    def __init__(self, start: float):
+        self.start = start
+        self.ttft: Optional[float] = None
+        self.parts = []
+        # Tool calls arrive as fragments keyed by index: id and name once, arguments in pieces
+        self.tool_calls: Dict[int, Dict[str, Any]] = {}
+        self.finish_reason = None
+        self.usage = None
+        self.id = ""
+        self.model = ""
+        self.created = 0
+
+    def add(self, chunk):
+        self.id = chunk.id or self.id
+        self.model = chunk.model or self.model
+        self.created = chunk.created or self.created
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        for choice in chunk.choices:
+            if choice.delta.content:
+                if self.ttft is None:
+                    self.ttft = time.monotonic() - self.start
+                self.parts.append(choice.delta.content)
+            for fragment in choice.delta.tool_calls or ():
+                call = self.tool_calls.setdefault(fragment.index, {"id": "", "name": "", "arguments": []})
+                if self.ttft is None:
+                    self.ttft = time.monotonic() - self.start
+                call["id"] = fragment.id or call["id"]
+                if fragment.function is not None:
+                    call["name"] = fragment.function.name or call["name"]
+                    call["arguments"].append(fragment.function.arguments or "")
+            if choice.finish_reason:
+                self.finish_reason = choice.finish_reason
+
+    def response(self) -> ChatCompletion:
+        tool_calls = [
+            ChatCompletionMessageToolCall(id=call["id"], type="function",
+                                          function={"name": call["name"], "arguments": "".join(call["arguments"])})
+            for _, call in sorted(self.tool_calls.items())
+        ] or None
+        content = "".join(self.parts) if self.parts or not tool_calls else None
+        return ChatCompletion(
+            id=self.id,
+            object="chat.completion",
+            created=self.created,
+            model=self.model,
+            choices=[Choice(index=0, finish_reason=self.finish_reason or ("tool_calls" if tool_calls else "stop"),
+                            message=ChatCompletionMessage(role="assistant", content=content,
+                                                          tool_calls=tool_calls))],
+            usage=self.usage,
+        )
+
+
+def _stream_request(request: Dict[str, Any]) -> Dict[str, Any]:
+    return {**request, "stream": True, "stream_options": {"include_usage": True}}
+
+
+def send(client, request: Dict[str, Any], deadline: float) -> Tuple[ChatCompletion, Optional[float]]:
+    """Sends one chat completion; returns the response and its time to first token (None if not streamed)."""
+    start = time.monotonic()
+    timeout = max(0.1, deadline - start)
+    if _streaming:
+        try:
+            stream = client.chat.completions.create(timeout=timeout, **_stream_request(request))
+        except Exception as e:
+            if not _is_stream_rejection(e):
+                raise
+            _disable_streaming(e)
+        else:
+            assembler = _Assembler(start)
+            with stream:
+                for chunk in stream:
+                    assembler.add(chunk)
+                    # The SDK timeout applies per read, so a trickling stream is cut off here
+                    if time.monotonic() > deadline:
+                        raise DeadlineExceeded("response was still streaming at the deadline")
+            return assembler.response(), assembler.ttft
+    return client.chat.completions.create(timeout=timeout, **request), None
+
+
+async def asend(client, request: Dict[str, Any], deadline: float) -> Tuple[ChatCompletion, Optional[float]]:
+    """Async variant of send; the caller's wait_for bounds the whole stream."""
+    start = time.monotonic()
+    timeout = max(0.1, deadline - start)
+    if _streaming:
+        try:
+            stream = await client.chat.completions.create(timeout=timeout, **_stream_request(request))
+        except Exception as e:
+            if not _is_stream_rejection(e):
+                raise
+            _disable_streaming(e)
+        else:
+            assembler = _Assembler(start)
+            async with stream:
+                async for chunk in stream:
+                    assembler.add(chunk)
+            return assembler.response(), assembler.ttft
+    return await client.chat.completions.create(timeout=timeout, **request), None
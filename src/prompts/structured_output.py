@@ -0,0 +1,288 @@
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from .llm_client import acreate_completion, create_completion
+
+# "json_schema" (constrained decoding), "json_object" (JSON mode) or "none".
+# Downgraded automatically the first time the backend rejects a format.
+RESPONSE_FORMATS = ["json_schema", "json_object", "none"]
+_response_format = os.getenv("LLM_RESPONSE_FORMAT", "json_schema")
+if _response_format not in RESPONSE_FORMATS:
+    _response_format = "json_schema"
+# Requests on the I/O pool, hedges and the agent's worker all read and downgrade the format
+_format_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+REPAIR_STATS = {
+    "responses": 0,
+    "valid": 0,
+    "repaired": 0,
+    "failed": 0,
+}
+
+_FENCE_RE = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.DOTALL)
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _record(outcome: str):
+    with _stats_lock:
+        REPAIR_STATS["responses"] += 1
+        REPAIR_STATS[outcome] += 1
+
+
+def get_repair_stats() -> Dict[str, float]:
+    """
+    Returns the JSON repair counters.
+
+    "avoided_retries" counts responses that would have been an error dialog (and a
+    new recording) without the local repair step.
+    """
+    with _stats_lock:
+        stats = dict(REPAIR_STATS)
+    total = stats["responses"] or 1
+    stats["repair_rate"] = stats["repaired"] / total
+    stats["failure_rate"] = stats["failed"] / total
+    stats["avoided_retries"] = stats["repaired"]
+    return stats
+
+
+def _current_format() -> str:
+    with _format_lock:
+        return _response_format
+
+
+def _response_format_for(name: str, schema: Dict[str, Any], response_format: str) -> Optional[Dict[str, Any]]:
+    if response_format == "json_schema":
+        return {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}
+    if response_format == "json_object":
+        return {"type": "json_object"}
+    return None
+
+
+def _is_format_rejection(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    message = str(error).lower()
+    return status in (400, 422) and ("response_format" in message or "json_schema" in message)
+
+
+def _with_response_format(kwargs: Dict[str, Any], name: str, schema: Dict[str, Any],
+                          used: str) -> Dict[str, Any]:
+    response_format = _response_format_for(name, schema, used)
+    return dict(kwargs, response_format=response_format) if response_format else kwargs
+
+
+def _downgrade_or_raise(error: Exception, used: str):
+    """Moves one step down from the format the failed request used; requests that failed together step once."""
+    global _response_format
+    if used == "none" or not _is_format_rejection(error):
+        raise error
+    with _format_lock:
+        if _response_format != used:
+            return  # another request already downgraded past it
+        downgraded = RESPONSE_FORMATS[RESPONSE_FORMATS.index(used) + 1]
+        print(f"Backend rejected response_format={used}, falling back to {downgraded}")
+        _response_format = downgraded
+
+
+def create_structured_completion(mode: str, name: str, schema: Dict[str, Any], **kwargs):
+    """
+    Calls the chat completion endpoint with the strongest response format the backend accepts.
+
+    Backends that reject a format are remembered for the rest of the process so the
+    downgrade costs at most one extra request per format, not one per instruction.
+    """
+    while True:
+        used = _current_format()
+        try:
+            return create_completion(mode, **_with_response_format(kwargs, name, schema, used))
+        except Exception as e:
+            _downgrade_or_raise(e, used)
+
+
+async def acreate_structured_completion(mode: str, name: str, schema: Dict[str, Any], **kwargs):
+    """Async variant of create_structured_completion."""
+    while True:
+        used = _current_format()
+        try:
+            return await acreate_completion(mode, **_with_response_format(kwargs, name, schema, used))
+        except Exception as e:
+            _downgrade_or_raise(e, used)
+
+
+def _strip_fences(text: str) -> str:
+    match = _FENCE_RE.search(text)
+    return match.group(1) if match else text
+
+
+def _first_balanced_object(text: str) -> Optional[str]:
+    start = text.find("{")
+    while start != -1:
+        depth = 0
+        in_string = False
+        quote = ""
+        escaped = False
+        for i in range(start, len(text)):
+            char = text[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif char == "\\":
+                    escaped = True
+                elif char == quote:
+                    in_string = False
+            elif char in "\"'":
+                in_string = True
+                quote = char
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+                if depth == 0:
+                    return text[start:i + 1]
+        start = text.find("{", start + 1)
+    return None
+
+
+def _normalize_tokens(text: str) -> str:
+    """Removes trailing commas, converts single-quoted strings and Python literals outside strings."""
+    out: List[str] = []
+    i = 0
+    length = len(text)
+    while i < length:
+        char = text[i]
+        if char in "\"'":
+            quote = char
+            j = i + 1
+            buffer = []
+            while j < length and text[j] != quote:
+                if text[j] == "\\" and j + 1 < length:
+                    buffer.append(text[j:j + 2])
+                    j += 2
+                    continue
+                if text[j] == "\n":
+                    buffer.append("\\n")
+                else:
+                    buffer.append('\\"' if quote == "'" and text[j] == '"' else text[j])
+                j += 1
+            out.append('"' + "".join(buffer).replace("\\'", "'") + '"')
+            i = j + 1
+            continue
+        if char == ",":
+            j = i + 1
+            while j < length and text[j].isspace():
+                j += 1
+            if j < length and text[j] in "}]":
+                i += 1
+                continue
+        if char.isalpha():
+            j = i
+            while j < length and text[j].isalnum():
+                j += 1
+            word = text[i:j]
+            out.append(_PY_LITERALS.get(word, word))
+            i = j
+            continue
+        out.append(char)
+        i += 1
+    return "".join(out)
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """
+    Best-effort local repair of a model response that is almost JSON.
+
+    Strips markdown fences and surrounding prose, extracts the first balanced
+    object, then fixes smart quotes, single quotes, trailing commas and Python
+    literals. Returns None when nothing parseable is left.
+    """
+    candidate = _strip_fences(text)
+    candidate = candidate.replace("“", '"').replace("”", '"').replace("‘", "'").replace("’", "'")
+    candidate = _first_balanced_object(candidate)
+    if candidate is None:
+        return None
+    for attempt in (candidate, _normalize_tokens(candidate)):
+        try:
+            return json.loads(attempt)
+        except json.JSONDecodeError:
+            continue
+    return None
+
+
+def _coerce(value: Any, schema: Dict[str, Any], path: str) -> Any:
+    if "anyOf" in schema:
+        errors = []
+        for option in schema["anyOf"]:
+            try:
+                return _coerce(value, option, path)
+            except ValueError as e:
+                errors.append(str(e))
+        raise ValueError(f"{path or 'value'} matches no allowed shape ({'; '.join(errors)})")
+
+    expected = schema.get("type")
+    if expected == "object":
+        if not isinstance(value, dict):
+            raise ValueError(f"{path or 'value'} should be an object")
+        result = dict(value)
+        for key in schema.get("required", []):
+            if key not in result:
+                raise ValueError(f"missing field {path + key}")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in result:
+                result[key] = _coerce(result[key], subschema, f"{path}{key}.")
+        return result
+    if expected == "string":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if not isinstance(value, str):
+            raise ValueError(f"{path.rstrip('.')} should be a string")
+        value = value.strip()
+    elif expected == "integer":
+        if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+            value = int(value.strip())
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError(f"{path.rstrip('.')} should be an integer")
+    if "enum" in schema and value not in schema["enum"]:
+        raise ValueError(f"{path.rstrip('.')} should be one of {schema['enum']}, got {value!r}")
+    return value
+
+
+def validate(data: Any, schema: Dict[str, Any]) -> Any:
+    """Validates data against a small JSON-schema subset, coercing scalar types. Raises ValueError."""
+    return _coerce(data, schema, "")
+
+
+def parse_structured_response(text: str, schema: Dict[str, Any]) -> Tuple[Optional[Any], Optional[str]]:
+    """
+    Parses and validates a model response, repairing it locally if needed.
+
+    Returns:
+        Tuple[Optional[Any], Optional[str]]:
+            - The validated data if successful.
+            - An error message if the response could not be repaired, or None if successful.
+    """
+    repaired = False
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = repair_json(text)
+        repaired = True
+        if data is None:
+            _record("failed")
+            return None, "Invalid JSON response from model"
+
+    try:
+        data = validate(data, schema)
+    except ValueError as e:
+        _record("failed")
+        return None, f"Response does not match the expected format: {e}"
+
+    if repaired:
+        _record("repaired")
+        stats = get_repair_stats()
+        print(f"Repaired model JSON locally (repair rate {stats['repair_rate']:.0%}, "
+              f"{stats['avoided_retries']} retries avoided)")
+    else:
+        _record("valid")
+    return data, None
@@ -0,0 +1,77 @@
+import json
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+_lock = threading.Lock()
+PROMPT_STATS: Dict[str, Dict[str, float]] = {}
+
+# Optional per-task token tally: callers that need to attribute tokens to one
+# piece of work (e.g. a speculative generation) set a dict here before awaiting
+USAGE_SINK: ContextVar[Optional[Dict[str, int]]] = ContextVar("usage_sink", default=None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token for English text)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def estimate_message_tokens(messages: List[Dict[str, Any]]) -> int:
+    # Chat templates add a few tokens of framing per message; tool calls count as their JSON
+    return sum(estimate_tokens(message.get("content") or "") + 4 +
+               (estimate_tokens(json.dumps(message["tool_calls"])) if message.get("tool_calls") else 0)
+               for message in messages)
+
+
+def log_prompt_usage(mode: str, messages: List[Dict[str, str]], response: Any, elapsed: float,
+                     static_prefix: Optional[str] = None):
+    """
+    Records prompt/completion token counts and latency for one request of a mode.
+
+    Uses the usage block returned by the backend when present and falls back to a
+    local estimate otherwise. static_prefix is the immutable part of the prompt, so
+    the log shows how much of each request is eligible for provider prefix caching.
+    """
+    usage = getattr(response, "usage", None)
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or estimate_message_tokens(messages)
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    prefix_tokens = estimate_tokens(static_prefix) if static_prefix else 0
+
+    with _lock:
+        stats = PROMPT_STATS.setdefault(mode, {
+            "requests": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "seconds": 0.0,
+        })
+        stats["requests"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        stats["seconds"] += elapsed
+        average_prompt = stats["prompt_tokens"] / stats["requests"]
+        average_ms = stats["seconds"] / stats["requests"] * 1000
+
+    print(f"[{mode}] prompt tokens: {prompt_tokens} (static prefix ~{prefix_tokens}), "
+          f"completion tokens: {completion_tokens}, latency: {elapsed * 1000:.0f} ms "
+          f"(avg {average_prompt:.0f} prompt tokens, {average_ms:.0f} ms over {stats['requests']} requests)")
+
+
+def record_sink_usage(messages: List[Dict[str, str]], response: Any = None):
+    """
+    Adds one request's tokens to the current task's USAGE_SINK, if any.
+
+    Called with response=None for requests abandoned mid-flight; the prompt is
+    counted from a local estimate since the backend has usually read it already.
+    """
+    sink = USAGE_SINK.get()
+    if sink is None:
+        return
+    usage = getattr(response, "usage", None)
+    sink["prompt_tokens"] = sink.get("prompt_tokens", 0) + (
+        getattr(usage, "prompt_tokens", None) or estimate_message_tokens(messages))
+    sink["completion_tokens"] = sink.get("completion_tokens", 0) + (getattr(usage, "completion_tokens", None) or 0)
+
+
+def get_prompt_stats() -> Dict[str, Dict[str, float]]:
+    with _lock:
+        return {mode: dict(stats) for mode, stats in PROMPT_STATS.items()}
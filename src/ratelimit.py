@@ -0,0 +1,269 @@
+import asyncio
+import email.utils
+import json
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Dict, Mapping, Optional
+
+import requests
+
+# Client-side quotas per outbound service: requests per minute, tokens per minute
+# (LLM only) and concurrent requests. "llm:<backend>" falls back to "llm".
+# RATE_LIMITS='{"tavily": {"rpm": 30}}' overrides any of them.
+SERVICE_LIMITS: Dict[str, Dict[str, float]] = {
+    "llm": {"rpm": float(os.getenv("LLM_RPM", "600")), "tpm": float(os.getenv("LLM_TPM", "400000")),
+            "concurrency": int(os.getenv("LLM_CONCURRENCY", "8"))},
+    "tavily": {"rpm": 100, "concurrency": 4},
+    "search": {"rpm": 60, "concurrency": 4},
+    "geo": {"rpm": 45, "concurrency": 2},
+    "jira": {"rpm": 300, "concurrency": 4},
+    "gmail": {"rpm": 60, "concurrency": 2},
+    "google_calendar": {"rpm": 300, "concurrency": 4},
+}
+DEFAULT_LIMITS = {"rpm": 60, "concurrency": 4}
+
+# A bucket holds this many seconds of quota, so short bursts go out immediately
+BURST_SECONDS = 2.0
+POLL_INTERVAL = 0.02
+# Pause used when a service answers 429 without saying for how long
+DEFAULT_THROTTLE_PAUSE = 2.0
+MAX_THROTTLE_RETRIES = 3
+# Waits longer than this are logged
+REPORT_WAIT = 1.0
+
+
+def _configured_limits() -> Dict[str, Dict[str, float]]:
+    limits = {name: dict(values) for name, values in SERVICE_LIMITS.items()}
+    try:
+        for name, values in json.loads(os.getenv("RATE_LIMITS") or "{}").items():
+            limits.setdefault(name, {}).update(values)
+    except (ValueError, AttributeError) as e:
+        print(f"Ignoring RATE_LIMITS: {e}")
+    return limits
+
+
+class TokenBucket:
+    """
+    Refills at per_minute / 60 per second up to BURST_SECONDS worth.
+
+    reserve() takes the amount immediately, going negative if needed, and returns
+    how long the caller must wait; later callers therefore queue behind earlier ones.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = max(per_minute, 1e-6) / 60.0
+        self.capacity = max(1.0, self.rate * BURST_SECONDS)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            # A single request larger than the burst still gets through, after a full refill
+            self.level -= min(amount, self.capacity)
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount: float):
+        with self._lock:
+            self.level = min(self.capacity, self.level + amount)
+
+
+def parse_retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Seconds from retry-after-ms / Retry-After (seconds or an HTTP date), or None."""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_from(error: Exception) -> Optional[float]:
+    return parse_retry_after(getattr(getattr(error, "response", None), "headers", None))
+
+
+class ServiceLimiter:
+    """
+    Request/token buckets plus a concurrency cap for one service.
+
+    slot() (threads) and aslot() (pipeline loop) wait for a free slot and for
+    quota, then let the request through; nothing is rejected. throttled() records
+    a 429 from the service and holds back every request until its Retry-After.
+    """
+
+    def __init__(self, name: str, rpm: float, tpm: Optional[float] = None, concurrency: int = 4):
+        self.name = name
+        self.concurrency = max(1, int(concurrency))
+        self.request_bucket = TokenBucket(rpm)
+        self.token_bucket = TokenBucket(tpm) if tpm else None
+        self.paused_until = 0.0
+        self.active = 0
+        self.stats = {"requests": 0, "queued": 0, "wait_seconds": 0.0, "max_wait": 0.0, "throttled": 0}
+        self._condition = threading.Condition()
+
+    def _try_enter(self) -> bool:
+        with self._condition:
+            if self.active < self.concurrency:
+                self.active += 1
+                return True
+            return False
+
+    def _enter(self):
+        with self._condition:
+            while self.active >= self.concurrency:
+                self._condition.wait()
+            self.active += 1
+
+    def _leave(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+    def _reserve(self, tokens: float) -> float:
+        delay = self.request_bucket.reserve(1)
+        if self.token_bucket is not None and tokens:
+            delay = max(delay, self.token_bucket.reserve(tokens))
+        return delay
+
+    def _refund(self, tokens: float):
+        self.request_bucket.refund(1)
+        if self.token_bucket is not None and tokens:
+            self.token_bucket.refund(tokens)
+
+    def _pause_remaining(self) -> float:
+        return self.paused_until - time.monotonic()
+
+    def _record_wait(self, waited: float):
+        with self._condition:
+            self.stats["requests"] += 1
+            self.stats["wait_seconds"] += waited
+            self.stats["max_wait"] = max(self.stats["max_wait"], waited)
+            if waited > POLL_INTERVAL:
+                self.stats["queued"] += 1
+        if waited > REPORT_WAIT:
+            print(f"[{self.name}] request queued {waited:.1f}s by the client-side rate limiter")
+
+    @contextmanager
+    def slot(self, tokens: float = 0):
+        start = time.monotonic()
+        self._enter()
+        try:
+            time.sleep(self._reserve(tokens))
+            while self._pause_remaining() > 0:
+                time.sleep(self._pause_remaining())
+            self._record_wait(time.monotonic() - start)
+            yield self
+        finally:
+            self._leave()
+
+    @asynccontextmanager
+    async def aslot(self, tokens: float = 0):
+        start = time.monotonic()
+        while not self._try_enter():
+            await asyncio.sleep(POLL_INTERVAL)
+        try:
+            try:
+                await asyncio.sleep(self._reserve(tokens))
+                while self._pause_remaining() > 0:
+                    await asyncio.sleep(self._pause_remaining())
+            except asyncio.CancelledError:
+                # Never sent: give the quota back to whoever is queued behind
+                self._refund(tokens)
+                raise
+            self._record_wait(time.monotonic() - start)
+            yield self
+        finally:
+            self._leave()
+
+    def settle_tokens(self, estimated: float, actual: Optional[float]):
+        """Corrects the token bucket once the real usage of a request is known."""
+        if self.token_bucket is None or actual is None:
+            return
+        if actual < estimated:
+            self.token_bucket.refund(estimated - actual)
+        elif actual > estimated:
+            self.token_bucket.reserve(actual - estimated)
+
+    def throttled(self, retry_after: Optional[float] = None) -> float:
+        """Records a 429 and pauses the service; returns the pause in seconds."""
+        pause = DEFAULT_THROTTLE_PAUSE if retry_after is None else retry_after
+        with self._condition:
+            self.stats["throttled"] += 1
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        print(f"[{self.name}] throttled by the service, holding requests for {pause:.1f}s")
+        return pause
+
+
+_limiters_lock = threading.Lock()
+_LIMITERS: Dict[str, ServiceLimiter] = {}
+
+
+def get_limiter(service: str) -> ServiceLimiter:
+    with _limiters_lock:
+        limiter = _LIMITERS.get(service)
+        if limiter is None:
+            limits = _configured_limits()
+            values = limits.get(service) or limits.get(service.split(":")[0]) or DEFAULT_LIMITS
+            limiter = _LIMITERS[service] = ServiceLimiter(
+                service, values.get("rpm", DEFAULT_LIMITS["rpm"]), values.get("tpm"),
+                values.get("concurrency", DEFAULT_LIMITS["concurrency"]))
+        return limiter
+
+
+def limited(service: str, func):
+    """Wraps a blocking call (e.g. a search tool) so it goes through the service's limiter."""
+    def run(*args, **kwargs):
+        with get_limiter(service).slot():
+            return func(*args, **kwargs)
+    return run
+
+
+def request_with_limits(service: str, method: str, url: str, **kwargs) -> requests.Response:
+    """
+    requests.request() through the service's limiter.
+
+    A 429 (or 503 with Retry-After) pauses the service for the time it asks for
+    and the request is queued again, up to MAX_THROTTLE_RETRIES times; after
+    that the last response is returned for the caller to handle.
+    """
+    limiter = get_limiter(service)
+    for attempt in range(MAX_THROTTLE_RETRIES + 1):
+        with limiter.slot():
+            response = requests.request(method, url, **kwargs)
+        retry_after = parse_retry_after(response.headers)
+        throttled = response.status_code == 429 or (response.status_code == 503 and retry_after is not None)
+        if not throttled or attempt == MAX_THROTTLE_RETRIES:
+            return response
+        limiter.throttled(retry_after)
+    return response
+
+
+def get_rate_limit_stats() -> Dict[str, Dict[str, Any]]:
+    with _limiters_lock:
+        limiters = list(_LIMITERS.values())
+    stats = {}
+    for limiter in limiters:
+        with limiter._condition:
+            entry = dict(limiter.stats)
+            entry["in_flight"] = limiter.active
+        entry["avg_wait_ms"] = entry["wait_seconds"] / entry["requests"] * 1000 if entry["requests"] else 0.0
+        stats[limiter.name] = entry
+    return stats
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+_MISSING = object()
+
+_registry_lock = threading.Lock()
+_REGISTRY: List["SingleFlight"] = []
+
+
+def normalize_text(text: str) -> str:
+    """Case, punctuation and spacing do not change what is being asked."""
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+def request_key(*parts: Any, **kwargs: Any) -> str:
+    """Stable key for a call from its arguments; dicts are compared by content, not key order."""
+    return json.dumps([parts, kwargs], sort_keys=True, default=str, ensure_ascii=False)
+
+
+class SingleFlight:
+    """
+    Coalesces identical calls: while one is running, callers with the same key wait for its result.
+
+    With ttl > 0 a successful result is also reused for that many seconds after it
+    arrives; errors are never reused. do() is for threads, ado() for the pipeline
+    loop. An async call is only cancelled once every caller waiting on it has
+    been cancelled.
+    """
+
+    def __init__(self, name: str, ttl: float = 0.0, max_entries: int = 256):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stats = {"calls": 0, "executed": 0, "coalesced": 0, "reused": 0}
+        self._lock = threading.Lock()
+        self._results: Dict[Hashable, Tuple[float, Any]] = {}
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        with _registry_lock:
+            _REGISTRY.append(self)
+
+    def _lookup(self, key: Hashable) -> Any:
+        """Returns a reusable result or _MISSING; counts the call. Caller holds the lock."""
+        self.stats["calls"] += 1
+        entry = self._results.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            del self._results[key]
+            return _MISSING
+        self.stats["reused"] += 1
+        return value
+
+    def _store(self, key: Hashable, value: Any):
+        """Caller holds the lock."""
+        if self.ttl <= 0:
+            return
+        self._results.pop(key, None)
+        self._results[key] = (time.monotonic() + self.ttl, value)
+        while len(self._results) > self.max_entries:
+            del self._results[next(iter(self._results))]
+
+    def forget(self, key: Hashable):
+        with self._lock:
+            self._results.pop(key, None)
+
+    def do(self, key: Hashable, func: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.stats["executed"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if not leader:
+            return future.result()
+
+        try:
+            value = func(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._calls.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._calls.pop(key, None)
+            self._store(key, value)
+        future.set_result(value)
+        return value
+
+    def _settle(self, key: Hashable, task: asyncio.Task):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+                self._waiters.pop(key, None)
+            if not task.cancelled() and task.exception() is None:
+                self._store(key, task.result())
+
+    async def ado(self, key: Hashable, make_call: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                return value
+            task = self._tasks.get(key)
+            if task is None:
+                self.stats["executed"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if task is None:
+            # Runs in the first caller's context, so its USAGE_SINK gets the tokens
+            task = asyncio.ensure_future(make_call())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._settle(key, done))
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters.get(key) == 1 and not task.done():
+                # Last one waiting: stop the call and let it unwind before this caller does
+                task.cancel()
+                await asyncio.wait([task])
+            raise
+        finally:
+            if self._tasks.get(key) is task:
+                self._waiters[key] -= 1
+
+
+def get_singleflight_stats() -> Dict[str, Dict[str, int]]:
+    with _registry_lock:
+        flights = list(_REGISTRY)
+    stats = {}
+    for flight in flights:
+        with flight._lock:
+            stats[flight.name] = dict(flight.stats)
+    return stats
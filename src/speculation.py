@@ -0,0 +1,162 @@
+import asyncio
+import re
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Consecutive partial transcripts that must agree before generation starts
+DEFAULT_STABILITY = 2
+
+# Returned by the generate callback for text not worth speculating on (e.g. routed to a mode whose work
+# cannot be cancelled); the speculation ends there and counts as neither a hit nor a miss
+SKIPPED = object()
+
+_lock = threading.Lock()
+SPECULATION_STATS: Dict[str, float] = {
+    "started": 0,
+    "hits": 0,
+    "misses": 0,
+    "skipped": 0,
+    "superseded": 0,
+    "wasted_tokens": 0,
+    "saved_seconds": 0.0,
+}
+
+
+def normalize_transcript(text: str) -> str:
+    """Case, punctuation and spacing differences between Whisper passes do not change the request."""
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+def _record(**increments):
+    with _lock:
+        for key, value in increments.items():
+            SPECULATION_STATS[key] += value
+
+
+def get_speculation_stats() -> Dict[str, float]:
+    with _lock:
+        stats = dict(SPECULATION_STATS)
+    resolved = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = stats["hits"] / resolved if resolved else 0.0
+    return stats
+
+
+class Speculator:
+    """
+    Starts generation on a partial transcript once it has stopped changing.
+
+    One Speculator lives for one recording and is only touched from the pipeline
+    loop. Each partial transcript is passed to observe(); after `stability`
+    identical passes the generate callback is started on that text. A later,
+    different stable text cancels and replaces the running speculation. When the
+    final transcript arrives, resolve() returns the speculative result if the
+    texts match and cancels it otherwise. Tokens spent on cancelled or discarded
+    speculations are counted as wasted. A callback returning SKIPPED ends
+    speculation for the recording without affecting the hit rate.
+    """
+
+    def __init__(self, generate: Callable[[str], Awaitable[Any]], stability: int = DEFAULT_STABILITY):
+        self.generate = generate
+        self.stability = max(1, stability)
+        self._last_partial = ""
+        self._repeats = 0
+        self._text: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._usage: Dict[str, int] = {}
+        self._started_at = 0.0
+        self._finished_at: Optional[float] = None
+        self._closed = False
+        self._skipped = False
+
+    def observe(self, partial: str):
+        normalized = normalize_transcript(partial)
+        if self._closed or not normalized:
+            return
+        if normalized == self._last_partial:
+            self._repeats += 1
+        else:
+            self._last_partial = normalized
+            self._repeats = 1
+        if self._repeats >= self.stability and normalized != self._text:
+            if self._task is not None:
+                _record(superseded=1)
+                self._cancel()
+            self._start(normalized, partial)
+
+    def _start(self, normalized: str, text: str):
+        self._text = normalized
+        self._usage = {}
+        self._started_at = time.monotonic()
+        self._finished_at = None
+        self._task = asyncio.get_running_loop().create_task(self._run(text, self._usage))
+        _record(started=1)
+        print(f"Speculating on partial transcript: {text.strip()!r}")
+
+    async def _run(self, text: str, usage: Dict[str, int]) -> Any:
+        # Imported here: the prompts package reads the API settings at import, which main.py applies first
+        from prompts.token_usage import USAGE_SINK
+        USAGE_SINK.set(usage)
+        try:
+            result = await self.generate(text)
+            if result is SKIPPED:
+                self._skipped = self._closed = True
+            return result
+        finally:
+            if self._usage is usage:
+                self._finished_at = time.monotonic()
+
+    def _cancel(self):
+        task, usage = self._task, self._usage
+        self._task = None
+        task.cancel()
+        # The sink is filled in by the cancelled request's own handler, so read it once the task has unwound
+        task.add_done_callback(lambda _: _record(wasted_tokens=usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0)))
+
+    async def resolve(self, final: str) -> Optional[Any]:
+        """Returns the speculative result for the final transcript, or None if it has to be generated anew."""
+        self._closed = True
+        if self._skipped:
+            self._task = None
+            _record(skipped=1)
+            return None
+        if self._task is None:
+            return None
+        if normalize_transcript(final) != self._text:
+            _record(misses=1)
+            self._cancel()
+            print(f"Speculation missed; regenerating. {self.describe()}")
+            return None
+
+        task = self._task
+        self._task = None
+        resolved_at = time.monotonic()
+        try:
+            result = await task
+        except Exception:
+            result = None
+        if result is SKIPPED:
+            _record(skipped=1)
+            return None
+        if result is None:
+            _record(misses=1)
+            return None
+        # Latency hidden from the user: the part of generation that ran before the final transcript
+        finished_at = self._finished_at or resolved_at
+        _record(hits=1, saved_seconds=min(resolved_at, finished_at) - self._started_at)
+        print(f"Speculation hit. {self.describe()}")
+        return result
+
+    def discard(self):
+        """Drops any running speculation, e.g. when the recording is cancelled or empty."""
+        self._closed = True
+        if self._task is not None:
+            self._cancel()
+
+    @staticmethod
+    def describe() -> str:
+        stats = get_speculation_stats()
+        return (f"Hit rate {stats['hit_rate']:.0%} ({stats['hits']:.0f}/{stats['hits'] + stats['misses']:.0f}), "
+                f"{stats['superseded']:.0f} superseded, {stats['skipped']:.0f} skipped, "
+                f"{stats['wasted_tokens']:.0f} wasted tokens, "
+                f"{stats['saved_seconds']:.1f}s saved")
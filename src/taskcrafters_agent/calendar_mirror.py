@@ -0,0 +1,277 @@
+import bisect
+import datetime
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from google_services import CALENDAR_SCOPES, get_google_services
+from taskcrafters_agent.event_parser import resolve_timezone
+
+CALENDAR_MIRROR_PATH = os.getenv("CALENDAR_MIRROR") or os.path.join(os.path.expanduser("~"), ".taskcrafters",
+                                                                    "calendar.db")
+CALENDAR_MIRROR_ENABLED = os.getenv("CALENDAR_MIRROR_ENABLED", "1") != "0"
+# Seconds between incremental syncs in the background
+CALENDAR_SYNC_INTERVAL = float(os.getenv("CALENDAR_SYNC_INTERVAL", "120"))
+# A full sync fetches events from this many days back; incremental syncs then follow every change
+CALENDAR_SYNC_PAST_DAYS = 30
+CALENDAR_ID = 'primary'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    summary TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+# (start, end, summary, id); times are Unix seconds
+Interval = Tuple[float, float, str, str]
+
+
+def parse_event_time(value: str, timezone: Optional[str] = None) -> float:
+    """Unix seconds for an RFC 3339 date-time, a naive one in timezone (a zone or city name), or a date."""
+    moment = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    zone = zone_info(timezone)
+    if moment.tzinfo is None and zone:
+        moment = moment.replace(tzinfo=zone)
+    # Naive values (and all-day dates) are taken in local time
+    return moment.timestamp()
+
+
+def event_interval(event: Dict[str, Any]) -> Optional[Interval]:
+    """The busy interval of a Calendar API event, or None for cancelled and free (transparent) events."""
+    if event.get("status") == "cancelled" or event.get("transparency") == "transparent":
+        return None
+    start, end = event.get("start") or {}, event.get("end") or {}
+    try:
+        begins = parse_event_time(start.get("dateTime") or start["date"], start.get("timeZone"))
+        ends = parse_event_time(end.get("dateTime") or end["date"], end.get("timeZone"))
+    except (KeyError, ValueError):
+        return None
+    return begins, ends, event.get("summary") or "(no title)", event["id"]
+
+
+class IntervalIndex:
+    """
+    Immutable overlap index over event intervals.
+
+    Intervals are sorted by start next to a running maximum of their ends, so
+    an overlap query bisects to the last interval starting before the window
+    ends and walks back only while some earlier interval can still reach into
+    it. Replaced as a whole when the mirror changes, so readers need no lock.
+    """
+
+    def __init__(self, intervals: Iterable[Interval]):
+        self.intervals = sorted(intervals)
+        self.starts = [interval[0] for interval in self.intervals]
+        self.max_ends = []
+        reach = float("-inf")
+        for interval in self.intervals:
+            reach = max(reach, interval[1])
+            self.max_ends.append(reach)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, start: float, end: float) -> List[Interval]:
+        found = []
+        index = bisect.bisect_left(self.starts, end) - 1
+        while index >= 0 and self.max_ends[index] > start:
+            if self.intervals[index][1] > start:
+                found.append(self.intervals[index])
+            index -= 1
+        found.reverse()
+        return found
+
+
+class CalendarMirror:
+    """
+    Local copy of the primary calendar, for availability and conflict checks without an API call.
+
+    Events live in SQLite and, for queries, in an IntervalIndex. A background
+    thread syncs every CALENDAR_SYNC_INTERVAL seconds: the first sync fetches
+    everything from CALENDAR_SYNC_PAST_DAYS back, later ones only what changed
+    since the stored syncToken (a 410 from Google starts over with a full sync).
+    Events the app creates itself are added right away by record().
+    """
+
+    def __init__(self, db_path: str, interval: float = CALENDAR_SYNC_INTERVAL):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.interval = interval
+        self.stats = {"syncs": 0, "full_syncs": 0, "changes": 0, "failures": 0, "queries": 0}
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.index = IntervalIndex(self._conn.execute("SELECT start, end, summary, id FROM events"))
+
+    @property
+    def synced(self) -> bool:
+        """Whether the mirror has ever completed a sync, i.e. whether an empty answer means free."""
+        return self._meta("sync_token") is not None
+
+    def _meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _apply(self, events: Iterable[Dict[str, Any]], full: bool = False, sync_token: Optional[str] = None):
+        """Stores changed events (deleting cancelled ones) and rebuilds the index."""
+        with self._lock, self._conn:
+            if full:
+                self._conn.execute("DELETE FROM events")
+            count = 0
+            for event in events:
+                count += 1
+                interval = event_interval(event)
+                if interval is None:
+                    self._conn.execute("DELETE FROM events WHERE id = ?", (event["id"],))
+                else:
+                    self._conn.execute("INSERT OR REPLACE INTO events (start, end, summary, id) VALUES (?, ?, ?, ?)",
+                                       interval)
+            if sync_token:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('sync_token', ?)", (sync_token,))
+            self.stats["changes"] += count
+            self.index = IntervalIndex(self._conn.execute("SELECT start, end, summary, id FROM events"))
+
+    def record(self, event: Dict[str, Any]):
+        """Adds an event the app just created, ahead of the next sync."""
+        self._apply([event])
+
+    def _list_pages(self, service, **params):
+        page_token = None
+        while True:
+            response = service.events().list(calendarId=CALENDAR_ID, pageToken=page_token, **params).execute()
+            yield response
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return
+
+    def sync(self) -> Tuple[int, Optional[str]]:
+        """One sync; returns (events changed, error)."""
+        try:
+            from googleapiclient.errors import HttpError
+        except ImportError as e:
+            return 0, str(e)
+        services = get_google_services()
+        sync_token = self._meta("sync_token")
+        full = sync_token is None
+        try:
+            # Never starts the consent flow from the background; the first event created does
+            service = services.service('calendar', 'v3', CALENDAR_SCOPES, interactive=False)
+            if full:
+                since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=CALENDAR_SYNC_PAST_DAYS)
+                params = {"timeMin": since.isoformat(), "singleEvents": True, "maxResults": 2500}
+            else:
+                params = {"syncToken": sync_token, "singleEvents": True, "maxResults": 2500}
+            events, next_token = [], None
+            for page in self._list_pages(service, **params):
+                events.extend(page.get("items", []))
+                next_token = page.get("nextSyncToken") or next_token
+        except PermissionError:
+            return 0, None
+        except HttpError as e:
+            if e.resp.status == 410:
+                # The sync token expired; the next sync starts over
+                with self._lock, self._conn:
+                    self._conn.execute("DELETE FROM meta WHERE key = 'sync_token'")
+                return 0, "Sync token expired"
+            self.stats["failures"] += 1
+            return 0, str(e)
+        except Exception as e:
+            self.stats["failures"] += 1
+            return 0, str(e)
+        self._apply(events, full, next_token)
+        self.stats["syncs"] += 1
+        self.stats["full_syncs"] += full
+        return len(events), None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sync_loop, daemon=True, name="calendar-sync")
+                self._thread.start()
+
+    def _sync_loop(self):
+        while True:
+            changed, error = self.sync()
+            if error:
+                print(f"Calendar sync: {error}")
+            elif changed:
+                print(f"Calendar sync: {changed} events changed, {len(self.index)} mirrored")
+            if error == "Sync token expired":
+                continue
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def busy(self, start: float, end: float) -> List[Interval]:
+        """Events overlapping [start, end)."""
+        self.stats["queries"] += 1
+        return self.index.overlapping(start, end)
+
+    def free_slots(self, start: float, end: float, min_seconds: float = 15 * 60) -> List[Tuple[float, float]]:
+        """Gaps of at least min_seconds between the events in [start, end)."""
+        slots, cursor = [], start
+        for begins, ends, _, _ in self.busy(start, end):
+            if begins - cursor >= min_seconds:
+                slots.append((cursor, begins))
+            cursor = max(cursor, ends)
+        if end - cursor >= min_seconds:
+            slots.append((cursor, end))
+        return slots
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def format_span(start: float, end: float, zone: Optional[datetime.tzinfo] = None) -> str:
+    """The span in zone, or in local time without one."""
+    begins, ends = datetime.datetime.fromtimestamp(start, zone), datetime.datetime.fromtimestamp(end, zone)
+    until = ends.strftime("%H:%M") if begins.date() == ends.date() else ends.strftime("%a %d %b %H:%M")
+    return f"{begins.strftime('%a %d %b %H:%M')}-{until}"
+
+
+def format_interval(interval: Interval, zone: Optional[datetime.tzinfo] = None) -> str:
+    return f"'{interval[2]}' ({format_span(interval[0], interval[1], zone)})"
+
+
+def zone_info(timezone: Optional[str]) -> Optional[datetime.tzinfo]:
+    """The ZoneInfo for a zone or city name, or None (local time) if it cannot be resolved."""
+    zone = resolve_timezone(timezone) if timezone else None
+    if zone is None:
+        return None
+    from zoneinfo import ZoneInfo
+    return ZoneInfo(zone)
+
+
+_mirror_lock = threading.Lock()
+_mirror: Optional[CalendarMirror] = None
+
+
+def get_calendar_mirror() -> Optional[CalendarMirror]:
+    """The shared mirror, syncing in the background; None with CALENDAR_MIRROR_ENABLED=0 or if it cannot open."""
+    global _mirror
+    if not CALENDAR_MIRROR_ENABLED:
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            try:
+                _mirror = CalendarMirror(CALENDAR_MIRROR_PATH)
+            except sqlite3.Error as e:
+                print(f"Calendar mirror unavailable: {e}")
+                return None
+            _mirror.start()
+        return _mirror
@@ -1,31 +1,18 @@
-import os
-import datetime
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-import re
+from google_services import CALENDAR_SCOPES, get_google_services
+from ratelimit import get_limiter
+from taskcrafters_agent.calendar_mirror import (
+    format_interval, format_span, get_calendar_mirror, parse_event_time, zone_info
+)
+from taskcrafters_agent.event_parser import resolve_timezone
 
-SCOPES = ['https://www.googleapis.com/auth/calendar.events']
+# The Calendar API accepts at most this many calls in one batch request
+CALENDAR_BATCH_LIMIT = 50
 
-def create_google_calendar_event(title, description, start_time_str, end_time_str, timezone='UTC'):
-    creds = None
-
-    if os.path.exists('../../token.json'):
-        creds = Credentials.from_authorized_user_file('../../token.json', SCOPES)
-
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file('../../credentials.json', SCOPES)
-            creds = flow.run_local_server(port=8080)
-        with open('../../token.json', 'w') as token_file:
-            token_file.write(creds.to_json())
-
-    service = build('calendar', 'v3', credentials=creds)
 
-    event = {
+def _event_body(title, description, start_time_str, end_time_str, timezone):
+    # Google only accepts IANA zone names; a city from the location lookup is mapped to one
+    timezone = resolve_timezone(timezone) or timezone
+    return {
         'summary': title,
         'description': description,
         'start': {
@@ -38,6 +25,99 @@ def create_google_calendar_event(title, description, start_time_str, end_time_st
         },
     }
 
-    event_result = service.events().insert(calendarId='primary', body=event).execute()
-    return f"✅ Event created: {event_result.get('htmlLink')}"
 
+def _window(start_time_str, end_time_str, timezone):
+    return parse_event_time(start_time_str, timezone), parse_event_time(end_time_str, timezone)
+
+
+def conflict_warning(title, description, start_time_str, end_time_str, timezone='UTC'):
+    """Says which mirrored events the new one would overlap, or "" if none (or the mirror cannot tell)."""
+    mirror = get_calendar_mirror()
+    if mirror is None:
+        return ""
+    try:
+        overlapping = mirror.busy(*_window(start_time_str, end_time_str, timezone))
+    except ValueError:
+        return ""
+    if not overlapping:
+        return ""
+    zone = zone_info(timezone)
+    return " ⚠️ Overlaps " + ", ".join(format_interval(interval, zone) for interval in overlapping)
+
+
+def _record(event_result):
+    mirror = get_calendar_mirror()
+    if mirror is not None and event_result:
+        mirror.record(event_result)
+
+
+def create_google_calendar_event(title, description, start_time_str, end_time_str, timezone='UTC'):
+    service = get_google_services().service('calendar', 'v3', CALENDAR_SCOPES)
+    event = _event_body(title, description, start_time_str, end_time_str, timezone)
+    warning = conflict_warning(title, description, start_time_str, end_time_str, timezone)
+
+    with get_limiter("google_calendar").slot():
+        event_result = service.events().insert(calendarId='primary', body=event).execute()
+    _record(event_result)
+    return f"✅ Event created: {event_result.get('htmlLink')}{warning}"
+
+
+def insert_google_calendar_events(events):
+    """
+    Inserts (title, description, start, end, timezone) events through the batch endpoint.
+
+    Up to CALENDAR_BATCH_LIMIT events go in one HTTP request. Returns a
+    (created event, error) tuple per event, in the order given; one event
+    failing does not stop the others.
+    """
+    service = get_google_services().service('calendar', 'v3', CALENDAR_SCOPES)
+    results = [(None, None)] * len(events)
+
+    def collect(request_id, response, exception):
+        results[int(request_id)] = (response, str(exception) if exception else None)
+
+    for offset in range(0, len(events), CALENDAR_BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=collect)
+        for index, event in enumerate(events[offset:offset + CALENDAR_BATCH_LIMIT], offset):
+            batch.add(service.events().insert(calendarId='primary', body=_event_body(*event)), request_id=str(index))
+        try:
+            with get_limiter("google_calendar").slot():
+                batch.execute()
+        except Exception as e:
+            # The whole request failed, so none of this chunk was created
+            for index in range(offset, min(offset + CALENDAR_BATCH_LIMIT, len(events))):
+                results[index] = (None, str(e))
+    return results
+
+
+def create_google_calendar_events(events):
+    """One line per event: its link, or why it was not created."""
+    if len(events) == 1:
+        return create_google_calendar_event(*events[0])
+    # Checked against the calendar as it was before any of them is created
+    warnings = [conflict_warning(*event) for event in events]
+    lines = []
+    for event, warning, (created, error) in zip(events, warnings, insert_google_calendar_events(events)):
+        if error:
+            lines.append(f"❌ {event[0]}: {error}")
+        else:
+            _record(created)
+            lines.append(f"✅ Event created: {created.get('htmlLink')}{warning}")
+    return "\n".join(lines)
+
+
+def describe_availability(start_time_str, end_time_str, timezone='UTC'):
+    """Free/busy for a time window, answered from the calendar mirror in the window's own time zone."""
+    mirror = get_calendar_mirror()
+    if mirror is None or not mirror.synced:
+        return "The calendar has not been synced yet, so availability is unknown."
+    start, end = _window(start_time_str, end_time_str, timezone)
+    overlapping = mirror.busy(start, end)
+    if not overlapping:
+        return "Free for the whole time."
+    free = mirror.free_slots(start, end)
+    zone = zone_info(timezone)
+    answer = "Busy: " + ", ".join(format_interval(interval, zone) for interval in overlapping) + "."
+    if free:
+        answer += " Free: " + ", ".join(format_span(begins, ends, zone) for begins, ends in free) + "."
+    return answer
@@ -0,0 +1,361 @@
+import datetime
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Events without a stated end or duration last this long
+DEFAULT_DURATION = datetime.timedelta(hours=1)
+# Hours for "morning", "afternoon" and the like when no clock time is given
+DAY_PARTS = {"morning": 9, "lunch": 12, "lunchtime": 12, "afternoon": 14, "evening": 18, "tonight": 20}
+
+# Place and abbreviation -> IANA zone, for names the tz database does not carry itself
+# (its own city names, like "casablanca" or "new york", are found from the zone list)
+ZONE_ALIASES = {
+    "utc": "UTC", "gmt": "Europe/London", "bst": "Europe/London", "cet": "Europe/Paris", "cest": "Europe/Paris",
+    "est": "America/New_York", "edt": "America/New_York", "cst": "America/Chicago", "cdt": "America/Chicago",
+    "mst": "America/Denver", "mdt": "America/Denver", "pst": "America/Los_Angeles", "pdt": "America/Los_Angeles",
+    "ist": "Asia/Kolkata", "jst": "Asia/Tokyo", "eastern": "America/New_York", "central": "America/Chicago",
+    "mountain": "America/Denver", "pacific": "America/Los_Angeles",
+    "rabat": "Africa/Casablanca", "marrakech": "Africa/Casablanca", "marrakesh": "Africa/Casablanca",
+    "tangier": "Africa/Casablanca", "fes": "Africa/Casablanca", "agadir": "Africa/Casablanca",
+    "san francisco": "America/Los_Angeles", "seattle": "America/Los_Angeles", "boston": "America/New_York",
+    "washington": "America/New_York", "miami": "America/New_York", "atlanta": "America/New_York",
+    "dallas": "America/Chicago", "houston": "America/Chicago", "austin": "America/Chicago",
+    "montreal": "America/Toronto", "ottawa": "America/Toronto", "barcelona": "Europe/Madrid",
+    "munich": "Europe/Berlin", "frankfurt": "Europe/Berlin", "hamburg": "Europe/Berlin", "milan": "Europe/Rome",
+    "geneva": "Europe/Zurich", "lyon": "Europe/Paris", "manchester": "Europe/London", "edinburgh": "Europe/London",
+    "mumbai": "Asia/Kolkata", "delhi": "Asia/Kolkata", "new delhi": "Asia/Kolkata", "bangalore": "Asia/Kolkata",
+    "bengaluru": "Asia/Kolkata", "beijing": "Asia/Shanghai", "abu dhabi": "Asia/Dubai", "kyoto": "Asia/Tokyo",
+}
+# Country code (as ipinfo reports it) -> zone, for countries with one zone
+COUNTRY_ZONES = {
+    "MA": "Africa/Casablanca", "FR": "Europe/Paris", "DE": "Europe/Berlin", "ES": "Europe/Madrid",
+    "IT": "Europe/Rome", "GB": "Europe/London", "IE": "Europe/Dublin", "NL": "Europe/Amsterdam",
+    "BE": "Europe/Brussels", "CH": "Europe/Zurich", "PT": "Europe/Lisbon", "IN": "Asia/Kolkata",
+    "JP": "Asia/Tokyo", "CN": "Asia/Shanghai", "AE": "Asia/Dubai", "EG": "Africa/Cairo", "TN": "Africa/Tunis",
+    "DZ": "Africa/Algiers", "SA": "Asia/Riyadh", "TR": "Europe/Istanbul", "SG": "Asia/Singapore",
+}
+
+_WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_WEEKDAY_RE = r"(mon(?:day)?|tue(?:s|sday)?|wed(?:nesday)?|thu(?:r|rs|rsday)?|fri(?:day)?|sat(?:urday)?|sun(?:day)?)"
+_MONTHS = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+_MONTH_RE = r"(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|sep(?:t(?:ember)?)?" \
+            r"|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)"
+_NUMBER_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6}
+_CLOCK = r"(\d{1,2})(?::(\d{2}))?\s*([ap]\.?m\.?)?"
+
+_FLAGS = re.IGNORECASE
+_DATE_PATTERNS = [
+    ("iso", re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")),
+    ("relative", re.compile(r"\b(day after tomorrow|today|tonight|tomorrow)\b", _FLAGS)),
+    ("in_days", re.compile(r"\bin\s+(\d+|an?|one|two|three|four|five|six)\s+(days?|weeks?)\b", _FLAGS)),
+    ("day_month", re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH_RE}\b(?:,?\s+(\d{{4}}))?", _FLAGS)),
+    ("month_day", re.compile(rf"\b{_MONTH_RE}\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(\d{{4}}))?", _FLAGS)),
+    ("weekday", re.compile(rf"\b(?:(?:on|this|next|coming)\s+)*{_WEEKDAY_RE}\b", _FLAGS)),
+]
+_RANGE_RE = re.compile(rf"\b(?:from|between)?\s*{_CLOCK}\s*(?:-|–|to|until|till|and)\s*{_CLOCK}(?![\d:])", _FLAGS)
+_TIME_RE = re.compile(rf"(?:\b(at|@)\s*{_CLOCK}(?![\d:]))|(?:\b(\d{{1,2}})(?::(\d{{2}}))?\s*([ap]\.?m\.?)(?!\w))"
+                      rf"|(?:\b(\d{{1,2}}):(\d{{2}})\b)", _FLAGS)
+_MEAL_PARTS = {"lunch", "lunchtime"}
+_NAMED_TIME_RE = re.compile(r"\b(?:at\s+)?(noon|midday|midnight)\b", _FLAGS)
+_DAY_PART_RE = re.compile(r"\b(?:in\s+the\s+|this\s+|at\s+)?(morning|lunchtime|lunch|afternoon|evening|tonight)\b",
+                          _FLAGS)
+# Dates no rule above reads ("11/05", "5.11.", "the 5th", an impossible ISO date); left to the LLM
+_UNREAD_DATE_RE = re.compile(r"\b\d{1,2}[/.]\d{1,2}\b|\b\d{1,2}(?:st|nd|rd|th)\b|\b\d{4}-\d{1,2}-\d{1,2}\b", _FLAGS)
+_DURATION_RE = re.compile(
+    r"\b(?:for\s+)?(?:(half\s+an?\s+hour)|(an?\s+hour\s+and\s+a\s+half)"
+    r"|(\d+(?:\.\d+)?|an?|one|two|three|four|five|six)\s*-?\s*(hours?|hrs?|h|minutes?|mins?))\b", _FLAGS)
+_ZONE_RE = re.compile(r"\b[A-Za-z]+/[A-Za-z_]+(?:/[A-Za-z_]+)?\b|\b(?:UTC|GMT|EST|EDT|CST|CDT|MST|MDT|PST|PDT|CET|CEST|BST"
+                      r"|IST|JST)\b")
+# "Paris time", "in New York time": up to three words before "time"
+_ZONE_PLACE_RE = re.compile(r"(?:\bin\s+)?((?:[A-Za-z]+\s+){1,3})$", _FLAGS)
+# Repeating events, or dates the parser has no rule for; left to the LLM
+_UNSUPPORTED_RE = re.compile(r"\b(every|each|daily|weekly|monthly|recurring|next\s+(?:week|month|year)|weekend"
+                             r"|end\s+of|beginning\s+of|fortnight|in\s+\d+\s+(?:hours?|minutes?))\b", _FLAGS)
+_COMMAND_RE = re.compile(r"^(?:(?:please|can\s+you|could\s+you|i\s+want\s+to|i'd\s+like\s+to|let's)\s+)*"
+                         r"(?:schedule|create|add|set\s+up|setup|book|put|plan|organi[sz]e|arrange|make|insert)\b\s*",
+                         _FLAGS)
+_CALENDAR_WORDS_RE = re.compile(r"\b(?:on|to|in|into)\s+(?:my|the|our)\s+(?:google\s+)?calendar\b", _FLAGS)
+_ARTICLE_RE = re.compile(r"^(?:a|an|the|my|new)\s+", _FLAGS)
+_EVENT_NOUN_RE = re.compile(r"^(?:calendar\s+)?(?:event|entry|appointment|meeting|slot)\s+(?:for|called|named|titled|about)"
+                            r"\s+", _FLAGS)
+_EDGE_WORDS_RE = re.compile(r"^(?:on|at|for|from|in|this|next|the|by|and|,|-)\s+|\s+(?:on|at|for|from|in|this|next|the|"
+                            r"by|and|to|with|,|-)$", _FLAGS)
+
+EVENT_PARSE_STATS = {"attempts": 0, "parsed": 0, "parse_seconds": 0.0, "saved_seconds": 0.0}
+_stats_lock = threading.Lock()
+_zone_names: Optional[Dict[str, str]] = None
+
+
+def _zone_index() -> Dict[str, str]:
+    """Lowercase IANA names and their city parts ("new york") -> zone, built once."""
+    global _zone_names
+    if _zone_names is None:
+        from zoneinfo import available_timezones
+        names = {}
+        for zone in sorted(available_timezones()):
+            names[zone.lower()] = zone
+            if "/" in zone and not zone.startswith("Etc/"):
+                names.setdefault(zone.rsplit("/", 1)[1].replace("_", " ").lower(), zone)
+        _zone_names = names
+    return _zone_names
+
+
+def resolve_timezone(name: Optional[str], country: Optional[str] = None) -> Optional[str]:
+    """The IANA zone for a zone name, city, abbreviation or (failing those) country code; None if unknown."""
+    key = re.sub(r"\s+", " ", (name or "").strip().lower())
+    zone = ZONE_ALIASES.get(key) or (_zone_index().get(key) if key else None)
+    if zone is None and country:
+        zone = COUNTRY_ZONES.get(country.strip().upper())
+    return zone
+
+
+def _hour(hour: int, minute: int, meridiem: Optional[str], evening: bool = False) -> Optional[Tuple[int, int]]:
+    if minute > 59 or hour > 23:
+        return None
+    if meridiem:
+        if hour > 12 or hour == 0:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower().startswith("p") else 0)
+    elif hour < 12 and (evening or hour <= 6):
+        # A bare "at 3" is a working-hours meeting, not 3 in the morning; "at 8 tonight" is 20:00
+        hour += 12
+    return hour, minute
+
+
+def _count(word: str) -> float:
+    return float(_NUMBER_WORDS.get(word.lower(), 0) or word)
+
+
+def _find_date(text: str, today: datetime.date, spans: List[Tuple[int, int]]) -> Tuple[Optional[datetime.date], int]:
+    """The one date the text mentions and how many it mentions."""
+    found = []
+    for kind, pattern in _DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            if any(start < match.end() and match.start() < end for start, end in spans):
+                continue
+            date = None
+            if kind == "iso":
+                try:
+                    date = datetime.date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+                except ValueError:
+                    continue
+            elif kind == "relative":
+                offset = {"today": 0, "tonight": 0, "tomorrow": 1, "day after tomorrow": 2}[match.group(1).lower()]
+                date = today + datetime.timedelta(days=offset)
+            elif kind == "in_days":
+                days = _count(match.group(1)) * (7 if match.group(2).lower().startswith("week") else 1)
+                date = today + datetime.timedelta(days=int(days))
+            elif kind in ("day_month", "month_day"):
+                day, month = (match.group(1), match.group(2)) if kind == "day_month" else (match.group(2), match.group(1))
+                month_number = _MONTHS.index(month.lower()[:3]) + 1
+                year = int(match.group(3)) if match.group(3) else today.year
+                try:
+                    date = datetime.date(year, month_number, int(day))
+                except ValueError:
+                    continue
+                if not match.group(3) and date < today:
+                    date = date.replace(year=year + 1)
+            elif kind == "weekday":
+                weekday = next(i for i, name in enumerate(_WEEKDAYS) if name.startswith(match.group(1).lower()[:3]))
+                # "friday", "this friday" and "next friday" all mean the coming one
+                date = today + datetime.timedelta(days=(weekday - today.weekday()) % 7 or 7)
+            spans.append(match.span())
+            found.append(date)
+    if not found:
+        return None, 0
+    return found[0], len(set(found))
+
+
+def _find_times(text: str, spans: List[Tuple[int, int]]):
+    """(start, end or None, how many separate times were mentioned); times are (hour, minute)."""
+    part = _DAY_PART_RE.search(text)
+    evening = bool(part) and DAY_PARTS[part.group(1).lower()] >= 18
+    for match in _RANGE_RE.finditer(text):
+        first_meridiem, second_meridiem = match.group(3), match.group(6)
+        has_marker = first_meridiem or second_meridiem or match.group(2) or match.group(5) \
+            or re.match(r"\s*(?:from|between)", match.group(0), _FLAGS) or evening
+        if has_marker:
+            end = _hour(int(match.group(4)), int(match.group(5) or 0), second_meridiem, evening)
+            start = _hour(int(match.group(1)), int(match.group(2) or 0), first_meridiem or second_meridiem, evening)
+            if start and end and start >= end and not first_meridiem and second_meridiem:
+                # "11-1pm": the start is in the morning
+                start = _hour(int(match.group(1)), int(match.group(2) or 0), "am")
+            if start and end and start < end:
+                spans.append(match.span())
+                _keep_day_part(part, spans)
+                return start, end, 1
+    times = []
+    for match in _TIME_RE.finditer(text):
+        groups = match.groups()
+        if groups[1] is not None:
+            parsed = _hour(int(groups[1]), int(groups[2] or 0), groups[3], evening)
+        elif groups[4] is not None:
+            parsed = _hour(int(groups[4]), int(groups[5] or 0), groups[6], evening)
+        elif groups[7].startswith("0"):
+            # "09:30" is a 24-hour clock time as written
+            parsed = (int(groups[7]), int(groups[8])) if int(groups[8]) < 60 else None
+        else:
+            parsed = _hour(int(groups[7]), int(groups[8]), None, evening)
+        if parsed:
+            spans.append(match.span())
+            times.append(parsed)
+    for match in _NAMED_TIME_RE.finditer(text):
+        spans.append(match.span())
+        times.append((0, 0) if match.group(1).lower() == "midnight" else (12, 0))
+    if not times and part:
+        if _qualifies_time(part):
+            spans.append(part.span())
+        times.append((DAY_PARTS[part.group(1).lower()], 0))
+    elif times:
+        _keep_day_part(part, spans)
+    if not times:
+        return None, None, 0
+    return times[0], None, len(set(times))
+
+
+def _qualifies_time(part) -> bool:
+    """Whether a day part only says when; a bare meal ("lunch with Bob") also names the event."""
+    return part.group(1).lower() not in _MEAL_PARTS or part.group(0).lower() != part.group(1).lower()
+
+
+def _keep_day_part(part, spans: List[Tuple[int, int]]):
+    """Takes "in the evening" next to a clock time out of the title; "tonight" is left for the date."""
+    if part and part.group(1).lower() != "tonight" and _qualifies_time(part):
+        spans.append(part.span())
+
+
+def _find_duration(text: str, spans: List[Tuple[int, int]]) -> Optional[datetime.timedelta]:
+    for match in _DURATION_RE.finditer(text):
+        if any(start < match.end() and match.start() < end for start, end in spans):
+            continue
+        if match.group(1):
+            minutes = 30.0
+        elif match.group(2):
+            minutes = 90.0
+        else:
+            amount = _count(match.group(3))
+            minutes = amount * (60 if match.group(4).lower().startswith("h") else 1)
+        if 0 < minutes <= 24 * 60:
+            spans.append(match.span())
+            return datetime.timedelta(minutes=minutes)
+    return None
+
+
+def _find_zone(text: str, spans: List[Tuple[int, int]]) -> Optional[str]:
+    for match in _ZONE_RE.finditer(text):
+        zone = resolve_timezone(match.group(0))
+        if zone:
+            spans.append(match.span())
+            return zone
+    for match in re.finditer(r"\btime\b", text, _FLAGS):
+        place = _ZONE_PLACE_RE.search(text[:match.start()])
+        if not place:
+            continue
+        words = place.group(1).split()
+        # Longest place name first: "new york" before "york"
+        for count in range(len(words), 0, -1):
+            zone = resolve_timezone(" ".join(words[-count:]))
+            if zone:
+                start = place.start() if count == len(words) else match.start() - len(" ".join(words[-count:])) - 1
+                spans.append((start, match.end()))
+                return zone
+    return None
+
+
+def _unread(text: str, spans: List[Tuple[int, int]]) -> str:
+    """The text with every parsed span blanked out."""
+    for start, end in spans:
+        text = text[:start] + " " * (end - start) + text[end:]
+    return text
+
+
+def _title(text: str, spans: List[Tuple[int, int]]) -> str:
+    kept, cursor = [], 0
+    for start, end in sorted(spans):
+        if start >= cursor:
+            kept.append(text[cursor:start])
+            cursor = end
+        else:
+            cursor = max(cursor, end)
+    kept.append(text[cursor:])
+    title = re.sub(r"\s+", " ", " ".join(kept))
+    title = _CALENDAR_WORDS_RE.sub(" ", re.sub(r"\(\s*\)", " ", title))
+    title = re.sub(r"\s+", " ", title).strip(" ,.;:!?-")
+    title = _COMMAND_RE.sub("", title)
+    title = _ARTICLE_RE.sub("", title)
+    title = _EVENT_NOUN_RE.sub("", title)
+    previous = None
+    while previous != title:
+        previous = title
+        title = _EDGE_WORDS_RE.sub("", title).strip(" ,.;:!?-")
+    return title[:1].upper() + title[1:] if title else "Event"
+
+
+def parse_event(instruction: str, timezone: Optional[str] = None, now: Optional[datetime.datetime] = None,
+                record: bool = True) -> Optional[Tuple[str, str, str, str, str]]:
+    """
+    (title, description, start, end, timezone) for a one-event instruction, or None to leave it to the LLM.
+
+    Understands dates like "tomorrow", "friday", "in 3 days", "March 5th" and
+    "2026-03-05"; times like "at 3", "3:30pm", "15:00", "noon", "3-4pm" and
+    "afternoon"; durations like "for 45 minutes"; and zones like "Paris time",
+    "(EST)" or "Europe/Paris", falling back to timezone (an IANA name, city or
+    abbreviation). Repeating events, several events, instructions without a
+    time, and dates in other forms ("11/05", "the 5th") are not handled. Start and end come back as YYYY-MM-DDTHH:MM:SS in
+    the resolved zone, which is returned as an IANA name. record=False leaves
+    the coverage stats alone, for callers that only peek.
+    """
+    started = time.perf_counter()
+    result = None
+    try:
+        result = _parse_event(instruction, timezone, now)
+        return result
+    finally:
+        if record:
+            with _stats_lock:
+                EVENT_PARSE_STATS["attempts"] += 1
+                EVENT_PARSE_STATS["parsed"] += result is not None
+                EVENT_PARSE_STATS["parse_seconds"] += time.perf_counter() - started
+
+
+def _parse_event(instruction, timezone, now):
+    text = instruction.strip()
+    if not text or _UNSUPPORTED_RE.search(text):
+        return None
+    spans: List[Tuple[int, int]] = []
+    zone = _find_zone(text, spans) or resolve_timezone(timezone) or "UTC"
+    from zoneinfo import ZoneInfo
+    now = (now or datetime.datetime.now(ZoneInfo(zone))).astimezone(ZoneInfo(zone))
+    start_time, end_time, time_count = _find_times(text, spans)
+    date, date_count = _find_date(text, now.date(), spans)
+    if start_time is None or time_count > 1 or date_count > 1:
+        return None
+    if date is None:
+        # A time alone means the next time it comes round
+        date = now.date()
+        if (start_time[0], start_time[1]) <= (now.hour, now.minute):
+            date += datetime.timedelta(days=1)
+    start = datetime.datetime.combine(date, datetime.time(*start_time))
+    if end_time is not None:
+        end = datetime.datetime.combine(date, datetime.time(*end_time))
+    else:
+        end = start + (_find_duration(text, spans) or DEFAULT_DURATION)
+    if _UNREAD_DATE_RE.search(_unread(text, spans)):
+        # A date the rules did not read would otherwise be booked as today
+        return None
+    return _title(text, spans), instruction.strip(), start.isoformat(), end.isoformat(), zone
+
+
+def record_saving(seconds: float):
+    """Adds the time a local parse saved (the LLM refinement it replaced) to the stats."""
+    with _stats_lock:
+        EVENT_PARSE_STATS["saved_seconds"] += seconds
+
+
+def get_event_parse_stats() -> Dict[str, float]:
+    with _stats_lock:
+        stats = dict(EVENT_PARSE_STATS)
+    stats["coverage"] = stats["parsed"] / stats["attempts"] if stats["attempts"] else 0.0
+    return stats
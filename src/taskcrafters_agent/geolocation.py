@@ -0,0 +1,246 @@
+import bisect
+import csv
+import ipaddress
+import json
+import mmap
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# Where the last resolved location is kept between runs, and how long it is trusted
+LOCATION_CACHE_PATH = os.getenv("LOCATION_CACHE") or os.path.join(os.path.expanduser("~"), ".taskcrafters",
+                                                                  "location.json")
+LOCATION_TTL = float(os.getenv("LOCATION_TTL", str(6 * 60 * 60)))
+# How often the background thread checks whether the machine moved to another network
+LOCATION_POLL = float(os.getenv("LOCATION_POLL", "60"))
+# Optional IPv4 range database built by build_ip_db(); resolves the public IP without ipinfo
+GEOIP_DB_PATH = os.getenv("GEOIP_DB", "")
+
+UNKNOWN_LOCATION = {"city": "Unknown", "region": "Unknown", "country": "Unknown"}
+
+# File layout: header (magic, record count), then records sorted by start address
+# (start, end, offset of the location in the string table), then the string
+# table of length-prefixed "city\tregion\tcountry" entries
+_MAGIC = b"TGEO"
+_HEADER = struct.Struct("<4sI")
+_RECORD = struct.Struct("<III")
+_LENGTH = struct.Struct("<H")
+
+
+def build_ip_db(rows: Iterable[Tuple[str, str, str, str, str]], path: str) -> int:
+    """
+    Writes a range database from (start ip, end ip, city, region, country) rows; returns the range count.
+
+    IPv6 rows are skipped. Locations are stored once however many ranges share them.
+    """
+    ranges, offsets, strings = [], {}, bytearray()
+    for start, end, city, region, country in rows:
+        if ":" in start:
+            continue
+        key = f"{city}\t{region}\t{country}".encode("utf-8")
+        if key not in offsets:
+            offsets[key] = len(strings)
+            strings += _LENGTH.pack(len(key)) + key
+        ranges.append((int(ipaddress.IPv4Address(start)), int(ipaddress.IPv4Address(end)), offsets[key]))
+    ranges.sort()
+    table_start = _HEADER.size + _RECORD.size * len(ranges)
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(ranges)))
+        for start, end, offset in ranges:
+            f.write(_RECORD.pack(start, end, table_start + offset))
+        f.write(strings)
+    return len(ranges)
+
+
+def read_dbip_csv(path: str) -> Iterable[Tuple[str, str, str, str, str]]:
+    """Rows of a DB-IP "IP to City Lite" CSV (start, end, continent, country, region, city, ...)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if len(row) >= 6:
+                yield row[0], row[1], row[5], row[4], row[3]
+
+
+class IPRangeDB:
+    """
+    Read-only lookup of an IPv4 address in a range database written by build_ip_db().
+
+    The file is memory-mapped, so opening it reads nothing and only the pages a
+    binary search touches are loaded.
+    """
+
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not an IP range database")
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index: int) -> int:
+        # Start address of a record, which is all bisect needs
+        return _RECORD.unpack_from(self._map, _HEADER.size + _RECORD.size * index)[0]
+
+    def lookup(self, ip_address: str) -> Optional[Dict[str, str]]:
+        try:
+            address = int(ipaddress.IPv4Address(ip_address))
+        except ValueError:
+            return None
+        index = bisect.bisect_right(self, address) - 1
+        if index < 0:
+            return None
+        _, end, offset = _RECORD.unpack_from(self._map, _HEADER.size + _RECORD.size * index)
+        if address > end:
+            return None
+        length = _LENGTH.unpack_from(self._map, offset)[0]
+        start = offset + _LENGTH.size
+        city, region, country = self._map[start:start + length].decode("utf-8").split("\t")
+        return {"city": city, "region": region, "country": country}
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+_db_lock = threading.Lock()
+_db: Optional[IPRangeDB] = None
+_db_failed = False
+
+
+def get_ip_db() -> Optional[IPRangeDB]:
+    """The GEOIP_DB database, or None when it is not configured or cannot be read."""
+    global _db, _db_failed
+    if not GEOIP_DB_PATH:
+        return None
+    with _db_lock:
+        if _db is None and not _db_failed:
+            try:
+                _db = IPRangeDB(GEOIP_DB_PATH)
+            except (OSError, ValueError) as e:
+                _db_failed = True
+                print(f"IP range database unavailable, using ipinfo: {e}")
+        return _db
+
+
+def network_fingerprint() -> Optional[str]:
+    """
+    The local address the default route uses, which changes when the machine changes network.
+
+    Connecting a UDP socket sends nothing; it only picks the route. None when offline.
+    """
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("192.0.2.1", 9))
+            return s.getsockname()[0]
+    except OSError:
+        return None
+
+
+class LocationResolver:
+    """
+    The user's location without waiting on the network.
+
+    get() answers from memory: the last location resolved (kept in
+    LOCATION_CACHE_PATH across runs), even past LOCATION_TTL. A background thread
+    resolves it again when it is older than that or when network_fingerprint()
+    changes, and keeps the old answer if the network is down. With an IP range
+    database, the public IP is located locally instead of through ipinfo.
+    """
+
+    def __init__(self, get_ip: Callable[[], str], locate: Callable[[str], Dict[str, str]],
+                 cache_path: str = LOCATION_CACHE_PATH, ttl: float = LOCATION_TTL, poll: float = LOCATION_POLL):
+        self.get_ip = get_ip
+        self.locate = locate
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.poll = poll
+        self.stats = {"lookups": 0, "unknown": 0, "refreshes": 0, "network_changes": 0, "failures": 0}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._attempted = 0.0
+        self._state = self._load()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                state = json.load(f)
+            if isinstance(state.get("location"), dict):
+                return state
+        except (OSError, ValueError):
+            pass
+        return {}
+
+    def _save(self, state: Dict):
+        try:
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.cache_path, "w", encoding="utf-8") as f:
+                json.dump(state, f)
+        except OSError as e:
+            print(f"Could not save the location cache: {e}")
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, daemon=True, name="location")
+                self._thread.start()
+
+    def get(self) -> Dict[str, str]:
+        """The cached location, or UNKNOWN_LOCATION before the first resolution finishes."""
+        self.start()
+        with self._lock:
+            self.stats["lookups"] += 1
+            state = self._state
+            if not state or time.time() - state.get("resolved", 0) > self.ttl:
+                self._wake.set()
+            if not state:
+                self.stats["unknown"] += 1
+                return dict(UNKNOWN_LOCATION)
+            return dict(state["location"])
+
+    def refresh(self, network: Optional[str] = None) -> bool:
+        """Resolves the location now; returns False, keeping the old one, if that failed."""
+        ip_address = self.get_ip()
+        if not ip_address or ip_address == "Unknown":
+            with self._lock:
+                self.stats["failures"] += 1
+            return False
+        db = get_ip_db()
+        location = (db.lookup(ip_address) if db else None) or self.locate(ip_address)
+        if not location or location == UNKNOWN_LOCATION:
+            with self._lock:
+                self.stats["failures"] += 1
+            return False
+        state = {"ip": ip_address, "location": location, "resolved": time.time(), "network": network}
+        with self._lock:
+            self._state = state
+            self.stats["refreshes"] += 1
+        self._save(state)
+        return True
+
+    def _watch(self):
+        while True:
+            network = network_fingerprint()
+            with self._lock:
+                state = self._state
+            now = time.time()
+            moved = bool(state) and network is not None and network != state.get("network")
+            # An expired location is retried at most once per poll, so a dead ipify is not hammered
+            expired = (not state or now - state.get("resolved", 0) > self.ttl) and now - self._attempted >= self.poll
+            if network is not None and (moved or expired):
+                self._attempted = now
+                if moved:
+                    with self._lock:
+                        self.stats["network_changes"] += 1
+                try:
+                    self.refresh(network)
+                except Exception as e:
+                    print(f"Location refresh failed, keeping the last one: {e}")
+            self._wake.wait(self.poll)
+            self._wake.clear()
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+import ledger
+
+
+class LedgerCallback(BaseCallbackHandler):
+    """Writes every agent LLM call to the ledger; the mode comes from the "ledger_mode" run metadata."""
+
+    def __init__(self, model):
+        self.model = model
+        self.runs = {}
+        self.lock = threading.Lock()
+
+    def _start(self, run_id, metadata, text):
+        with self.lock:
+            self.runs[run_id] = {"mode": (metadata or {}).get("ledger_mode", "agent"), "start": time.monotonic(),
+                                 "ttft": None, "prompt": text, "completion": []}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata, " ".join(str(m.content) for batch in messages for m in batch))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, metadata, " ".join(prompts))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self.runs.get(run_id)
+        if run is not None:
+            if run["ttft"] is None and token:
+                run["ttft"] = time.monotonic() - run["start"]
+            run["completion"].append(token)
+
+    def _finish(self, run_id, usage=None, error=None):
+        with self.lock:
+            run = self.runs.pop(run_id, None)
+        if run is None:
+            return
+        usage = usage or {}
+        ledger.record(run["mode"], "agent", "nebius", self.model,
+                      usage.get("prompt_tokens") or len(run["prompt"]) // 4 + 1,
+                      usage.get("completion_tokens") or len("".join(run["completion"])) // 4,
+                      time.monotonic() - run["start"], run["ttft"], error=error)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, (response.llm_output or {}).get("token_usage"))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=error)
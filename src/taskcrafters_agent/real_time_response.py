@@ -1,66 +1,102 @@
 import os
-import requests
-from langchain_community.chat_models import ChatOpenAI
-from langchain.agents import initialize_agent, Tool, AgentType
-from langchain_community.tools import TavilySearchResults
 from dotenv import load_dotenv
-from langchain_community.tools import WikipediaQueryRun
-from langchain_community.utilities import WikipediaAPIWrapper
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain_community.tools import YouTubeSearchTool
 import re
 import datetime
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ratelimit import get_limiter, limited, request_with_limits
+from singleflight import SingleFlight, normalize_text, request_key
+from tool_cache import cached
+from taskcrafters_agent.calendar_mirror import get_calendar_mirror
+from taskcrafters_agent.calendar_tool import create_google_calendar_events, describe_availability
+from taskcrafters_agent.event_parser import parse_event, record_saving, resolve_timezone
+from taskcrafters_agent.geolocation import LocationResolver, get_ip_db
 
 
 load_dotenv()
 
-llm = ChatOpenAI(
-    model=os.environ.get("MODEL"),
-    openai_api_base= os.environ.get("NEBIUS_BASE_URL"),
-    openai_api_key=os.environ.get("NEBIUS_API_KEY"),
-    temperature=0.2,
-    streaming=True 
-)
+# Repeated questions (the user saying it twice, a re-sent job) share one agent run,
+# LLM call or search while it is in flight, and reuse its answer for this many seconds
+TOOL_REUSE_TTL = float(os.getenv("TOOL_REUSE_TTL", "60"))
+response_flight = SingleFlight("taskcrafters", TOOL_REUSE_TTL)
+# Calendar instructions create events, so an answer is never reused; only identical runs in flight are shared
+calendar_flight = SingleFlight("taskcrafters_calendar")
+llm_flight = SingleFlight("agent_llm", TOOL_REUSE_TTL)
+tool_flight = SingleFlight("tools", TOOL_REUSE_TTL)
 
-SCOPES = ['https://www.googleapis.com/auth/calendar.events']
+# Seconds an answer should take; optional stages are fused or dropped to fit
+TASKCRAFTERS_BUDGET = float(os.getenv("TASKCRAFTERS_BUDGET", "15"))
+# "auto" picks the richest plan that fits the budget; a plan name forces it
+TASKCRAFTERS_PLAN = os.getenv("TASKCRAFTERS_PLAN", "auto")
 
-def create_google_calendar_event(title, description, start_time_str, end_time_str, timezone='UTC'):
-    creds = None
+# refine: rewrite the instruction into a query before the agent (calendar
+# instructions always are, the tool needs the exact format); finish: what
+# happens to the agent's answer. "concurrent" structures the raw answer while
+# it is validated and only structures again if validation rewrote it, so it
+# returns what "sequential" would.
+PLANS = {
+    "sequential": {"refine": True, "finish": "sequential"},
+    "concurrent": {"refine": True, "finish": "concurrent"},
+    "fused": {"refine": True, "finish": "fused"},
+    "fast": {"refine": False, "finish": "fused"},
+    "direct": {"refine": False, "finish": None},
+}
+AUTO_PLANS = ("concurrent", "fused", "fast", "direct")
 
-    if os.path.exists('../token.json'):
-        creds = Credentials.from_authorized_user_file('../token.json', SCOPES)
+# Seconds per stage, starting guesses replaced by an EWMA of real timings
+STAGE_ESTIMATES = {"location": 0.0, "refine": 1.5, "agent": 8.0, "validate": 1.5, "structure": 1.5, "fused": 2.0}
+STAGE_EWMA_ALPHA = 0.3
+STAGE_BY_MODE = {"agent_refine": "refine", "agent_validate": "validate", "agent_structure": "structure",
+                 "agent_finish": "fused"}
+_stage_lock = threading.Lock()
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            flow = InstalledAppFlow.from_client_secrets_file('../credentials.json', SCOPES)
-            creds = flow.run_local_server(port=8080)
-        with open('../token.json', 'w') as token_file:
-            token_file.write(creds.to_json())
-
-    service = build('calendar', 'v3', credentials=creds)
-
-    event = {
-        'summary': title,
-        'description': description,
-        'start': {
-            'dateTime': start_time_str,
-            'timeZone': timezone,
-        },
-        'end': {
-            'dateTime': end_time_str,
-            'timeZone': timezone,
-        },
-    }
-
-    event_result = service.events().insert(calendarId='primary', body=event).execute()
-    return f"✅ Event created: {event_result.get('htmlLink')}"
+_finish_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="taskcrafters")
+
+# LangChain, the search tools and the Google client take seconds to import, so
+# the LLM, the tools and the agent are built on first use (or by warm_up())
+# rather than when the app starts
+_registry_lock = threading.RLock()
+_llm = None
+_tool_funcs = {}
+_tools = {}
+_agents = {}
+
+def get_llm():
+    global _llm
+    with _registry_lock:
+        if _llm is None:
+            from langchain_community.chat_models import ChatOpenAI
+            from .ledger_callback import LedgerCallback
+
+            _llm = ChatOpenAI(
+                model=os.environ.get("MODEL"),
+                openai_api_base= os.environ.get("NEBIUS_BASE_URL"),
+                openai_api_key=os.environ.get("NEBIUS_API_KEY"),
+                temperature=0.2,
+                streaming=True,
+                callbacks=[LedgerCallback(os.environ.get("MODEL"))]
+            )
+        return _llm
 
+def invoke_llm(prompt, mode="agent"):
+    """One-shot helper call (refine, validate, structure) through the shared LLM client."""
+    from prompts.llm_client import MODEL, create_completion
+
+    def call():
+        start = time.monotonic()
+        response = create_completion(mode, model=MODEL, messages=[{"role": "user", "content": prompt}],
+                                     temperature=0.2)
+        if mode in STAGE_BY_MODE:
+            record_stage(STAGE_BY_MODE[mode], time.monotonic() - start)
+        return response.choices[0].message.content or ""
+    return llm_flight.do(request_key(prompt), call)
+
+def coalesced(name, func):
+    """Wraps a read-only tool so identical queries share one call."""
+    def run(query):
+        return tool_flight.do(request_key(name, normalize_text(str(query))), func, query)
+    return run
 
 def parse_calendar_input(input_string):
     pattern = r"Title: (.*?), Description: (.*?), Start: (.*?), End: (.*?), Timezone: (.*)"
@@ -76,18 +112,34 @@ def parse_calendar_input(input_string):
     
     return title, description, start_time_str, end_time_str, timezone
 
+def format_calendar_input(event):
+    """The parse_calendar_input line for a (title, description, start, end, timezone) event."""
+    return "Title: {}, Description: {}, Start: {}, End: {}, Timezone: {}".format(*event)
+
+def parse_calendar_events(input_string):
+    """Every event in the input, one per line (or separated by ';'), in the parse_calendar_input format."""
+    pattern = r"Title: (.*?), Description: (.*?), Start: (.*?), End: (.*?), Timezone: ([^\n;]*)"
+    events = [tuple(group.strip() for group in match.groups()) for match in re.finditer(pattern, input_string)]
+    if not events:
+        raise ValueError("Input string is not in the correct format.")
+    return events
+
 def calendar_event_tool_func(input_string):
     try:
-        title, description, start_time_str, end_time_str, timezone = parse_calendar_input(input_string)
-        return create_google_calendar_event(title, description, start_time_str, end_time_str, timezone)
+        # Several events go to Google in one batch request
+        return create_google_calendar_events(parse_calendar_events(input_string))
     except Exception as e:
         return f"Error processing calendar event: {e}"
 
 
 
 def get_location_from_ip(ip_address):
+    db = get_ip_db()
+    location = db.lookup(ip_address) if db else None
+    if location:
+        return location
     try:
-        response = requests.get(f"https://ipinfo.io/{ip_address}/json")
+        response = request_with_limits("geo", "GET", f"https://ipinfo.io/{ip_address}/json")
         if response.status_code == 200:
             data = response.json()
             location = {
@@ -101,9 +153,12 @@ def get_location_from_ip(ip_address):
     except Exception as e:
         return {"city": "Unknown", "region": "Unknown", "country": "Unknown"}
 
+# Late-bound so the resolver always calls the current get_user_ip / get_location_from_ip
+location_resolver = LocationResolver(lambda: get_user_ip(), lambda ip_address: get_location_from_ip(ip_address))
+
 def get_user_ip():
     try:
-        response = requests.get("https://api.ipify.org?format=json")
+        response = request_with_limits("geo", "GET", "https://api.ipify.org?format=json")
         if response.status_code == 200:
             data = response.json()
             return data.get("ip", "Unknown")
@@ -112,106 +167,363 @@ def get_user_ip():
     except Exception as e:
         return "Unknown"
 
-ip_location_tool = Tool(
-    name="IP Location Lookup",
-    func=lambda ip: get_location_from_ip(ip),
-    description="Useful for retrieving the geographical location of an IP address."
-)
-
-search_tool = TavilySearchResults()
-wikipedia = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
-duckduckgo = DuckDuckGoSearchRun()
-youtube_search = YouTubeSearchTool()
-calendar_event_tool = Tool(
-    name="Google Calendar Event Creator",
-    func=calendar_event_tool_func,
-    description=(
+def _search_runner(key, service, build_runner):
+    def build():
+        # In-flight dedupe, then the persistent per-tool cache, then the rate-limited call
+        return coalesced(key, cached(key, limited(service, build_runner())))
+    return build
+
+def _tavily():
+    from langchain_community.tools import TavilySearchResults
+    return TavilySearchResults().run
+
+def _wikipedia():
+    from langchain_community.tools import WikipediaQueryRun
+    from langchain_community.utilities import WikipediaAPIWrapper
+    return WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper()).run
+
+def _duckduckgo():
+    from langchain_community.tools import DuckDuckGoSearchRun
+    return DuckDuckGoSearchRun().run
+
+def _youtube():
+    from langchain_community.tools import YouTubeSearchTool
+    return YouTubeSearchTool().run
+
+def _web_lookup():
+    from .web_lookup import WEB_LOOKUP_BACKENDS, WebLookup
+    # Each backend is built on its first query, in the lookup's worker thread
+    backends = {name: (lambda query, tool=WEB_LOOKUP_SOURCES[name]: get_tool_func(tool)(query))
+                for name in WEB_LOOKUP_BACKENDS if name in WEB_LOOKUP_SOURCES}
+    return coalesced("web_lookup", WebLookup(backends).run)
+
+def calendar_availability_tool_func(input_string):
+    """Free/busy from the local calendar mirror, for 'Start: ..., End: ...[, Timezone: ...]'."""
+    match = re.search(r"Start: (.*?), End: (.*?)(?:, Timezone: (.*))?$", input_string.strip())
+    if not match:
+        return "Input must be: 'Start: YYYY-MM-DDTHH:MM:SS, End: YYYY-MM-DDTHH:MM:SS, Timezone: ...'."
+    try:
+        return describe_availability(match.group(1).strip(), match.group(2).strip(), (match.group(3) or "").strip() or None)
+    except Exception as e:
+        return f"Error checking availability: {e}"
+
+def calendar_event(events):
+    """Native tool-calling variant of calendar_event_tool_func: the model fills in the fields itself."""
+    try:
+        return create_google_calendar_events([
+            (event["title"], event.get("description", ""), event["start"], event["end"], event.get("timezone", "UTC"))
+            for event in events
+        ])
+    except Exception as e:
+        return f"Error processing calendar event: {e}"
+
+def _string_param(name, description):
+    return {"type": "object", "properties": {name: {"type": "string", "description": description}},
+            "required": [name]}
+
+CALENDAR_EVENT_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "description": {"type": "string"},
+        "start": {"type": "string", "description": "YYYY-MM-DDTHH:MM:SS"},
+        "end": {"type": "string", "description": "YYYY-MM-DDTHH:MM:SS"},
+        "timezone": {"type": "string", "description": "IANA time zone, e.g. Africa/Casablanca"},
+    },
+    "required": ["title", "description", "start", "end", "timezone"],
+}
+AVAILABILITY_PARAMETERS = {
+    "type": "object",
+    "properties": {key: CALENDAR_EVENT_PARAMETERS["properties"][key] for key in ("start", "end", "timezone")},
+    "required": ["start", "end"],
+}
+CALENDAR_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "events": {"type": "array", "items": CALENDAR_EVENT_PARAMETERS, "description": "All events to create"},
+    },
+    "required": ["events"],
+}
+
+# Tool name -> (builder of the single-string function the LangChain agent calls, description,
+# native function name, native parameters), in the order the agents are given them
+TOOL_REGISTRY = {
+    "Web Lookup": (
+        _web_lookup,
+        "Searches the web, news and encyclopedia sources at once and returns the best merged snippets. "
+        "Use this first for any question that needs facts or current information.",
+        "web_lookup", _string_param("query", "Search query")),
+    "Tavily Search": (
+        _search_runner("tavily", "tavily", _tavily),
+        "Useful for answering questions about current events, weather, flight information, or other real-time data.",
+        "tavily_search", _string_param("query", "Search query")),
+    "Wikipedia": (
+        _search_runner("wikipedia", "search", _wikipedia),
+        "Useful for answering general knowledge questions, definitions, and summaries about topics.",
+        "wikipedia", _string_param("query", "Topic to look up")),
+    "DuckDuckGo Search": (
+        _search_runner("duckduckgo", "search", _duckduckgo),
+        "Useful for searching the web for general information and alternative sources.",
+        "duckduckgo_search", _string_param("query", "Search query")),
+    "YouTube Search": (
+        _search_runner("youtube", "search", _youtube),
+        "Useful for finding videos related to tutorials, reviews, or entertainment.",
+        "youtube_search", _string_param("query", "What to search videos for")),
+    "IP Location Lookup": (
+        lambda: coalesced("ip_location", get_location_from_ip),
+        "Useful for retrieving the geographical location of an IP address.",
+        "ip_location", _string_param("ip_address", "IPv4 or IPv6 address")),
+    "Google Calendar Event Creator": (
+        lambda: calendar_event_tool_func,
         "Useful for creating calendar events. "
-        "Input format must be: 'Title: ..., Description: ..., Start: YYYY-MM-DDTHH:MM:SS, End: YYYY-MM-DDTHH:MM:SS, Timezone: ...'."
-    )
-)
-
-tools = [
-    Tool(
-        name="Tavily Search", 
-        func=search_tool.run,
-        description="Useful for answering questions about current events, weather, flight information, or other real-time data."
-    ),
-    Tool(
-        name="Wikipedia",
-        func=wikipedia.run,
-        description="Useful for answering general knowledge questions, definitions, and summaries about topics."
-    ),
-    Tool(
-        name="DuckDuckGo Search",
-        func=duckduckgo.run,
-        description="Useful for searching the web for general information and alternative sources."
-    ),
-    Tool(
-        name="YouTube Search",
-        func=youtube_search.run,
-        description="Useful for finding videos related to tutorials, reviews, or entertainment."
-    ),
-    ip_location_tool,
-    calendar_event_tool
-]
-
-agent = initialize_agent(
-    tools,
-    llm,
-    agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,  
-    verbose=True,
-    handle_parsing_errors=True,
-)
+        "Input format must be: 'Title: ..., Description: ..., Start: YYYY-MM-DDTHH:MM:SS, End: YYYY-MM-DDTHH:MM:SS, Timezone: ...'. "
+        "To create several events, give all of them at once, one per line.",
+        "create_calendar_event", CALENDAR_PARAMETERS),
+    "Calendar Availability": (
+        lambda: calendar_availability_tool_func,
+        "Useful for checking whether the user is free or busy at a time, answered instantly from their calendar. "
+        "Input format must be: 'Start: YYYY-MM-DDTHH:MM:SS, End: YYYY-MM-DDTHH:MM:SS, Timezone: ...'.",
+        "calendar_availability", AVAILABILITY_PARAMETERS),
+}
+
+# web_lookup backend -> the tool it queries; with WEB_LOOKUP on, the agents get
+# the composite lookup instead of these tools one by one
+WEB_LOOKUP = os.getenv("WEB_LOOKUP", "1") != "0"
+WEB_LOOKUP_SOURCES = {"tavily": "Tavily Search", "duckduckgo": "DuckDuckGo Search", "wikipedia": "Wikipedia"}
+
+def agent_tool_names():
+    if not WEB_LOOKUP:
+        return [name for name in TOOL_REGISTRY if name != "Web Lookup"]
+    return [name for name in TOOL_REGISTRY if name not in WEB_LOOKUP_SOURCES.values()]
+
+def get_tool_func(name):
+    with _registry_lock:
+        if name not in _tool_funcs:
+            _tool_funcs[name] = TOOL_REGISTRY[name][0]()
+        return _tool_funcs[name]
+
+def get_tool(name):
+    with _registry_lock:
+        if name not in _tools:
+            from langchain.agents import Tool
+            _tools[name] = Tool(name=name, func=get_tool_func(name), description=TOOL_REGISTRY[name][1])
+        return _tools[name]
+
+def get_tools():
+    return [get_tool(name) for name in agent_tool_names()]
+
+def _native_tool(name):
+    _, description, function_name, parameters = TOOL_REGISTRY[name]
+    if function_name == "create_calendar_event":
+        func = calendar_event
+        description = "Creates Google Calendar events, all the ones asked for in a single call."
+    elif function_name == "calendar_availability":
+        func = lambda start, end, timezone=None: describe_availability(start, end, timezone)
+        description = "Says whether the user is free between start and end, from their calendar."
+    else:
+        param = next(iter(parameters["properties"]))
+        func = lambda **args: get_tool_func(name)(args.get(param, ""))
+    return {"name": function_name, "description": description, "parameters": parameters, "func": func}
+
+def agent_engine():
+    """Which agent answers: "langchain" (ReAct) or "native" (tool_agent.ToolAgent), set in the settings dialog."""
+    return os.getenv("TASKCRAFTERS_ENGINE", "langchain")
+
+def get_agent():
+    with _registry_lock:
+        engine = agent_engine()
+        if engine not in _agents:
+            if engine == "native":
+                from .tool_agent import ToolAgent
+                _agents[engine] = ToolAgent([_native_tool(name) for name in agent_tool_names()])
+            else:
+                from langchain.agents import initialize_agent, AgentType
+
+                _agents[engine] = initialize_agent(
+                    get_tools(),
+                    get_llm(),
+                    agent=AgentType.STRUCTURED_CHAT_ZERO_SHOT_REACT_DESCRIPTION,
+                    verbose=True,
+                    handle_parsing_errors=True,
+                )
+        return _agents[engine]
+
+def warm_up():
+    """Builds the agent ahead of the first question; meant for a background thread."""
+    location_resolver.start()
+    # Opens the calendar mirror and starts its background sync
+    get_calendar_mirror()
+    try:
+        start = time.perf_counter()
+        get_agent()
+        print(f"Taskcrafters {agent_engine()} agent ready in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        # The first question builds it again and reports the error to the user
+        print(f"Taskcrafters agent warm-up failed: {e}")
+
+def _is_calendar(instruction):
+    text = instruction.lower()
+    return "calendar" in text or "event" in text or "meeting" in text
+
+def _needs_location(instruction):
+    return _is_calendar(instruction) or "weather" in instruction.lower()
+
+def _user_timezone(location):
+    return resolve_timezone(location.get("city"), location.get("country")) or "UTC"
+
+def _local_event(instruction, record=True):
+    """The calendar event parsed without the LLM, or None if the local parser cannot read it."""
+    if not _is_calendar(instruction):
+        return None
+    return parse_event(instruction, _user_timezone(location_resolver.get()), record=record)
 
 def refine_instruction(instruction):
-    location = get_location_from_ip(get_user_ip())
-    city = location.get("city", "casablanca")
-    if "calendar" in instruction.lower() or "event" in instruction.lower() or "meeting" in instruction.lower():
+    city = None
+    location = {}
+    if _needs_location(instruction):
+        start = time.monotonic()
+        location = location_resolver.get()
+        record_stage("location", time.monotonic() - start)
+        city = location.get("city", "casablanca")
+    if _is_calendar(instruction):
+        # Dates, times and zones the local parser understands need no LLM call
+        event = parse_event(instruction, _user_timezone(location))
+        if event:
+            record_saving(STAGE_ESTIMATES["refine"])
+            return format_calendar_input(event)
         refinement_prompt = (
             f"You are a helpful assistant that transforms casual user input into a structured format for creating Google Calendar events. "
             f"Convert the following instruction into this exact format:\n\n"
-            f"'Title: ..., Description: ..., Start: YYYY-MM-DDTHH:MM:SS, End: YYYY-MM-DDTHH:MM:SS, Timezone: {city or 'UTC'}'\n\n"
+            f"'Title: ..., Description: ..., Start: YYYY-MM-DDTHH:MM:SS, End: YYYY-MM-DDTHH:MM:SS, Timezone: {_user_timezone(location)}'\n"
+            f"If it asks for several events, output one line in this format per event.\n\n"
             f"Input: {instruction}\n"
             f"Output:"
         )
-        refined_instruction = llm.invoke(refinement_prompt).content 
+        refined_instruction = invoke_llm(refinement_prompt, "agent_refine")
         return refined_instruction.strip()
     elif "weather" in instruction.lower():
         refinement_prompt = f"Refine the following instruction into a concise and effective query, including the location ({city}): {instruction}"
     else:
         refinement_prompt = f"Refine the following instruction into a concise and effective query: {instruction}"
     
-    refined_instruction = llm.invoke(refinement_prompt).content 
+    refined_instruction = invoke_llm(refinement_prompt, "agent_refine")
     return refined_instruction.strip()
 
-def validate_response(response, instruction):
+def _rewritten(response, instruction):
+    """Returns the validator's rewrite of the response, or None if it kept it as is."""
     validation_prompt = (
         f"Validate the following response for relevance, safety, and accuracy. "
         f"If it is irrelevant, unsafe, or inaccurate, rewrite it to be appropriate. "
         f"Original Response: {response}\n"
         f"User Instruction: {instruction}"
     )
-    validated_response = llm.invoke(validation_prompt).content
+    validated_response = invoke_llm(validation_prompt, "agent_validate")
     lines = validated_response.split("\n")
     for i, line in enumerate(lines):
         if line.strip().startswith("Rewritten Response:"):
             return "\n".join(lines[i+1:]).strip()
-    
-    return response.strip()
+    return None
+
+def validate_response(response, instruction):
+    return _rewritten(response, instruction) or response.strip()
 
 def structure_response(response):
     structuring_prompt = f"Summarize the following response into a concise, short and well-structured format (don't use markdown format): {response}"
-    structured_response = llm.invoke(structuring_prompt).content  
+    structured_response = invoke_llm(structuring_prompt, "agent_structure")
     return structured_response.strip()
 
-def generate_response(instruction):
+def fused_finish(response, instruction):
+    """Validation and structuring in one call."""
+    finishing_prompt = (
+        f"Check the following response for relevance, safety, and accuracy against the user instruction, "
+        f"rewriting it if it is irrelevant, unsafe, or inaccurate. Then return it summarized into a concise, "
+        f"short and well-structured format (don't use markdown format). Return only the final answer.\n"
+        f"Original Response: {response}\n"
+        f"User Instruction: {instruction}"
+    )
+    return invoke_llm(finishing_prompt, "agent_finish").strip()
+
+def concurrent_finish(response, instruction):
+    """Structures the raw answer while it is validated; a rewritten answer is structured again."""
+    structured = _finish_pool.submit(structure_response, response)
+    rewritten = _rewritten(response, instruction)
+    if rewritten is None:
+        return structured.result()
+    # Already running by now; its answer is simply not used
+    structured.cancel()
+    return structure_response(rewritten)
+
+FINISHERS = {
+    "sequential": lambda response, instruction: structure_response(validate_response(response, instruction)),
+    "concurrent": concurrent_finish,
+    "fused": fused_finish,
+}
+
+def record_stage(stage, seconds):
+    with _stage_lock:
+        STAGE_ESTIMATES[stage] += STAGE_EWMA_ALPHA * (seconds - STAGE_ESTIMATES[stage])
+
+def _finish_estimate(finish):
+    if finish in ("sequential", "concurrent"):
+        # Concurrent costs one call when validation keeps the answer, which is the usual case
+        return STAGE_ESTIMATES["validate"] + (STAGE_ESTIMATES["structure"] if finish == "sequential" else 0.0)
+    return STAGE_ESTIMATES["fused"] if finish == "fused" else 0.0
+
+def estimate_plan(name, instruction):
+    plan = PLANS[name]
+    with _stage_lock:
+        total = STAGE_ESTIMATES["agent"] + _finish_estimate(plan["finish"])
+        if plan["refine"] or _is_calendar(instruction):
+            total += 0.0 if _local_event(instruction, record=False) else STAGE_ESTIMATES["refine"]
+            if _needs_location(instruction):
+                total += STAGE_ESTIMATES["location"]
+    return total
+
+def choose_plan(instruction, budget=None):
+    if TASKCRAFTERS_PLAN in PLANS:
+        return TASKCRAFTERS_PLAN
+    budget = TASKCRAFTERS_BUDGET if budget is None else budget
+    for name in AUTO_PLANS:
+        if estimate_plan(name, instruction) <= budget:
+            return name
+    return AUTO_PLANS[-1]
+
+def _finish_within(finish, remaining):
+    """The planned finish, or a cheaper one if the agent ate into its share of the budget."""
+    if TASKCRAFTERS_PLAN in PLANS:
+        return finish
+    options = [None, "fused", "concurrent", "sequential"]
+    for option in options[options.index(finish)::-1]:
+        with _stage_lock:
+            if _finish_estimate(option) <= remaining:
+                return option
+    return None
+
+def _generate_response(instruction, budget=None):
+    budget = TASKCRAFTERS_BUDGET if budget is None else budget
+    start = time.monotonic()
+    name = choose_plan(instruction, budget)
+    plan = PLANS[name]
+
+    query = instruction
+    if plan["refine"] or _is_calendar(instruction):
+        query = refine_instruction(instruction)
+
+    stage_start = time.monotonic()
+    search_result = get_agent().run(query)
+    record_stage("agent", time.monotonic() - stage_start)
+
+    finish = _finish_within(plan["finish"], budget - (time.monotonic() - start))
+    if finish is not None:
+        search_result = FINISHERS[finish](search_result, instruction)
+    print(f"Taskcrafters plan {name} (finish: {finish}) took {time.monotonic() - start:.1f}s of {budget:g}s")
+    return search_result.strip()
+
+def generate_response(instruction, budget=None):
     try:
-        refined_instruction = refine_instruction(instruction)
-        search_result = agent.run(refined_instruction)
-        validated_response = validate_response(search_result, instruction)
-        final_response = structure_response(validated_response)
-        return final_response
+        # Errors are not reused, so a failed run is retried the next time it is asked
+        flight = calendar_flight if _is_calendar(instruction) else response_flight
+        return flight.do(normalize_text(instruction), _generate_response, instruction, budget)
     except Exception as e:
         print(f"Error Generating Response: {e}")
         return "An error occurred while processing your request."
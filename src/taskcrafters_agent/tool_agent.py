@@ -0,0 +1,115 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List
+
+from prompts.llm_client import MODEL, create_completion
+from prompts.resilience import DeadlineExceeded
+
+# Caps per question: model turns, wall-clock seconds, and how much of each tool result goes back to the model
+AGENT_MAX_ITERATIONS = int(os.getenv("AGENT_MAX_ITERATIONS", "5"))
+AGENT_TIME_LIMIT = float(os.getenv("AGENT_TIME_LIMIT", "30"))
+MAX_PARALLEL_TOOLS = int(os.getenv("AGENT_PARALLEL_TOOLS", "4"))
+TOOL_RESULT_CHARS = 2000
+# Time kept back for the final answer once the tools have used up the rest
+ANSWER_RESERVE = 5.0
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that answers questions using the available tools when they help. "
+    "Call several tools at once when their results do not depend on each other. "
+    "When you have enough information, answer briefly without calling more tools."
+)
+FINAL_PROMPT = "Answer now with the information gathered so far, without calling more tools."
+
+
+class ToolAgent:
+    """
+    Answers a question with OpenAI-compatible tool calling, as a lighter alternative to the LangChain agent.
+
+    Each tool is a dict with name, description, parameters (JSON schema) and
+    func(**arguments). All calls the model asks for in one turn run in parallel.
+    After AGENT_MAX_ITERATIONS turns, or when AGENT_TIME_LIMIT is about to run
+    out, the model is asked to answer with what it has. Model turns and tools share
+    the time limit, with ANSWER_RESERVE of it kept for that last answer.
+    """
+
+    def __init__(self, tools: List[Dict[str, Any]], max_iterations: int = AGENT_MAX_ITERATIONS,
+                 time_limit: float = AGENT_TIME_LIMIT, mode: str = "agent_native"):
+        self.funcs: Dict[str, Callable[..., Any]] = {tool["name"]: tool["func"] for tool in tools}
+        self.specs = [{"type": "function", "function": {key: tool[key] for key in ("name", "description", "parameters")}}
+                      for tool in tools]
+        self.max_iterations = max_iterations
+        self.time_limit = time_limit
+        self.mode = mode
+        self.pool = ThreadPoolExecutor(max_workers=MAX_PARALLEL_TOOLS, thread_name_prefix="agent-tool")
+        self.stats = {"runs": 0, "iterations": 0, "tool_calls": 0, "capped": 0, "tool_timeouts": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def _complete(self, messages, deadline: float, **kwargs):
+        response = create_completion(self.mode, budget=max(0.0, deadline - time.monotonic()), model=MODEL,
+                                     messages=messages, tools=self.specs, temperature=0.2, **kwargs)
+        return response.choices[0].message
+
+    def _call_tool(self, name: str, arguments: str) -> str:
+        func = self.funcs.get(name)
+        if func is None:
+            return f"Unknown tool: {name}"
+        try:
+            args = json.loads(arguments or "{}")
+        except json.JSONDecodeError as e:
+            return f"Invalid arguments for {name}: {e}"
+        try:
+            return str(func(**args))[:TOOL_RESULT_CHARS]
+        except Exception as e:
+            return f"{name} failed: {e}"
+
+    def _run_tools(self, tool_calls, deadline: float) -> List[Dict[str, str]]:
+        futures = [self.pool.submit(self._call_tool, call.function.name, call.function.arguments)
+                   for call in tool_calls]
+        wait(futures, timeout=max(0.0, deadline - time.monotonic()))
+        results = []
+        for call, future in zip(tool_calls, futures):
+            if future.done():
+                content = future.result()
+            else:
+                # Left running in its thread; the model is told and moves on
+                self._count("tool_timeouts")
+                content = f"{call.function.name} did not answer in time"
+            results.append({"role": "tool", "tool_call_id": call.id, "content": content})
+        return results
+
+    def run(self, query: str) -> str:
+        start = time.monotonic()
+        deadline = start + self.time_limit
+        self._count("runs")
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": query}]
+        for iteration in range(self.max_iterations):
+            self._count("iterations")
+            try:
+                message = self._complete(messages, deadline - ANSWER_RESERVE)
+            except DeadlineExceeded:
+                break
+            if not message.tool_calls:
+                return message.content or ""
+            self._count("tool_calls", len(message.tool_calls))
+            print(f"[agent] step {iteration + 1}: " + ", ".join(call.function.name for call in message.tool_calls))
+            messages.append({
+                "role": "assistant",
+                "content": message.content,
+                "tool_calls": [{"id": call.id, "type": "function",
+                                "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                               for call in message.tool_calls],
+            })
+            messages.extend(self._run_tools(message.tool_calls, deadline - ANSWER_RESERVE))
+            if time.monotonic() >= deadline - ANSWER_RESERVE:
+                break
+        self._count("capped")
+        print(f"[agent] capped after {time.monotonic() - start:.1f}s, answering with what it has")
+        messages.append({"role": "user", "content": FINAL_PROMPT})
+        return self._complete(messages, deadline, tool_choice="none").content or ""
@@ -0,0 +1,161 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Tuple
+
+# Backends queried at once, each capped at WEB_LOOKUP_TIMEOUT; the whole lookup at WEB_LOOKUP_DEADLINE
+WEB_LOOKUP_BACKENDS = [name.strip() for name in os.getenv("WEB_LOOKUP_BACKENDS", "tavily,duckduckgo,wikipedia")
+                       .split(",") if name.strip()]
+WEB_LOOKUP_TIMEOUT = float(os.getenv("WEB_LOOKUP_TIMEOUT", "6"))
+WEB_LOOKUP_DEADLINE = float(os.getenv("WEB_LOOKUP_DEADLINE", "8"))
+# Early exit: this many backends have answered, or one snippet already scores this well
+WEB_LOOKUP_QUORUM = int(os.getenv("WEB_LOOKUP_QUORUM", "2"))
+WEB_LOOKUP_CONFIDENCE = float(os.getenv("WEB_LOOKUP_CONFIDENCE", "1.2"))
+WEB_LOOKUP_RESULTS = 5
+SNIPPET_CHARS = 400
+
+# Ranking: share of the query's words a snippet covers, plus a bonus per extra
+# backend that returned the same text, plus a small prior per backend, minus
+# a penalty for sitting low in its backend's own ranking
+AGREEMENT_BONUS = 0.3
+BACKEND_PRIOR = {"tavily": 0.2, "wikipedia": 0.1, "duckduckgo": 0.1}
+POSITION_PENALTY = 0.05
+DUPLICATE_SIMILARITY = 0.6
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "about", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it", "latest",
+    "me", "of", "on", "or", "the", "this", "to", "was", "what", "when", "where", "which", "who", "why", "with",
+}
+
+WEB_LOOKUP_STATS = {"lookups": 0, "early_exits": 0, "timeouts": 0, "errors": 0, "duplicates": 0}
+_stats_lock = threading.Lock()
+
+
+def _words(text: str) -> set:
+    return {word for word in _WORD_RE.findall(text.lower()) if word not in STOPWORDS}
+
+
+def parse_results(output: Any) -> List[Dict[str, str]]:
+    """
+    Normalizes what a search tool returned into snippets with title, url and text.
+
+    Tavily returns a list of {url, content} dicts, Wikipedia "Page: ...\\nSummary: ..."
+    blocks separated by blank lines, DuckDuckGo one run of text.
+    """
+    if isinstance(output, list):
+        return [{"title": item.get("title", ""), "url": item.get("url", ""), "text": str(item.get("content", ""))}
+                for item in output if isinstance(item, dict) and item.get("content")]
+    text = str(output or "").strip()
+    if not text or text.lower().startswith("no good"):
+        return []
+    snippets = []
+    for block in re.split(r"\n\s*\n", text):
+        title = ""
+        match = re.match(r"Page:\s*(.*)\n(?:Summary:\s*)?", block)
+        if match:
+            title, block = match.group(1).strip(), block[match.end():]
+        if block.strip():
+            snippets.append({"title": title, "url": "", "text": block.strip()})
+    return snippets
+
+
+class WebLookup:
+    """
+    One search step across several backends, in place of one agent iteration per search tool.
+
+    Every backend is queried at once. Snippets are merged as they arrive,
+    near-duplicates folded together (agreement between backends raises the
+    score), and the lookup returns when WEB_LOOKUP_QUORUM backends have answered,
+    a snippet reaches WEB_LOOKUP_CONFIDENCE, or the deadline passes. Slow
+    backends keep running in the pool; their answers are dropped.
+    """
+
+    def __init__(self, backends: Dict[str, Callable[[str], Any]], timeout: float = WEB_LOOKUP_TIMEOUT,
+                 deadline: float = WEB_LOOKUP_DEADLINE, quorum: int = WEB_LOOKUP_QUORUM,
+                 confidence: float = WEB_LOOKUP_CONFIDENCE):
+        self.backends = backends
+        self.timeout = timeout
+        self.deadline = deadline
+        self.quorum = min(quorum, len(backends))
+        self.confidence = confidence
+        self.pool = ThreadPoolExecutor(max_workers=max(1, 2 * len(backends)), thread_name_prefix="web-lookup")
+
+    def _merge(self, merged: List[Dict[str, Any]], name: str, snippets: List[Dict[str, str]], query_words: set):
+        for position, snippet in enumerate(snippets):
+            words = _words(snippet["text"])
+            coverage = len(query_words & (words | _words(snippet["title"]))) / len(query_words) if query_words else 0.0
+            score = coverage + BACKEND_PRIOR.get(name, 0.0) - POSITION_PENALTY * position
+            for existing in merged:
+                union = words | existing["words"]
+                if union and len(words & existing["words"]) / len(union) >= DUPLICATE_SIMILARITY:
+                    with _stats_lock:
+                        WEB_LOOKUP_STATS["duplicates"] += 1
+                    if name not in existing["sources"]:
+                        existing["sources"].append(name)
+                        existing["score"] = max(existing["score"], score) + AGREEMENT_BONUS
+                    if len(snippet["text"]) > len(existing["text"]):
+                        existing.update(text=snippet["text"], words=words)
+                    existing["url"] = existing["url"] or snippet["url"]
+                    break
+            else:
+                merged.append({**snippet, "words": words, "sources": [name], "score": score})
+
+    def lookup(self, query: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """Returns the ranked snippets and how the lookup went (answered, timed out, failed, early exit)."""
+        start = time.monotonic()
+        deadline = start + self.deadline
+        query_words = _words(query)
+        futures = {self.pool.submit(func, query): (name, start) for name, func in self.backends.items()}
+        pending = set(futures)
+        merged: List[Dict[str, Any]] = []
+        info = {"answered": [], "timed_out": [], "failed": [], "early_exit": False}
+        while pending:
+            now = time.monotonic()
+            budget = min([deadline] + [futures[f][1] + self.timeout for f in pending]) - now
+            done, pending = wait(pending, timeout=max(0.0, budget), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future][0]
+                try:
+                    self._merge(merged, name, parse_results(future.result()), query_words)
+                    info["answered"].append(name)
+                except Exception as e:
+                    print(f"[web lookup] {name} failed: {e}")
+                    info["failed"].append(name)
+            now = time.monotonic()
+            for future in list(pending):
+                if now >= deadline or now >= futures[future][1] + self.timeout:
+                    pending.discard(future)
+                    info["timed_out"].append(futures[future][0])
+            best = max((snippet["score"] for snippet in merged), default=0.0)
+            if pending and (len(info["answered"]) >= self.quorum or best >= self.confidence):
+                info["early_exit"] = True
+                break
+        info["seconds"] = time.monotonic() - start
+        with _stats_lock:
+            WEB_LOOKUP_STATS["lookups"] += 1
+            WEB_LOOKUP_STATS["early_exits"] += info["early_exit"]
+            WEB_LOOKUP_STATS["timeouts"] += len(info["timed_out"])
+            WEB_LOOKUP_STATS["errors"] += len(info["failed"])
+        merged.sort(key=lambda snippet: snippet["score"], reverse=True)
+        return merged[:WEB_LOOKUP_RESULTS], info
+
+    def run(self, query: str) -> str:
+        snippets, info = self.lookup(query)
+        print(f"[web lookup] {len(snippets)} snippets from {', '.join(info['answered']) or 'no backend'} "
+              f"in {info['seconds']:.1f}s" + (" (early exit)" if info["early_exit"] else ""))
+        if not snippets:
+            return "No results found."
+        lines = []
+        for snippet in snippets:
+            title = f"{snippet['title']}: " if snippet["title"] else ""
+            url = f" ({snippet['url']})" if snippet["url"] else ""
+            lines.append(f"[{'+'.join(snippet['sources'])}] {title}{snippet['text'][:SNIPPET_CHARS]}{url}")
+        return "\n".join(lines)
+
+
+def get_web_lookup_stats() -> Dict[str, int]:
+    with _stats_lock:
+        return dict(WEB_LOOKUP_STATS)
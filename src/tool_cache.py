@@ -0,0 +1,217 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from singleflight import normalize_text
+
+TOOL_CACHE_PATH = os.getenv("TOOL_CACHE") or os.path.join(os.path.expanduser("~"), ".taskcrafters", "tool_cache.db")
+TOOL_CACHE_ENABLED = os.getenv("TOOL_CACHE_ENABLED", "1") != "0"
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "2000"))
+
+# Seconds a result stays fresh, per tool; TOOL_CACHE_TTLS='{"tavily": 600}' overrides
+TOOL_TTLS: Dict[str, float] = {
+    "tavily": 30 * 60,
+    "duckduckgo": 60 * 60,
+    "wikipedia": 7 * 24 * 60 * 60,
+    "youtube": 24 * 60 * 60,
+}
+DEFAULT_TTL = 60 * 60
+# Weather, news and prices go stale quickly whichever tool answers them
+VOLATILE_TTL = 10 * 60
+_VOLATILE_RE = re.compile(r"\b(weather|forecast|temperature|news|today|tonight|now|latest|current|price|score|stock)\b")
+# Failures some tools return instead of raising (Tavily returns repr(e), the others say they found
+# nothing); these are never stored. TOOL_ERROR_PATTERNS has a pattern per tool, ERROR_PATTERN applies to all
+ERROR_PATTERN = re.compile(r"^\s*(?:[A-Za-z_.]*(?:Error|Exception)\(|Traceback \(|Error:|No results found|\[\]\s*$)")
+TOOL_ERROR_PATTERNS: Dict[str, re.Pattern] = {
+    "tavily": re.compile(r"^\s*(?:HTTPError|ConnectionError|Timeout)"),
+    "duckduckgo": re.compile(r"^\s*No good DuckDuckGo Search Result"),
+    "wikipedia": re.compile(r"^\s*No good Wikipedia Search Result"),
+}
+# A result this many TTLs old is still served while a fresh one is fetched in the background
+STALE_FACTOR = 3.0
+# Eviction runs every this many writes, trimming back to TOOL_CACHE_MAX_ENTRIES by last use
+EVICT_EVERY = 50
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    tool TEXT NOT NULL,
+    query TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (tool, query)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_used ON results(used);
+"""
+
+
+def _configured_ttls() -> Dict[str, float]:
+    ttls = dict(TOOL_TTLS)
+    try:
+        ttls.update(json.loads(os.getenv("TOOL_CACHE_TTLS") or "{}"))
+    except (ValueError, TypeError) as e:
+        print(f"Ignoring TOOL_CACHE_TTLS: {e}")
+    return ttls
+
+
+def is_error_result(tool: str, value: Any) -> bool:
+    """Whether a tool's return value is empty or a failure it reported instead of raising."""
+    if value is None or (isinstance(value, (str, list, dict)) and not value):
+        return True
+    if not isinstance(value, str):
+        return False
+    if not value.strip():
+        return True
+    pattern = TOOL_ERROR_PATTERNS.get(tool)
+    return bool(ERROR_PATTERN.match(value) or (pattern and pattern.match(value)))
+
+
+class ToolCache:
+    """
+    Persistent cache of tool results in SQLite, keyed by tool and normalized query.
+
+    get() says whether an entry is fresh or only stale; cached() builds on that:
+    fresh results are returned as they are, stale ones are returned at once and
+    refreshed in a background thread (one refresh per key at a time), and misses
+    call the tool. Errors are never stored, whether raised or returned (see
+    is_error_result). The table is trimmed to max_entries,
+    least recently used first.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttls = _configured_ttls()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "evicted": 0, "errors": 0}
+        self._lock = threading.RLock()
+        self._refreshing = set()
+        self._writes = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def ttl_for(self, tool: str, query: str) -> float:
+        ttl = self.ttls.get(tool, DEFAULT_TTL)
+        return min(ttl, VOLATILE_TTL) if _VOLATILE_RE.search(query) else ttl
+
+    def get(self, tool: str, query: str) -> Tuple[Optional[Any], bool]:
+        """Returns (value, fresh); value is None when there is nothing usable."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM results WHERE tool = ? AND query = ?",
+                                     (tool, query)).fetchone()
+            if row is None:
+                return None, False
+            age = now - row[1]
+            ttl = self.ttl_for(tool, query)
+            if age > ttl * STALE_FACTOR:
+                self._conn.execute("DELETE FROM results WHERE tool = ? AND query = ?", (tool, query))
+                self._conn.commit()
+                return None, False
+            self._conn.execute("UPDATE results SET used = ? WHERE tool = ? AND query = ?", (now, tool, query))
+            self._conn.commit()
+        return json.loads(row[0]), age <= ttl
+
+    def put(self, tool: str, query: str, value: Any):
+        try:
+            encoded = json.dumps(value, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results (tool, query, value, created, used) "
+                               "VALUES (?, ?, ?, ?, ?)", (tool, query, encoded, now, now))
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Caller holds the lock."""
+        count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute("DELETE FROM results WHERE (tool, query) IN "
+                               "(SELECT tool, query FROM results ORDER BY used LIMIT ?)", (excess,))
+            self.stats["evicted"] += excess
+
+    def _refresh(self, tool: str, query: str, func: Callable[[str], Any], argument: str,
+                 is_error: Callable[[Any], bool]):
+        try:
+            value = func(argument)
+            if is_error(value):
+                self.stats["errors"] += 1
+                print(f"[{tool}] background refresh returned an error, keeping the stale result")
+                return
+            self.put(tool, query, value)
+            self.stats["refreshes"] += 1
+        except Exception as e:
+            print(f"[{tool}] background refresh failed, keeping the stale result: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard((tool, query))
+
+    def cached(self, tool: str, func: Callable[[str], Any],
+               is_error: Optional[Callable[[Any], bool]] = None) -> Callable[[str], Any]:
+        """Wraps a single-query tool function with the cache; results is_error accepts are passed on, not stored."""
+        is_error = is_error or (lambda value: is_error_result(tool, value))
+
+        def run(argument):
+            query = normalize_text(str(argument))
+            value, fresh = self.get(tool, query)
+            if value is not None and fresh:
+                self.stats["hits"] += 1
+                return value
+            if value is not None:
+                self.stats["stale_hits"] += 1
+                with self._lock:
+                    start_refresh = (tool, query) not in self._refreshing
+                    self._refreshing.add((tool, query))
+                if start_refresh:
+                    threading.Thread(target=self._refresh, args=(tool, query, func, argument, is_error),
+                                     daemon=True, name=f"refresh-{tool}").start()
+                return value
+            self.stats["misses"] += 1
+            value = func(argument)
+            if is_error(value):
+                self.stats["errors"] += 1
+            else:
+                self.put(tool, query, value)
+            return value
+        return run
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[ToolCache] = None
+
+
+def get_tool_cache() -> ToolCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ToolCache(TOOL_CACHE_PATH)
+        return _cache
+
+
+def cached(tool: str, func: Callable[[str], Any],
+           is_error: Optional[Callable[[Any], bool]] = None) -> Callable[[str], Any]:
+    """The tool function through the shared cache, or unchanged with TOOL_CACHE_ENABLED=0."""
+    if not TOOL_CACHE_ENABLED:
+        return func
+    try:
+        return get_tool_cache().cached(tool, func, is_error)
+    except sqlite3.Error as e:
+        print(f"Tool cache unavailable, calling {tool} directly: {e}")
+        return func